@@ -1,267 +1,90 @@
-from flask import Flask, request, jsonify, render_template_string, redirect, url_for, send_from_directory
+from flask import Flask, request, jsonify, render_template, redirect, url_for, abort, send_file
 import os
-import shutil
-from werkzeug.utils import secure_filename
+import json
+import uuid
+import base64
+import hashlib
 from configparser import ConfigParser
-from clientes import obter_clientes, adicionar_cliente, remover_cliente
-from logica import criar_pasta, copiar_arquivos, obter_info_processos
-
-app = Flask(__name__)
+from clientes import obter_clientes_com_etag, adicionar_cliente, remover_cliente
+from logica import criar_pasta, caminho_pasta_processo, obter_info_processos
+from recebimento import (
+    receber_multipart, criar_sessao, obter_sessao, gravar_bloco, finalizar_sessao, cancelar_sessao,
+    verificar_arquivos, aproveitar_arquivos, ErroRecebimento, SessaoNaoEncontrada, ArquivoGrandeDemais,
+    SessaoFinalizada
+)
+from fila_gravacao import obter_trabalho, obter_lote, FilaCheia
+from catalogo import iniciar_observador, versao_catalogo, geracao_catalogo, obter_processos
+from motor_busca import consultar, consultar_texto, chave_ordenacao, chave_ordenacao_valida, COLUNAS_ORDENACAO
+from indice_processos import chave_de_registro
+from estaticos import obter_ativo, versao_ativo, escolher_codificacao, CACHE_VERSIONADO
+from miniaturas import obter_miniatura, previsualizavel
+from listagem import listar_arquivos, posicao_apos
+
+# A rota /static é própria (versão no ?v=, compressão prévia), não a padrão do Flask
+app = Flask(__name__, static_folder=None)
 config = ConfigParser()
 config.read('config.ini')
-UPLOAD_FOLDER = os.path.join(os.getcwd(), 'uploads')
-os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 
 # Criar a pasta static se não existir
-STATIC_FOLDER = os.path.join(os.getcwd(), 'static')
+STATIC_FOLDER = os.path.join(app.root_path, 'static')
 os.makedirs(STATIC_FOLDER, exist_ok=True)
 
-HTML_TEMPLATE = r"""
-<!DOCTYPE html>
-<html lang="pt-br">
-<head>
-    <meta charset="UTF-8">
-    <title>Sistema de Arquivos Digitais</title>
-    <style>
-        body { font-family: Arial; margin: 40px; background-color: #f4f4f4; }
-        h2 { color: #333; }
-        form { background: #fff; padding: 20px; border-radius: 8px; }
-        input, select, button { margin: 5px 0; padding: 8px; width: 100%; }
-        .file-controls {
-            display: flex;
-            gap: 10px;
-            margin-bottom: 10px;
-        }
-        .file-list { margin-top: 10px; }
-        .file-item {
-            display: flex;
-            justify-content: space-between;
-            align-items: center;
-            padding: 8px;
-            background: #f9f9f9;
-            border: 1px solid #ddd;
-            border-radius: 4px;
-            margin-bottom: 5px;
-        }
-        .remove-btn {
-            background: none;
-            border: none;
-            cursor: pointer;
-        }
-        .drag-area {
-            border: 2px dashed #aaa;
-            padding: 20px;
-            text-align: center;
-            background: #fafafa;
-            margin-top: 10px;
-        }
-        .row { display: flex; gap: 10px; }
-        .col { flex: 1; }
-    </style>
-</head>
-<body>
-    <h2>Sistema de Arquivos Digitais</h2>
-
-    <form id="clienteForm" method="post" action="/cliente">
-        <div class="row">
-            <div class="col">
-                <input type="text" name="novo_cliente" placeholder="Nome do Cliente" required>
-            </div>
-            <div class="col">
-                <button type="submit" name="acao" value="cadastrar">Cadastrar Cliente</button>
-                <button type="submit" name="acao" value="excluir">Excluir Cliente</button>
-            </div>
-        </div>
-    </form>
-
-    <form id="uploadForm" method="post" action="/upload" enctype="multipart/form-data">
-        <label>Cliente:</label>
-        <select name="cliente" required>
-            <option value="">Selecione o Cliente</option>
-            {% for c in clientes %}
-            <option value="{{c}}">{{c}}</option>
-            {% endfor %}
-        </select>
-
-        <label>Área:</label>
-        <select name="area" required>
-            <option value="">Selecione</option>
-            <option value="IMPORTAÇÃO">IMPORTAÇÃO</option>
-            <option value="EXPORTAÇÃO">EXPORTAÇÃO</option>
-        </select>
-
-        <label>Serviço:</label>
-        <select name="servico" required>
-            <option value="">Selecione</option>
-            <option value="Aéreo">Aéreo</option>
-            <option value="Rodoviário">Rodoviário</option>
-            <option value="Marítimo">Marítimo</option>
-        </select>
-
-        <label>Nº Processo (6 dígitos):</label>
-        <input type="text" name="numero_processo" maxlength="6" required pattern="\d{6}">
-
-        <label>Ano (2 dígitos):</label>
-        <input type="text" name="ano" maxlength="2" required pattern="\d{2}">
-
-        <label>Referência:</label>
-        <input type="text" name="referencia" required pattern="^[A-Za-z0-9.-]+$" title="Apenas letras, números, hífen e ponto são permitidos">
-
-        <label>Arquivos:</label>
-        <div class="file-controls">
-            <button type="button" id="btnEscolherArquivos">Escolher arquivos</button>
-            <button type="button" id="btnEscolherPasta">Escolher Pasta</button>
-        </div>
-        <input type="file" name="files" multiple id="fileInput" style="display: none;">
-        <div id="fileList" class="file-list"></div>
-
-        <div class="drag-area" id="dragArea">
-            Arraste e solte arquivos aqui
-        </div>
-
-        <button type="submit">Enviar</button>
-    </form>
-    <button type="button" onclick="limparCampos()">Limpar Campos</button>
-
-    <form method="get" action="/busca">
-        <button type="submit">Busca Avançada</button>
-    </form>
-
-    <script>
-        // Lista global de arquivos
-        let fileList = [];
-
-        // Configurar drag and drop
-        const dragArea = document.getElementById('dragArea');
-        dragArea.addEventListener('dragover', (e) => {
-            e.preventDefault();
-            dragArea.style.backgroundColor = '#e9e9e9';
-        });
-        
-        dragArea.addEventListener('dragleave', () => {
-            dragArea.style.backgroundColor = '#fafafa';
-        });
-        
-        dragArea.addEventListener('drop', (e) => {
-            e.preventDefault();
-            dragArea.style.backgroundColor = '#fafafa';
-            const files = e.dataTransfer.files;
-            addFilesToList(files);
-        });
-
-        function addFilesToList(files) {
-            for (let i = 0; i < files.length; i++) {
-                fileList.push(files[i]);
-            }
-            updateFileList();
-        }
-
-        function removeFile(index) {
-            fileList.splice(index, 1);
-            updateFileList();
-        }
-
-        function updateFileList() {
-            const fileListDiv = document.getElementById('fileList');
-            fileListDiv.innerHTML = '';
-
-            fileList.forEach((file, index) => {
-                const fileItem = document.createElement('div');
-                fileItem.className = 'file-item';
-                fileItem.innerHTML = `
-                    <span>${file.name}</span>
-                    <button type="button" onclick="removeFile(${index})" class="remove-btn">
-                        <img src="/static/c_redX.png" alt="Remover" width="16">
-                    </button>
-                `;
-                fileListDiv.appendChild(fileItem);
-            });
-
-            // Atualizar input de arquivos
-            const dataTransfer = new DataTransfer();
-            fileList.forEach(file => dataTransfer.items.add(file));
-            document.getElementById('fileInput').files = dataTransfer.files;
-        }
-
-        // Event listeners para botões
-        document.getElementById('btnEscolherArquivos').addEventListener('click', () => {
-            document.getElementById('fileInput').click();
-        });
-
-        document.getElementById('fileInput').addEventListener('change', (e) => {
-            addFilesToList(e.target.files);
-            e.target.value = ''; // Resetar para permitir adicionar os mesmos arquivos novamente
-        });
-
-        document.getElementById('btnEscolherPasta').addEventListener('click', async () => {
-            // Verificar se a API está disponível
-            if (!window.showDirectoryPicker) {
-                alert('Seu navegador não suporta a seleção de pastas. Por favor, atualize ou use outro navegador.');
-                return;
-            }
-            try {
-                const dirHandle = await window.showDirectoryPicker();
-                await processFolder(dirHandle);
-            } catch (error) {
-                console.error('Erro ao selecionar pasta:', error);
-            }
-        });
-
-        async function processFolder(dirHandle, path = '') {
-            for await (const entry of dirHandle.values()) {
-                if (entry.kind === 'file') {
-                    const file = await entry.getFile();
-                    fileList.push(file);
-                } else if (entry.kind === 'directory') {
-                    await processFolder(entry, `${path}${entry.name}/`);
-                }
-            }
-            updateFileList();
-        }
-
-        // Função para limpar campos
-        function limparCampos() {
-            document.querySelector('select[name=cliente]').value = "";
-            document.querySelector('select[name=area]').value = "";
-            document.querySelector('select[name=servico]').value = "";
-            document.querySelector('input[name=numero_processo]').value = "";
-            document.querySelector('input[name=ano]').value = "";
-            document.querySelector('input[name=referencia]').value = "";
-            fileList = [];
-            updateFileList();
-        }
-
-        // Envio do formulário via AJAX
-        document.getElementById("uploadForm").addEventListener("submit", async function(event) {
-            event.preventDefault();
-
-            const formData = new FormData(this);
-
-            try {
-                const response = await fetch('/upload', {
-                    method: 'POST',
-                    body: formData
-                });
-
-                const text = await response.text();
-                alert(text);  // Exibe a quantidade de arquivos enviados com sucesso
-                if (response.ok) {
-                    fileList = [];
-                    updateFileList();
-                }
-            } catch (error) {
-                alert("Erro ao enviar os arquivos.");
-            }
-        });
-    </script>
-</body>
-</html>
-"""
+# Limite do corpo de cada requisição; uploads maiores devem ir em partes (/api/uploads)
+LIMITE_CORPO = config.getint('SERVIDOR', 'limite_corpo_mb', fallback=4096) * 1024 * 1024
+app.config['MAX_CONTENT_LENGTH'] = LIMITE_CORPO
+
+# Com vários processos servindo, cada um tem o próprio contador de versão do catálogo
+_INSTANCIA = uuid.uuid4().hex[:8]
+
+CAMPOS_FILTRO = ('cliente', 'numero', 'ano', 'area', 'servico', 'referencia')
+LIMITE_PADRAO = 50
+LIMITE_MAXIMO = 500
+# Miniaturas mudam pouco: o navegador reaproveita por alguns minutos sem perguntar de novo
+CACHE_MINIATURA = 'private, max-age=300'
+
+def estatico(nome):
+    """URL versionada de um arquivo estático, para ser guardado em cache pelo navegador"""
+    versao = versao_ativo(STATIC_FOLDER, nome)
+    return f"/static/{nome}?v={versao}" if versao else f"/static/{nome}"
+
+app.jinja_env.globals['estatico'] = estatico
+
+# Mantém o índice de processos em dia com pastas criadas fora do sistema
+iniciar_observador()
+
+def _versao_pagina_inicial():
+    """A página inicial só muda com a lista de clientes, o template e os arquivos estáticos que ela usa"""
+    with open(os.path.join(app.root_path, app.template_folder, 'index.html'), 'rb') as f:
+        partes = [f.read()]
+    for nome in ('css/sistema.css', 'js/upload.js', 'js/hash_worker.js'):
+        partes.append((versao_ativo(STATIC_FOLDER, nome) or '').encode('utf-8'))
+    return hashlib.sha1(b'|'.join(partes)).hexdigest()[:12]
+
+_VERSAO_TEMPLATE = _versao_pagina_inicial()
+
+def _responder_com_etag(etag, gerar):
+    """Responde 304 se o navegador já tem a versão etag; senão gera a resposta e a marca com o etag"""
+    if etag is not None and request.if_none_match.contains(etag):
+        resposta = app.response_class(status=304)
+    else:
+        resposta = app.make_response(gerar())
+    if etag is not None:
+        resposta.set_etag(etag)
+        resposta.headers['Cache-Control'] = 'no-cache'
+    return resposta
 
 @app.route("/", methods=["GET"])
 def index():
-    clientes = obter_clientes()
-    return render_template_string(HTML_TEMPLATE, clientes=clientes)
+    clientes, etag = obter_clientes_com_etag()
+    if etag is not None:
+        etag = f"{_VERSAO_TEMPLATE}-{etag}"
+    return _responder_com_etag(etag, lambda: render_template('index.html', clientes=clientes))
+
+@app.route("/api/clientes", methods=["GET"])
+def api_clientes():
+    """Lista de clientes para o dropdown, com ETag"""
+    clientes, etag = obter_clientes_com_etag()
+    return _responder_com_etag(etag, lambda: jsonify(clientes=clientes))
 
 @app.route("/cliente", methods=["POST"])
 def cliente():
@@ -277,94 +100,389 @@ def cliente():
         return "Ação inválida", 400
     return redirect(url_for("index"))
 
+def _validar_destino(campos):
+    """Valida os campos do formulário de upload e devolve os dados do processo"""
+    cliente = campos.get("cliente", "").strip().upper()
+    area = campos.get("area", "").strip().upper()
+    servico = campos.get("servico", "").strip().capitalize()
+    numero_processo = campos.get("numero_processo", "").strip()
+    ano = campos.get("ano", "").strip()
+    referencia = campos.get("referencia", "").strip().upper()
+
+    if not all([cliente, area, servico, numero_processo, ano, referencia]):
+        raise ErroRecebimento("Todos os campos são obrigatórios!")
+
+    if len(numero_processo) != 6 or not numero_processo.isdigit():
+        raise ErroRecebimento("Número do processo inválido")
+
+    if len(ano) != 2 or not ano.isdigit():
+        raise ErroRecebimento("Ano inválido")
+
+    # Verificar se já existe processo com mesmo número, mas com ano, referência ou serviço diferentes
+    processos_existentes = obter_info_processos()
+    for proc in processos_existentes.values():
+        mesmo_processo = (
+            proc['cliente'].upper() == cliente and
+            proc['area'].upper() == area and
+            proc['numero'] == numero_processo
+        )
+        if mesmo_processo:
+            if proc['ano'] != ano:
+                raise ErroRecebimento(
+                    f"Já existe um processo com o número {numero_processo}, mas com o ano '{proc['ano']}'. "
+                    f"Use o mesmo ano para continuar."
+                )
+            if proc['servico'].capitalize() != servico:
+                raise ErroRecebimento(
+                    f"Já existe um processo com o número {numero_processo} e ano {ano}, "
+                    f"mas com o serviço '{proc['servico']}'. "
+                    f"Use o mesmo serviço para continuar."
+                )
+            if proc['referencia'].upper() != referencia.upper():
+                raise ErroRecebimento(
+                    f"Já existe um processo com o número {numero_processo} e ano {ano} "
+                    f"para esse cliente/área/serviço, com referência '{proc['referencia']}'. "
+                    f"Use a mesma referência para evitar duplicação."
+                )
+
+    return cliente, area, servico, numero_processo, ano, referencia
+
+def _preparar_destino(campos):
+    """Valida os campos do formulário de upload e devolve a pasta do processo (criando-a)"""
+    return criar_pasta(*_validar_destino(campos))
+
 @app.route("/upload", methods=["POST"])
 def upload():
+    """
+    Recebe o formulário em fluxo; cada arquivo é gravado num temporário na pasta do processo
+    e enfileirado para confirmação. Responde com o lote, a ser acompanhado em /api/trabalhos.
+    """
+    boundary = request.mimetype_params.get("boundary")
+    if request.mimetype != "multipart/form-data" or not boundary:
+        return jsonify(erro="Envio inválido: esperado multipart/form-data"), 400
+
+    lote = uuid.uuid4().hex
     try:
-        cliente = request.form.get("cliente", "").strip().upper()
-        area = request.form.get("area", "").strip().upper()
-        servico = request.form.get("servico", "").strip().capitalize()
-        numero_processo = request.form.get("numero_processo", "").strip()
-        ano = request.form.get("ano", "").strip()
-        referencia = request.form.get("referencia", "").strip().upper()
-
-        if not all([cliente, area, servico, numero_processo, ano, referencia]):
-            return "Todos os campos são obrigatórios!", 400
-
-        if len(numero_processo) != 6 or not numero_processo.isdigit():
-            return "Número do processo inválido", 400
-
-        if len(ano) != 2 or not ano.isdigit():
-            return "Ano inválido", 400
-
-        # Verificar se já existe processo com mesmo número, mas com ano, referência ou serviço diferentes
-        processos_existentes = obter_info_processos()
-        for proc in processos_existentes.values():
-            mesmo_processo = (
-                proc['cliente'].upper() == cliente and
-                proc['area'].upper() == area and
-                proc['numero'] == numero_processo
-            )
-            if mesmo_processo:
-                if proc['ano'] != ano:
-                    return (
-                        f"Já existe um processo com o número {numero_processo}, mas com o ano '{proc['ano']}'. "
-                        f"Use o mesmo ano para continuar.",
-                        400
-                    )
-                if proc['servico'].capitalize() != servico:
-                    return (
-                        f"Já existe um processo com o número {numero_processo} e ano {ano}, "
-                        f"mas com o serviço '{proc['servico']}'. "
-                        f"Use o mesmo serviço para continuar.",
-                        400
-                    )
-                if proc['referencia'].upper() != referencia.upper():
-                    return (
-                        f"Já existe um processo com o número {numero_processo} e ano {ano} "
-                        f"para esse cliente/área/serviço, com referência '{proc['referencia']}'. "
-                        f"Use a mesma referência para evitar duplicação.",
-                        400
-                    )
-
-        arquivos = request.files.getlist("files")
-        arquivos_para_upload = []
-
-        for file in arquivos:
-            filename = secure_filename(file.filename)
-            temp_path = os.path.join(UPLOAD_FOLDER, filename)
-            file.save(temp_path)
-            arquivos_para_upload.append({
-                "path": temp_path,
-                "name": filename
-            })
-
-        pasta_destino = criar_pasta(cliente, area, servico, numero_processo, ano, referencia)
-
-        if not arquivos_para_upload:
-            return "Nenhum arquivo foi enviado. Pasta criada sem documentos!", 200
-
-        sucesso = copiar_arquivos(pasta_destino, arquivos_para_upload)
-
-        for arq in arquivos_para_upload:
-            if os.path.exists(arq["path"]):
-                os.remove(arq["path"])
-
-        if sucesso:
-            return f"{len(arquivos_para_upload)} arquivo(s) enviado(s) com sucesso!"
-        else:
-            return "Erro ao copiar arquivos", 500
-
+        pasta_destino, trabalhos, erros = receber_multipart(request.stream, boundary, _preparar_destino, lote=lote)
+    except ErroRecebimento as e:
+        return jsonify(erro=str(e)), 400
+    except FilaCheia:
+        raise
     except Exception as e:
-        return f"Erro interno: {str(e)}", 500
+        return jsonify(erro=f"Erro interno: {str(e)}"), 500
+
+    return jsonify(
+        lote=lote,
+        trabalhos=trabalhos,
+        erros=[{"nome": nome, "erro": erro} for nome, erro in erros]
+    ), 202 if trabalhos else 200
+
+def _resumo_trabalho(trabalho):
+    # nome é o pedido no envio; arquivo (no resultado) é o nome com que foi gravado
+    resumo = {"id": trabalho['id'], "nome": trabalho['arquivo'], "situacao": trabalho['situacao']}
+    if trabalho['resultado']:
+        resumo.update(trabalho['resultado'])
+    if trabalho['erro']:
+        resumo['erro'] = trabalho['erro']
+    return resumo
+
+@app.errorhandler(FilaCheia)
+def fila_cheia(e):
+    resposta = jsonify(erro=str(e))
+    resposta.status_code = 503
+    resposta.headers['Retry-After'] = '5'
+    return resposta
+
+@app.route("/api/trabalhos/<id_trabalho>", methods=["GET"])
+def api_trabalho(id_trabalho):
+    """Situação da gravação de um arquivo: na_fila, gravando, concluido ou erro"""
+    trabalho = obter_trabalho(id_trabalho)
+    if trabalho is None:
+        return jsonify(erro="Trabalho não encontrado"), 404
+    return jsonify(_resumo_trabalho(trabalho))
+
+@app.route("/api/trabalhos", methods=["GET"])
+def api_trabalhos():
+    """Situação de todos os arquivos de um envio (?lote=)"""
+    lote = request.args.get("lote", "")
+    if not lote:
+        return jsonify(erro="Informe o lote"), 400
+    return jsonify(trabalhos=[_resumo_trabalho(t) for t in obter_lote(lote)])
+
+def _resumo_sessao(sessao):
+    return {
+        "id": sessao['id'],
+        "nome": sessao['nome'],
+        "tamanho": sessao['tamanho'],
+        "tamanho_bloco": sessao['tamanho_bloco'],
+        "total_blocos": sessao['total_blocos'],
+        "recebidos": sessao['recebidos'],
+        "faltando": sessao['faltando']
+    }
+
+@app.errorhandler(SessaoNaoEncontrada)
+def sessao_nao_encontrada(e):
+    return jsonify(erro=str(e)), 404
+
+@app.errorhandler(ArquivoGrandeDemais)
+def arquivo_grande_demais(e):
+    return jsonify(erro=str(e)), 413
+
+@app.errorhandler(SessaoFinalizada)
+def sessao_finalizada(e):
+    return jsonify(erro=str(e)), 409
+
+@app.errorhandler(ErroRecebimento)
+def erro_recebimento(e):
+    return jsonify(erro=str(e)), 400
+
+@app.route("/api/uploads", methods=["POST"])
+def api_criar_upload():
+    """Abre uma sessão de upload em partes para um arquivo grande"""
+    dados = request.get_json(silent=True) or {}
+    try:
+        tamanho = int(dados.get("tamanho", -1))
+    except (TypeError, ValueError):
+        return jsonify(erro="Tamanho inválido"), 400
+    pasta_destino = _preparar_destino(dados)
+    sessao = criar_sessao(pasta_destino, dados.get("nome", ""), tamanho)
+    return jsonify(_resumo_sessao(sessao)), 201
+
+@app.route("/api/uploads/<id_sessao>", methods=["GET"])
+def api_status_upload(id_sessao):
+    """Blocos já recebidos, para retomar um envio interrompido"""
+    return jsonify(_resumo_sessao(obter_sessao(id_sessao)))
+
+@app.route("/api/uploads/<id_sessao>/blocos/<int:indice>", methods=["PUT"])
+def api_enviar_bloco(id_sessao, indice):
+    gravar_bloco(id_sessao, indice, request.stream)
+    return "", 204
+
+@app.route("/api/uploads/<id_sessao>/finalizar", methods=["POST"])
+def api_finalizar_upload(id_sessao):
+    """Agenda a confirmação do arquivo; o resultado é acompanhado em /api/trabalhos/<id>"""
+    return jsonify(trabalho=finalizar_sessao(id_sessao)), 202
+
+@app.route("/api/uploads/<id_sessao>", methods=["DELETE"])
+def api_cancelar_upload(id_sessao):
+    cancelar_sessao(id_sessao)
+    return "", 204
+
+@app.route("/api/upload/check", methods=["POST"])
+def api_verificar_upload():
+    """Recebe nome, tamanho e SHA-256 dos arquivos e informa quais não precisam ser enviados"""
+    dados = request.get_json(silent=True) or {}
+    arquivos = dados.get("arquivos")
+    if not isinstance(arquivos, list):
+        return jsonify(erro="Lista de arquivos ausente"), 400
+    pasta_destino = caminho_pasta_processo(*_validar_destino(dados))
+    return jsonify(arquivos=verificar_arquivos(pasta_destino, arquivos))
+
+@app.route("/api/upload/vincular", methods=["POST"])
+def api_aproveitar_upload():
+    """Grava na pasta do processo os arquivos 'disponivel' a partir da cópia que já está no servidor"""
+    dados = request.get_json(silent=True) or {}
+    arquivos = dados.get("arquivos")
+    if not isinstance(arquivos, list):
+        return jsonify(erro="Lista de arquivos ausente"), 400
+    pasta_destino = _preparar_destino(dados)
+    aproveitados, faltando = aproveitar_arquivos(pasta_destino, arquivos)
+    return jsonify(aproveitados=aproveitados, faltando=faltando)
 
 @app.route("/busca", methods=["GET"])
 def busca():
-    return "Busca Avançada ainda não implementada nesta interface web."
+    return render_template('busca.html')
+
+def _codificar_cursor(ordenar_por, decrescente, chave):
+    bruto = json.dumps([ordenar_por, decrescente, list(chave)], ensure_ascii=False).encode('utf-8')
+    return base64.urlsafe_b64encode(bruto).decode('ascii')
+
+def _decodificar_cursor(cursor):
+    """(ordenar_por, decrescente, chave) do cursor; ValueError se ele não tiver esse formato"""
+    ordenar_por, decrescente, chave = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+    if not isinstance(ordenar_por, str) or not isinstance(decrescente, bool) or not chave_ordenacao_valida(chave):
+        raise ValueError("Cursor inválido")
+    return ordenar_por, decrescente, tuple(chave)
+
+def _resumo_processo(dados):
+    return {
+        "id": chave_de_registro(dados),
+        "numero": dados['numero'],
+        "cliente": dados['cliente'],
+        "area": dados['area'],
+        "servico": dados['servico'],
+        "ano": dados['ano'],
+        "referencia": dados['referencia']
+    }
+
+@app.route("/api/processos", methods=["GET"])
+def api_processos():
+    """Busca de processos com os mesmos filtros da TelaBusca, paginada por cursor"""
+    filtros = {campo: request.args.get(campo, "").strip() for campo in CAMPOS_FILTRO}
+    ordenar_por = request.args.get("ordenar", "numero").strip().lower()
+    decrescente = request.args.get("ordem", "asc").strip().lower() == "desc"
+
+    if ordenar_por not in COLUNAS_ORDENACAO:
+        return jsonify(erro=f"Coluna de ordenação inválida: {ordenar_por}"), 400
+
+    try:
+        limite = int(request.args.get("limite", LIMITE_PADRAO))
+    except ValueError:
+        return jsonify(erro="Limite inválido"), 400
+    limite = max(1, min(limite, LIMITE_MAXIMO))
+
+    apos = None
+    cursor = request.args.get("cursor")
+    if cursor:
+        try:
+            cursor_ordenar, cursor_decrescente, apos = _decodificar_cursor(cursor)
+        except Exception:
+            return jsonify(erro="Cursor inválido"), 400
+        if cursor_ordenar != ordenar_por or cursor_decrescente != decrescente:
+            return jsonify(erro="O cursor não corresponde à ordenação pedida"), 400
+
+    # A resposta só muda quando o catálogo muda. A geração do índice é a mesma em todos os
+    # workers, então o 304 vale qualquer que seja o worker; sem ela, a versão local deste
+    geracao = geracao_catalogo()
+    versao = f"g{geracao}" if geracao is not None else f"{_INSTANCIA}|{versao_catalogo()}"
+    etag = hashlib.sha1(f"{versao}|{request.query_string.decode('utf-8', 'replace')}".encode('utf-8')).hexdigest()
+    if request.if_none_match.contains(etag):
+        resposta = app.response_class(status=304)
+        resposta.set_etag(etag)
+        return resposta
+
+    # Um item a mais indica se existe próxima página
+    pagina, total = consultar(filtros, ordenar_por, decrescente, limite=limite + 1, apos=apos)
+    proximo_cursor = None
+    if len(pagina) > limite:
+        pagina = pagina[:limite]
+        proximo_cursor = _codificar_cursor(ordenar_por, decrescente, chave_ordenacao(pagina[-1], ordenar_por))
+
+    resposta = jsonify(
+        processos=[_resumo_processo(dados) for dados in pagina],
+        total=total,
+        proximo_cursor=proximo_cursor
+    )
+    resposta.set_etag(etag)
+    resposta.headers['Cache-Control'] = 'no-cache'
+    return resposta
+
+@app.route("/api/texto", methods=["GET"])
+def api_busca_texto():
+    """Processos cujos documentos contêm o texto pedido (?q=), com os mesmos filtros de /api/processos"""
+    consulta = request.args.get("q", "").strip()
+    if not consulta:
+        return jsonify(erro="Informe o texto a buscar"), 400
+    filtros = {campo: request.args.get(campo, "").strip() for campo in CAMPOS_FILTRO}
+    try:
+        limite = int(request.args.get("limite", LIMITE_MAXIMO))
+    except ValueError:
+        return jsonify(erro="Limite inválido"), 400
+    limite = max(1, min(limite, LIMITE_MAXIMO))
+
+    return jsonify(processos=[
+        dict(_resumo_processo(dados), documentos=[{
+            "arquivo": os.path.relpath(documento['caminho'], dados['caminho']),
+            "trecho": documento['trecho'],
+            "previa": previsualizavel(documento['caminho'])
+        } for documento in documentos])
+        for dados, documentos in consultar_texto(consulta, filtros, limite)
+    ])
+
+def _arquivo_do_processo(id_processo, relativo):
+    """Caminho absoluto de um arquivo da pasta do processo; 404 se o processo não existe ou o caminho sai da pasta"""
+    dados = obter_processos().get(id_processo)
+    if dados is None:
+        abort(404)
+    pasta = os.path.normpath(dados['caminho'])
+    caminho = os.path.normpath(os.path.join(pasta, relativo))
+    if os.path.commonpath([pasta, caminho]) != pasta or caminho == pasta:
+        abort(404)
+    return caminho
+
+@app.route("/api/processos/<id_processo>/arquivos", methods=["GET"])
+def api_arquivos_processo(id_processo):
+    """Arquivos da pasta do processo (com subpastas), com tamanho, data e tipo, paginados por cursor"""
+    dados = obter_processos().get(id_processo)
+    if dados is None:
+        return jsonify(erro="Processo não encontrado"), 404
+
+    try:
+        limite = int(request.args.get("limite", LIMITE_MAXIMO))
+    except ValueError:
+        return jsonify(erro="Limite inválido"), 400
+    limite = max(1, min(limite, LIMITE_MAXIMO))
+
+    apos = None
+    cursor = request.args.get("cursor")
+    if cursor:
+        try:
+            apos = base64.urlsafe_b64decode(cursor.encode('ascii')).decode('utf-8')
+        except Exception:
+            return jsonify(erro="Cursor inválido"), 400
+
+    try:
+        arquivos, versao = listar_arquivos(dados['caminho'])
+    except OSError as e:
+        return jsonify(erro=f"Não foi possível ler a pasta do processo: {str(e)}"), 503
+
+    # A resposta só muda quando alguma pasta do processo muda
+    etag = hashlib.sha1(f"{versao}|{request.query_string.decode('utf-8', 'replace')}".encode('utf-8')).hexdigest()
+
+    def gerar():
+        inicio = posicao_apos(arquivos, apos) if apos else 0
+        pagina = arquivos[inicio:inicio + limite]
+        proximo_cursor = None
+        if inicio + limite < len(arquivos):
+            proximo_cursor = base64.urlsafe_b64encode(pagina[-1]['arquivo'].encode('utf-8')).decode('ascii')
+        return jsonify(
+            processo=_resumo_processo(dados),
+            arquivos=[{campo: item[campo] for campo in ('arquivo', 'tamanho', 'modificado', 'tipo', 'previa')}
+                      for item in pagina],
+            total=len(arquivos),
+            proximo_cursor=proximo_cursor
+        )
+
+    return _responder_com_etag(etag, gerar)
+
+@app.route("/api/processos/<id_processo>/miniatura/<path:arquivo>", methods=["GET"])
+def api_miniatura(id_processo, arquivo):
+    """Miniatura da primeira página de um PDF ou imagem do processo, gerada só na primeira vez"""
+    caminho = _arquivo_do_processo(id_processo, arquivo)
+    if not os.path.isfile(caminho):
+        abort(404)
+    miniatura = obter_miniatura(caminho)
+    if miniatura is None:
+        abort(404)
+    resposta = send_file(miniatura, mimetype='image/jpeg', conditional=True,
+                         etag=os.path.splitext(os.path.basename(miniatura))[0])
+    resposta.headers['Cache-Control'] = CACHE_MINIATURA
+    return resposta
 
 # Rota para servir arquivos estáticos (ícone de remover)
 @app.route('/static/<path:filename>')
 def serve_static(filename):
-    return send_from_directory(STATIC_FOLDER, filename)
+    """Serve da memória, já comprimido; com ?v= igual à versão atual o navegador guarda por um ano"""
+    ativo = obter_ativo(STATIC_FOLDER, filename)
+    if ativo is None:
+        abort(404)
+    codificacao = escolher_codificacao(ativo, request.accept_encodings)
+    etag = f"{ativo['versao']}-{codificacao}"
+    if request.if_none_match.contains(etag):
+        resposta = app.response_class(status=304)
+    else:
+        resposta = app.response_class(ativo['codificacoes'][codificacao], mimetype=ativo['tipo'])
+        if codificacao != 'identity':
+            resposta.headers['Content-Encoding'] = codificacao
+    resposta.set_etag(etag)
+    resposta.vary.add('Accept-Encoding')
+    if request.args.get('v') == ativo['versao']:
+        resposta.headers['Cache-Control'] = CACHE_VERSIONADO
+    else:
+        resposta.headers['Cache-Control'] = 'no-cache'
+    return resposta
 
 if __name__ == "__main__":
-    app.run(debug=True, port=5001)
\ No newline at end of file
+    # Apenas para desenvolvimento; em produção use servidor.py
+    app.run(debug=config.getboolean('SERVIDOR', 'debug', fallback=False),
+            port=config.getint('SERVIDOR', 'porta', fallback=5001), threaded=True)
\ No newline at end of file
@@ -1,13 +1,32 @@
+import os
+import queue
+import logging
+import threading
 import tkinter as tk
 from tkinter import ttk, messagebox
 from logica import obter_info_processos, abrir_pasta_processo
+from motor_busca import consultar, consultar_texto, chave_ordenacao, clientes_com_processos
+from miniaturas import obter_miniatura, previsualizavel
+
+try:
+    from PIL import Image, ImageTk
+    HAS_PIL = True
+except ImportError:
+    HAS_PIL = False
+
+# Miniaturas mostradas do processo selecionado
+MAX_PREVIAS = 8
+TAMANHO_PREVIA = 96
+INTERVALO_PREVIAS = 100
+# Consultas à fila antes de desistir das miniaturas de um processo (30 s)
+MAX_CONSULTAS_PREVIAS = 300
 
 class TelaBusca:
     def __init__(self, root):
         self.root = root
         self.janela = tk.Toplevel(root)
         self.janela.title("Busca Avançada")
-        self.janela.geometry("900x600")
+        self.janela.geometry("900x720")
         self.janela.minsize(800, 500)
         
         # Variáveis para paginação
@@ -17,6 +36,14 @@ class TelaBusca:
         self.ordenacao_coluna = None
         self.ordenacao_reversa = False
         
+        # Pré-visualização: as miniaturas são geradas numa thread e chegam pela fila
+        self.dados_linhas = {}
+        self.fila_previas = queue.Queue()
+        self.geracao_previas = 0
+        self.after_previas = None
+        self.consultas_previas = 0
+        self.imagens_previa = []
+        
         self.criar_interface()
 
     def criar_interface(self):
@@ -39,6 +66,7 @@ class TelaBusca:
         self.area_var = tk.StringVar()
         self.servico_var = tk.StringVar()
         self.referencia_var = tk.StringVar()
+        self.texto_var = tk.StringVar()
         
         # Componentes dos filtros
         ttk.Label(frame_filtros, text="Cliente:").grid(row=0, column=0, sticky="w", pady=2)
@@ -64,6 +92,9 @@ class TelaBusca:
         ttk.Label(frame_filtros, text="Referência:").grid(row=5, column=0, sticky="w", pady=2)
         ttk.Entry(frame_filtros, textvariable=self.referencia_var).grid(row=5, column=1, sticky="ew", padx=5, pady=2)
         
+        ttk.Label(frame_filtros, text="Texto nos documentos:").grid(row=6, column=0, sticky="w", pady=2)
+        ttk.Entry(frame_filtros, textvariable=self.texto_var).grid(row=6, column=1, sticky="ew", padx=5, pady=2)
+        
         # Frame de botões
         frame_botoes = ttk.Frame(main_frame)
         frame_botoes.pack(fill="x", pady=5)
@@ -112,6 +143,14 @@ class TelaBusca:
         # Botão duplo-clique
         self.tree.bind("<Double-1>", self.abrir_pasta_selecionada)
         
+        # Miniaturas dos documentos do processo selecionado
+        if HAS_PIL:
+            self.frame_previas = ttk.LabelFrame(main_frame, text="Pré-visualização", padding=5)
+            self.frame_previas.pack(fill="x", pady=(10, 0))
+            self.label_previas = ttk.Label(self.frame_previas, text="Selecione um processo")
+            self.label_previas.pack(side="left")
+            self.tree.bind("<<TreeviewSelect>>", self.mostrar_previas)
+        
         # Controles de paginação
         self.criar_controles_paginacao(main_frame)
         
@@ -145,23 +184,15 @@ class TelaBusca:
         ttk.Button(frame_paginacao, text="Última ⏭", command=self.ultima_pagina).pack(side="left", padx=5)
 
     def ordenar_por_coluna(self, coluna):
-        """Ordena os resultados pela coluna clicada"""
+        """Ordena todos os resultados (não só a página atual) pela coluna clicada"""
         if self.ordenacao_coluna == coluna:
             self.ordenacao_reversa = not self.ordenacao_reversa
         else:
             self.ordenacao_coluna = coluna
             self.ordenacao_reversa = False
         
-        items = [(self.tree.set(child, coluna), child) for child in self.tree.get_children('')]
-        
-        # Ordenação especial para coluna numérica
-        if coluna == "Numero":
-            items.sort(key=lambda x: int(x[0]), reverse=self.ordenacao_reversa)
-        else:
-            items.sort(reverse=self.ordenacao_reversa)
-        
-        for index, (val, child) in enumerate(items):
-            self.tree.move(child, '', index)
+        self.pagina_atual = 1
+        self.executar_busca()
 
     def atualizar_itens_por_pagina(self, event=None):
         self.itens_por_pagina = int(self.combo_paginacao.get())
@@ -177,19 +208,20 @@ class TelaBusca:
             self.pagina_atual -= 1
             self.executar_busca()
 
+    def total_paginas(self):
+        return max(1, (self.total_processos + self.itens_por_pagina - 1) // self.itens_por_pagina)
+
     def proxima_pagina(self):
-        if self.pagina_atual < (self.total_processos // self.itens_por_pagina) + 1:
+        if self.pagina_atual < self.total_paginas():
             self.pagina_atual += 1
             self.executar_busca()
 
     def ultima_pagina(self):
-        self.pagina_atual = (self.total_processos // self.itens_por_pagina) + 1
+        self.pagina_atual = self.total_paginas()
         self.executar_busca()
 
     def atualizar_lista_clientes(self):
-        processos = obter_info_processos()
-        clientes = sorted({dados['cliente'] for dados in processos.values()}, key=str.lower)
-        self.cliente_combobox['values'] = clientes
+        self.cliente_combobox['values'] = clientes_com_processos()
 
     def abrir_pasta_selecionada(self, event):
         item = self.tree.selection()[0]
@@ -200,9 +232,97 @@ class TelaBusca:
         processos = obter_info_processos()
         for proc in processos.values():
             if proc['numero'] == numero_processo and proc['area'] == area:
-                abrir_pasta_processo(proc['caminho'])
+                if not abrir_pasta_processo(proc['caminho']):
+                    messagebox.showerror("Erro", f"Não foi possível abrir a pasta: {proc['caminho']}")
                 break
 
+    def mostrar_previas(self, event=None):
+        """Troca as miniaturas pelas do processo selecionado (documentos encontrados na busca por texto primeiro)"""
+        selecao = self.tree.selection()
+        if not selecao or selecao[0] not in self.dados_linhas:
+            return
+        dados, documentos = self.dados_linhas[selecao[0]]
+        self._reiniciar_previas("Carregando...")
+        threading.Thread(
+            target=self._gerar_previas, args=(self.geracao_previas, dados['caminho'], documentos),
+            name="previas", daemon=True
+        ).start()
+        self.after_previas = self.janela.after(INTERVALO_PREVIAS, self._acompanhar_previas)
+
+    def _reiniciar_previas(self, texto):
+        """Descarta as miniaturas mostradas e as que ainda estão a caminho"""
+        if self.after_previas is not None:
+            self.janela.after_cancel(self.after_previas)
+            self.after_previas = None
+        self.consultas_previas = 0
+        self.geracao_previas += 1
+        self._limpar_previas()
+        self.label_previas.config(text=texto)
+        self.label_previas.pack(side="left")
+
+    def _limpar_previas(self):
+        for widget in self.frame_previas.winfo_children():
+            if widget is not self.label_previas:
+                widget.destroy()
+        self.imagens_previa = []
+
+    def _gerar_previas(self, geracao, pasta, documentos):
+        """Roda fora da thread do Tk: gera (ou lê do cache) as miniaturas e publica na fila"""
+        try:
+            caminhos = [c for c in documentos if previsualizavel(c)]
+            if len(caminhos) < MAX_PREVIAS:
+                with os.scandir(pasta) as entradas:
+                    nomes = sorted(e.name for e in entradas
+                                   if not e.name.startswith('.') and e.is_file() and previsualizavel(e.name))
+                caminhos += [os.path.join(pasta, nome) for nome in nomes if os.path.join(pasta, nome) not in caminhos]
+            for caminho in caminhos[:MAX_PREVIAS]:
+                if geracao != self.geracao_previas:
+                    return
+                miniatura = obter_miniatura(caminho)
+                if miniatura is not None:
+                    self.fila_previas.put((geracao, caminho, miniatura))
+        except OSError as e:
+            logging.error(f"Erro ao listar {pasta} para a pré-visualização: {str(e)}")
+        finally:
+            self.fila_previas.put((geracao, None, None))
+
+    def _acompanhar_previas(self):
+        """Mostra as miniaturas que já chegaram; duplo clique abre o documento"""
+        self.after_previas = None
+        try:
+            while True:
+                geracao, caminho, miniatura = self.fila_previas.get_nowait()
+                if geracao != self.geracao_previas:
+                    continue
+                if caminho is None:
+                    if not self.imagens_previa:
+                        self.label_previas.config(text="Nenhum documento com pré-visualização")
+                    return
+                self.label_previas.pack_forget()
+                with Image.open(miniatura) as imagem:
+                    imagem.thumbnail((TAMANHO_PREVIA, TAMANHO_PREVIA))
+                    foto = ImageTk.PhotoImage(imagem)
+                self.imagens_previa.append(foto)
+                nome = os.path.basename(caminho)
+                rotulo = ttk.Label(self.frame_previas, image=foto, compound="top",
+                                   text=nome if len(nome) <= 16 else nome[:15] + "…")
+                rotulo.pack(side="left", padx=4)
+                rotulo.bind("<Double-1>", lambda e, c=caminho: self.abrir_documento(c))
+        except queue.Empty:
+            pass
+        self.consultas_previas += 1
+        if self.consultas_previas >= MAX_CONSULTAS_PREVIAS:
+            # A thread continua até o fim, mas o que ela publicar depois é descartado
+            self.geracao_previas += 1
+            if not self.imagens_previa:
+                self.label_previas.config(text="Pré-visualização indisponível no momento")
+            return
+        self.after_previas = self.janela.after(INTERVALO_PREVIAS, self._acompanhar_previas)
+
+    def abrir_documento(self, caminho):
+        if not abrir_pasta_processo(caminho):
+            messagebox.showerror("Erro", f"Não foi possível abrir o arquivo: {caminho}")
+
     def executar_busca(self):
         filtros = {
             'cliente': self.cliente_var.get().strip(),
@@ -213,30 +333,47 @@ class TelaBusca:
             'referencia': self.referencia_var.get().strip()
         }
         
-        resultados = self.buscar_processos(**filtros)
-        self.total_processos = len(resultados)
-        
-        # Aplicar paginação
+        # Paginação e ordenação feitas pelo motor de busca sobre o resultado completo
         inicio = (self.pagina_atual - 1) * self.itens_por_pagina
-        fim = inicio + self.itens_por_pagina
-        resultados_paginados = resultados[inicio:fim]
+        texto = self.texto_var.get().strip()
+        if texto:
+            # Busca no conteúdo dos documentos: por relevância, salvo se uma coluna foi escolhida
+            resultados = [(dados, [d['caminho'] for d in documentos])
+                          for dados, documentos in consultar_texto(texto, filtros)]
+            if self.ordenacao_coluna:
+                resultados.sort(key=lambda item: chave_ordenacao(item[0], self.ordenacao_coluna.lower()),
+                                reverse=self.ordenacao_reversa)
+            self.total_processos = len(resultados)
+            resultados_paginados = resultados[inicio:inicio + self.itens_por_pagina]
+        else:
+            resultados, self.total_processos = consultar(
+                filtros,
+                ordenar_por=(self.ordenacao_coluna or "Numero").lower(),
+                decrescente=self.ordenacao_reversa,
+                inicio=inicio,
+                limite=self.itens_por_pagina
+            )
+            resultados_paginados = [(dados, []) for dados in resultados]
         
         # Atualizar exibição
         self.tree.delete(*self.tree.get_children())
-        for num, dados in resultados_paginados:
-            self.tree.insert("", "end", values=(
-                num,
+        self.dados_linhas = {}
+        if HAS_PIL:
+            self._reiniciar_previas("Selecione um processo")
+        for dados, documentos in resultados_paginados:
+            linha = self.tree.insert("", "end", values=(
+                dados['numero'],
                 dados['cliente'],
                 dados['area'],
                 dados['servico'],
                 dados['ano'],
                 dados['referencia']
             ))
+            self.dados_linhas[linha] = (dados, documentos)
         
         # Atualizar label de paginação
-        total_paginas = max(1, (self.total_processos + self.itens_por_pagina - 1) // self.itens_por_pagina)
         self.label_paginacao.config(
-            text=f"Página {self.pagina_atual} de {total_paginas} - Total: {self.total_processos} processos"
+            text=f"Página {self.pagina_atual} de {self.total_paginas()} - Total: {self.total_processos} processos"
         )
 
     def limpar_filtros(self):
@@ -246,39 +383,18 @@ class TelaBusca:
         self.area_var.set("")
         self.servico_var.set("")
         self.referencia_var.set("")
+        self.texto_var.set("")
         self.tree.delete(*self.tree.get_children())
+        self.dados_linhas = {}
+        if HAS_PIL:
+            self._reiniciar_previas("Selecione um processo")
         self.pagina_atual = 1
         self.label_paginacao.config(text="")
 
     @staticmethod
     def buscar_processos(cliente="", numero="", ano="", area="", servico="", referencia=""):
-        processos = obter_info_processos()
-        resultados = []
-        
-        for id_proc, dados in processos.items():
-            match = True
-            
-            if cliente and cliente.upper() not in dados['cliente'].upper():
-                match = False
-            
-            if numero and numero not in dados['numero']:
-                match = False
-            
-            if ano and ano != dados['ano']:
-                match = False
-            
-            if area and area != dados['area']:
-                match = False
-            
-            if servico and servico != dados['servico']:
-                match = False
-            
-            if referencia and referencia.upper() not in dados['referencia'].upper():
-                match = False
-                
-            if match:
-                resultados.append((dados['numero'], dados))
-        
-        # Ordenar por número e depois por área
-        resultados.sort(key=lambda x: (x[0], x[1]['area']))
-        return resultados
\ No newline at end of file
+        filtros = {'cliente': cliente, 'numero': numero, 'ano': ano,
+                   'area': area, 'servico': servico, 'referencia': referencia}
+        # Ordenado por número e depois por área
+        resultados, _ = consultar(filtros)
+        return [(dados['numero'], dados) for dados in resultados]
\ No newline at end of file
@@ -0,0 +1,334 @@
+import os
+import sys
+import time
+import struct
+import ctypes
+import ctypes.util
+import select
+import logging
+from threading import Lock, Thread, Event
+from configparser import ConfigParser
+from indice_processos import (
+    BASE_DIR, INTERVALO_SINCRONIZACAO, carregar_processos, interpretar_pasta, registrar_processo, remover_processo,
+    registro_de_caminho, sincronizar_indice, iniciar_sincronizacao_periodica, parar_sincronizacao_periodica,
+    geracao_indice
+)
+
+# Carregar configurações
+config = ConfigParser()
+config.read('config.ini')
+
+# polling (padrão, funciona em compartilhamentos de rede), inotify (Linux, disco local) ou auto
+MODO_OBSERVADOR = config.get('INDICE', 'observador', fallback='polling').strip().lower()
+# Com inotify, segundos entre as conferências de mudanças gravadas no índice por outros processos
+INTERVALO_GERACAO = 5
+
+
+class CatalogoProcessos:
+    """
+    Catálogo em memória dos processos, carregado do índice persistente.
+
+    As alterações substituem o dicionário inteiro (copy-on-write), então a leitura
+    não tem custo nem precisa de lock: quem chama recebe um dicionário que não muda.
+
+    geracao é a geração do índice (compartilhada entre processos) que o catálogo reflete;
+    quando a do índice passa à frente, outro processo gravou algo e o catálogo é relido.
+    """
+
+    def __init__(self):
+        self._lock = Lock()
+        self._processos = {}
+        self._chave_por_caminho = {}
+        self._carregado = False
+        self.versao = 0
+        self.geracao = None
+
+    def recarregar(self, *args):
+        """Relê todos os processos do índice persistente"""
+        # Lida antes dos processos: uma gravação no meio faz a próxima conferência reler
+        geracao = geracao_indice()
+        processos = carregar_processos()
+        with self._lock:
+            self._processos = processos
+            self._chave_por_caminho = {dados['caminho']: chave for chave, dados in processos.items()}
+            self._carregado = True
+            self.geracao = geracao
+            self.versao += 1
+
+    def recarregar_se_mudou(self):
+        """Relê o catálogo se o índice foi alterado (por este ou outro processo) desde a última leitura"""
+        if geracao_indice() != self.geracao:
+            self.recarregar()
+            return True
+        return False
+
+    def _acompanhar_geracao(self, geracao):
+        if geracao is None:
+            return
+        # A gravação deste processo foi a única desde a última leitura: o catálogo continua em dia.
+        # Senão ele já não corresponde a nenhuma geração, até a próxima conferência reler tudo
+        if self.geracao is not None and geracao == self.geracao + 1:
+            self.geracao = geracao
+        else:
+            self.geracao = None
+
+    def processos(self):
+        """Retorna o dicionário atual de processos (não deve ser alterado por quem chama)"""
+        if not self._carregado:
+            self.recarregar()
+        return self._processos
+
+    def adicionar(self, chave, dados, geracao=None):
+        self.processos()
+        with self._lock:
+            self._acompanhar_geracao(geracao)
+            novos = dict(self._processos)
+            anterior = novos.get(chave)
+            if anterior:
+                self._chave_por_caminho.pop(anterior['caminho'], None)
+            novos[chave] = dados
+            self._chave_por_caminho[dados['caminho']] = chave
+            self._processos = novos
+            self.versao += 1
+
+    def remover(self, caminho, geracao=None):
+        self.processos()
+        with self._lock:
+            self._acompanhar_geracao(geracao)
+            chave = self._chave_por_caminho.pop(caminho, None)
+            if chave is None:
+                return False
+            novos = dict(self._processos)
+            novos.pop(chave, None)
+            self._processos = novos
+            self.versao += 1
+            return True
+
+
+_catalogo = CatalogoProcessos()
+
+
+def obter_processos():
+    """Processos atuais no formato {chave: dados}, sem varrer o BASE_DIR"""
+    return _catalogo.processos()
+
+
+def versao_catalogo():
+    """Contador incrementado a cada alteração do catálogo"""
+    _catalogo.processos()
+    return _catalogo.versao
+
+
+def geracao_catalogo():
+    """
+    Geração do índice que o catálogo deste processo reflete; igual em todos os processos
+    que carregaram o mesmo índice. None enquanto o catálogo tiver alterações ainda não conferidas.
+    """
+    _catalogo.processos()
+    return _catalogo.geracao
+
+
+def registrar_pasta(caminho):
+    """
+    Registra uma pasta de processo (criada ou renomeada) no índice e no catálogo. Se o
+    catálogo já a tem assim (envio para um processo existente), não grava nada.
+    """
+    partes = interpretar_pasta(os.path.basename(caminho))
+    if not partes:
+        return None
+    chave, dados = registro_de_caminho(caminho)
+    if obter_processos().get(chave) == dados:
+        return chave
+    sigla_area, sigla_servico, numero, ano, referencia = partes
+    cliente = os.path.basename(os.path.dirname(caminho))
+    geracao = registrar_processo(numero, sigla_area, sigla_servico, ano, cliente, referencia, caminho)
+    _catalogo.adicionar(chave, dados, geracao)
+    return chave
+
+
+def remover_pasta(caminho):
+    """Remove uma pasta de processo (apagada ou renomeada) do índice e do catálogo"""
+    geracao = remover_processo(caminho)
+    return _catalogo.remover(caminho, geracao)
+
+
+def ressincronizar():
+    """Reconcilia o índice com o disco e recarrega o catálogo"""
+    sincronizar_indice()
+    _catalogo.recarregar()
+
+
+# --- Observador via inotify (Linux) ---
+
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_ISDIR = 0x40000000
+
+_MASCARA = IN_CREATE | IN_DELETE | IN_MOVED_FROM | IN_MOVED_TO | IN_DELETE_SELF | IN_MOVE_SELF | IN_ONLYDIR
+_EVENTO = struct.Struct('iIII')
+
+
+def _carregar_libc():
+    if not sys.platform.startswith('linux'):
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        libc.inotify_init1
+        return libc
+    except (OSError, AttributeError):
+        return None
+
+
+class ObservadorInotify:
+    """Aplica ao catálogo as criações, renomeações e exclusões de pastas em BASE_DIR/<area>/<cliente>"""
+
+    def __init__(self, libc):
+        self.libc = libc
+        self.fd = None
+        self.watches = {}  # wd -> (caminho, nivel)
+        self._parar = Event()
+        self.thread = None
+
+    def _observar(self, caminho, nivel):
+        wd = self.libc.inotify_add_watch(self.fd, os.fsencode(caminho), _MASCARA)
+        if wd < 0:
+            logging.error(f"inotify_add_watch falhou para {caminho}: errno {ctypes.get_errno()}")
+            return
+        self.watches[wd] = (caminho, nivel)
+
+    def _observar_area(self, area_path):
+        self._observar(area_path, 'area')
+        try:
+            for entry in os.scandir(area_path):
+                if entry.is_dir():
+                    self._observar(entry.path, 'cliente')
+        except OSError as e:
+            logging.error(f"Erro ao listar área {area_path}: {str(e)}")
+
+    def iniciar(self):
+        self.fd = self.libc.inotify_init1(os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError("inotify_init1 falhou")
+        self._observar(BASE_DIR, 'base')
+        for entry in os.scandir(BASE_DIR):
+            if entry.is_dir():
+                self._observar_area(entry.path)
+        # Pastas criadas antes dos watches estarem ativos
+        ressincronizar()
+        self.thread = Thread(target=self._executar, name="observador-processos", daemon=True)
+        self.thread.start()
+
+    def parar(self):
+        self._parar.set()
+
+    def _executar(self):
+        conferido = time.monotonic()
+        try:
+            while not self._parar.is_set():
+                prontos, _, _ = select.select([self.fd], [], [], 1.0)
+                if time.monotonic() - conferido >= INTERVALO_GERACAO:
+                    # O inotify só vê este computador; pastas registradas por outros processos vêm do índice
+                    conferido = time.monotonic()
+                    try:
+                        _catalogo.recarregar_se_mudou()
+                    except Exception as e:
+                        logging.error(f"Erro ao conferir o índice de processos: {str(e)}")
+                if not prontos:
+                    continue
+                dados = os.read(self.fd, 64 * 1024)
+                try:
+                    self._tratar_eventos(dados)
+                except Exception as e:
+                    logging.error(f"Erro ao tratar eventos do observador: {str(e)}")
+        finally:
+            os.close(self.fd)
+
+    def _tratar_eventos(self, dados):
+        ressincronizar_depois = False
+        deslocamento = 0
+        while deslocamento < len(dados):
+            wd, mascara, _, tamanho = _EVENTO.unpack_from(dados, deslocamento)
+            nome = dados[deslocamento + _EVENTO.size:deslocamento + _EVENTO.size + tamanho].rstrip(b'\0')
+            deslocamento += _EVENTO.size + tamanho
+
+            if mascara & IN_Q_OVERFLOW:
+                ressincronizar_depois = True
+                continue
+            if mascara & IN_IGNORED:
+                self.watches.pop(wd, None)
+                continue
+            if wd not in self.watches or not (mascara & IN_ISDIR):
+                continue
+
+            pai, nivel = self.watches[wd]
+            caminho = os.path.join(pai, os.fsdecode(nome))
+            criado = mascara & (IN_CREATE | IN_MOVED_TO)
+            removido = mascara & (IN_DELETE | IN_MOVED_FROM)
+
+            if nivel == 'cliente':
+                if criado:
+                    registrar_pasta(caminho)
+                elif removido:
+                    remover_pasta(caminho)
+            elif criado:
+                # Nova área ou novo cliente: passa a observar e relê o que já existir dentro
+                if nivel == 'base':
+                    self._observar_area(caminho)
+                else:
+                    self._observar(caminho, 'cliente')
+                ressincronizar_depois = True
+            elif removido:
+                ressincronizar_depois = True
+
+        if ressincronizar_depois:
+            ressincronizar()
+
+
+_observador = None
+
+
+def iniciar_observador(modo=None):
+    """
+    Mantém o catálogo em dia com o disco.
+
+    No modo inotify os eventos do kernel são aplicados na hora; no modo polling
+    (compartilhamentos de rede, Windows) a sincronização incremental do índice roda
+    periodicamente. Nos dois modos o catálogo é recarregado quando a geração do índice
+    muda, não importa qual processo gravou a mudança.
+    """
+    global _observador
+    if _observador is not None:
+        return _observador
+
+    modo = (modo or MODO_OBSERVADOR)
+    libc = _carregar_libc() if modo in ('auto', 'inotify') else None
+    if libc is not None and os.path.isdir(BASE_DIR):
+        try:
+            _observador = ObservadorInotify(libc)
+            _observador.iniciar()
+            logging.info("Observador de pastas ativo (inotify)")
+            return _observador
+        except Exception as e:
+            logging.warning(f"inotify indisponível, usando polling: {str(e)}")
+            _observador = None
+
+    _observador = iniciar_sincronizacao_periodica(INTERVALO_SINCRONIZACAO, ao_sincronizar=_catalogo.recarregar_se_mudou)
+    logging.info("Observador de pastas ativo (polling)")
+    return _observador
+
+
+def parar_observador():
+    """Encerra o observador ativo"""
+    global _observador
+    if isinstance(_observador, ObservadorInotify):
+        _observador.parar()
+    else:
+        parar_sincronizacao_periodica()
+    _observador = None
@@ -1,5 +1,9 @@
 import sqlite3
 import os
+import hashlib
+import queue
+import atexit
+from contextlib import contextmanager
 from threading import Lock
 from configparser import ConfigParser
 import logging
@@ -11,49 +15,143 @@ logging.basicConfig(filename='sistema.log', level=logging.ERROR)
 config = ConfigParser()
 config.read('config.ini')
 CLIENTES_DB = config.get('PATHS', 'CLIENTES_FILE')
+# "delete" funciona em compartilhamentos de rede; "wal" (leituras durante gravações) só com o banco em disco local
+MODO_JOURNAL = config.get('CLIENTES', 'journal_mode', fallback='delete').strip().lower()
+TAMANHO_POOL = config.getint('CLIENTES', 'conexoes', fallback=4)
 
 # Garantir que o diretório existe
 os.makedirs(os.path.dirname(CLIENTES_DB), exist_ok=True)
 
 db_lock = Lock()
+_schema_criado = False
+_pool = queue.LifoQueue()
+
+# Cache da lista de clientes: vale enquanto o PRAGMA data_version da conexão de
+# controle não mudar (o SQLite o altera quando outra conexão, deste ou de outro processo, grava)
+_cache_lock = Lock()
+_conexao_versao = None
+_cache_clientes = None
+_data_version = None
+_etag_clientes = None
+versao_clientes = 0
+
+def _nova_conexao():
+    conn = sqlite3.connect(CLIENTES_DB, timeout=30, check_same_thread=False)
+    conn.execute(f"PRAGMA journal_mode={MODO_JOURNAL}")
+    return conn
+
+@contextmanager
+def conexao():
+    """Empresta uma conexão do pool; ela volta ao pool (ou é fechada, se o pool estiver cheio) ao sair"""
+    try:
+        conn = _pool.get_nowait()
+    except queue.Empty:
+        conn = _nova_conexao()
+    try:
+        yield conn
+    finally:
+        if conn.in_transaction:
+            conn.rollback()
+        if _pool.qsize() < TAMANHO_POOL:
+            _pool.put(conn)
+        else:
+            conn.close()
+
+def fechar_conexoes():
+    """Fecha as conexões ociosas do pool e a de controle do cache (chamado também ao encerrar o processo)"""
+    global _conexao_versao
+    with _cache_lock:
+        if _conexao_versao is not None:
+            _conexao_versao.close()
+            _conexao_versao = None
+    while True:
+        try:
+            _pool.get_nowait().close()
+        except queue.Empty:
+            return
+
+def _versao_banco():
+    global _conexao_versao
+    with _cache_lock:
+        if _conexao_versao is None:
+            _conexao_versao = _nova_conexao()
+        return _conexao_versao.execute("PRAGMA data_version").fetchone()[0]
+
+def invalidar_cache_clientes():
+    """Força a releitura da lista na próxima consulta"""
+    global _cache_clientes
+    with _cache_lock:
+        _cache_clientes = None
+
+atexit.register(fechar_conexoes)
 
 def init_db():
-    """Inicializa o banco de dados se não existir"""
+    """Inicializa o banco de dados se não existir (uma única vez por execução)"""
+    global _schema_criado
+    if _schema_criado:
+        return
     try:
         with db_lock:
-            conn = sqlite3.connect(CLIENTES_DB)
-            cursor = conn.cursor()
-            cursor.execute('''CREATE TABLE IF NOT EXISTS clientes (
-                                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                                nome TEXT UNIQUE
-                            )''')
-            conn.commit()
+            if _schema_criado:
+                return
+            with conexao() as conn:
+                conn.execute('''CREATE TABLE IF NOT EXISTS clientes (
+                                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                                    nome TEXT UNIQUE
+                                )''')
+                conn.commit()
+            _schema_criado = True
     except Exception as e:
         logging.error(f"Erro ao inicializar banco de dados: {str(e)}")
         raise
 
+def _clientes_em_cache():
+    """Retorna (lista, etag) do cache, relendo o banco só quando ele mudou"""
+    global _cache_clientes, _data_version, _etag_clientes, versao_clientes
+    init_db()  # Garante que o banco está criado
+
+    data_version = _versao_banco()
+    with _cache_lock:
+        if _cache_clientes is not None and _data_version == data_version:
+            return _cache_clientes, _etag_clientes
+
+    with conexao() as conn:
+        cursor = conn.execute("SELECT nome FROM clientes ORDER BY nome")
+        clientes = tuple(row[0] for row in cursor.fetchall())
+
+    with _cache_lock:
+        if clientes != _cache_clientes:
+            versao_clientes += 1
+            # Derivado do conteúdo, para valer igual em todos os processos do servidor
+            _etag_clientes = hashlib.sha1("\n".join(clientes).encode('utf-8')).hexdigest()
+        _cache_clientes = clientes
+        _data_version = data_version
+        return _cache_clientes, _etag_clientes
+
 def obter_clientes():
     """Retorna lista de clientes em ordem alfabética"""
     try:
-        init_db()  # Garante que o banco está criado
-        
-        with db_lock:
-            conn = sqlite3.connect(CLIENTES_DB)
-            cursor = conn.cursor()
-            cursor.execute("SELECT nome FROM clientes ORDER BY nome")
-            return [row[0] for row in cursor.fetchall()]
+        return list(_clientes_em_cache()[0])
     except Exception as e:
         logging.error(f"Erro ao obter clientes: {str(e)}")
         return []  # Retorna lista vazia em caso de erro
 
+def obter_clientes_com_etag():
+    """Retorna (lista de clientes, etag da lista); etag é None se o banco não pôde ser lido"""
+    try:
+        clientes, etag = _clientes_em_cache()
+        return list(clientes), etag
+    except Exception as e:
+        logging.error(f"Erro ao obter clientes: {str(e)}")
+        return [], None
+
 def adicionar_cliente(novo_cliente):
     novo_cliente = novo_cliente.strip().upper()
     
     try:
         init_db()
         
-        with db_lock:
-            conn = sqlite3.connect(CLIENTES_DB)
+        with db_lock, conexao() as conn:
             cursor = conn.cursor()
             
             # Verifica se já existe
@@ -64,6 +162,7 @@ def adicionar_cliente(novo_cliente):
             # Adiciona novo
             cursor.execute("INSERT INTO clientes (nome) VALUES (?)", (novo_cliente,))
             conn.commit()
+            invalidar_cache_clientes()
             
             return True, "Cliente cadastrado com sucesso!"
     except Exception as e:
@@ -76,8 +175,7 @@ def remover_cliente(nome_cliente):
     try:
         init_db()
         
-        with db_lock:
-            conn = sqlite3.connect(CLIENTES_DB)
+        with db_lock, conexao() as conn:
             cursor = conn.cursor()
             
             # Verifica se existe
@@ -88,8 +186,9 @@ def remover_cliente(nome_cliente):
             # Remove
             cursor.execute("DELETE FROM clientes WHERE nome = ?", (nome_cliente,))
             conn.commit()
+            invalidar_cache_clientes()
             
             return True, "Cliente removido com sucesso!"
     except Exception as e:
         logging.error(f"Erro ao remover cliente: {str(e)}")
-        return False, f"Erro de banco de dados: {str(e)}"
\ No newline at end of file
+        return False, f"Erro de banco de dados: {str(e)}"
@@ -0,0 +1,157 @@
+import os
+import sqlite3
+import hashlib
+from threading import Lock
+from configparser import ConfigParser
+from indice_processos import INDICE_DB
+
+# Carregar configurações
+config = ConfigParser()
+config.read('config.ini')
+
+# Índice de conteúdo (hash -> arquivos já gravados), ao lado do índice de processos
+CONTEUDO_DB = config.get('PATHS', 'CONTEUDO_FILE', fallback=os.path.join(os.path.dirname(INDICE_DB), 'conteudo.db'))
+# copiar (padrão): grava normalmente e apenas relata o duplicado
+# link: o duplicado vira um hard link do arquivo já existente (cai para cópia se o volume não suportar);
+# economiza espaço, mas editar o arquivo no lugar (Office, Acrobat) altera o de todos os processos
+POLITICA_DUPLICADOS = config.get('CONTEUDO', 'duplicados', fallback='copiar').strip().lower()
+TAMANHO_LEITURA = 1024 * 1024
+
+conteudo_lock = Lock()
+_schema_criado = False
+
+
+def novo_hash():
+    """Objeto de hash usado em todo o índice de conteúdo (SHA-256)"""
+    return hashlib.sha256()
+
+
+def hash_arquivo(caminho):
+    """SHA-256 de um arquivo, lido em blocos"""
+    h = novo_hash()
+    buffer = bytearray(TAMANHO_LEITURA)
+    visao = memoryview(buffer)
+    with open(caminho, 'rb') as f:
+        while True:
+            lidos = f.readinto(buffer)
+            if not lidos:
+                break
+            h.update(visao[:lidos])
+    return h.hexdigest()
+
+
+def _conectar():
+    conn = sqlite3.connect(CONTEUDO_DB, timeout=30)
+    conn.row_factory = sqlite3.Row
+    return conn
+
+
+def init_conteudo():
+    """Cria a tabela do índice de conteúdo (uma única vez por execução)"""
+    global _schema_criado
+    if _schema_criado:
+        return
+    os.makedirs(os.path.dirname(CONTEUDO_DB), exist_ok=True)
+    conn = _conectar()
+    try:
+        conn.executescript('''
+            CREATE TABLE IF NOT EXISTS conteudo (
+                caminho TEXT PRIMARY KEY,
+                hash TEXT NOT NULL,
+                tamanho INTEGER NOT NULL,
+                mtime INTEGER NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_conteudo_hash ON conteudo(hash);
+            CREATE INDEX IF NOT EXISTS idx_conteudo_tamanho ON conteudo(tamanho);
+        ''')
+        conn.commit()
+    finally:
+        conn.close()
+    _schema_criado = True
+
+
+def _esquecer(conn, caminhos):
+    conn.executemany("DELETE FROM conteudo WHERE caminho = ?", [(c,) for c in caminhos])
+
+
+def _confere(row):
+    """O arquivo registrado ainda existe e não mudou desde que o hash foi calculado"""
+    try:
+        st = os.stat(row['caminho'])
+    except OSError:
+        return False
+    return st.st_size == row['tamanho'] and st.st_mtime_ns == row['mtime']
+
+
+def registrar_conteudo(caminho, digest):
+    """Associa o hash ao arquivo gravado em caminho (tamanho e mtime atuais)"""
+    init_conteudo()
+    st = os.stat(caminho)
+    with conteudo_lock:
+        conn = _conectar()
+        try:
+            with conn:
+                conn.execute(
+                    "INSERT INTO conteudo (caminho, hash, tamanho, mtime) VALUES (?, ?, ?, ?) "
+                    "ON CONFLICT(caminho) DO UPDATE SET hash = excluded.hash, tamanho = excluded.tamanho, "
+                    "mtime = excluded.mtime",
+                    (caminho, digest, st.st_size, st.st_mtime_ns)
+                )
+        finally:
+            conn.close()
+
+
+def tamanho_conhecido(tamanho):
+    """Indica se há algum arquivo registrado com esse tamanho (só então vale calcular o hash antes de copiar)"""
+    init_conteudo()
+    conn = _conectar()
+    try:
+        return conn.execute("SELECT 1 FROM conteudo WHERE tamanho = ? LIMIT 1", (tamanho,)).fetchone() is not None
+    finally:
+        conn.close()
+
+
+def localizar_conteudo(digest, tamanho=None):
+    """
+    Caminho canônico (o primeiro registrado que ainda confere) de um conteúdo, ou None.
+    Registros de arquivos apagados ou alterados são descartados pelo caminho.
+    """
+    init_conteudo()
+    conn = _conectar()
+    try:
+        rows = conn.execute("SELECT * FROM conteudo WHERE hash = ? ORDER BY rowid", (digest,)).fetchall()
+    finally:
+        conn.close()
+
+    canonico = None
+    invalidos = []
+    for row in rows:
+        if tamanho is not None and row['tamanho'] != tamanho:
+            continue
+        if _confere(row):
+            canonico = row['caminho']
+            break
+        invalidos.append(row['caminho'])
+
+    if invalidos:
+        with conteudo_lock:
+            conn = _conectar()
+            try:
+                with conn:
+                    _esquecer(conn, invalidos)
+            finally:
+                conn.close()
+    return canonico
+
+
+def hash_registrado(caminho):
+    """Hash já calculado para caminho, se o arquivo não mudou desde então"""
+    init_conteudo()
+    conn = _conectar()
+    try:
+        row = conn.execute("SELECT * FROM conteudo WHERE caminho = ?", (caminho,)).fetchone()
+    finally:
+        conn.close()
+    if row is not None and _confere(row):
+        return row['hash']
+    return None
@@ -0,0 +1,238 @@
+import os
+import time
+import uuid
+import itertools
+import shutil
+import logging
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from configparser import ConfigParser
+from conteudo import (
+    POLITICA_DUPLICADOS, novo_hash, hash_arquivo, registrar_conteudo, tamanho_conhecido,
+    localizar_conteudo, hash_registrado
+)
+
+# Carregar configurações
+config = ConfigParser()
+config.read('config.ini')
+
+# Em compartilhamentos SMB a latência de abrir/fechar cada arquivo domina; várias cópias simultâneas escondem essa espera
+THREADS_COPIA = config.getint('COPIA', 'threads', fallback=8)
+TAMANHO_BUFFER = 1024 * 1024
+
+
+class CopiaCancelada(Exception):
+    """A cópia foi interrompida pelo usuário"""
+
+
+def caminho_temporario(pasta_destino, nome):
+    """Arquivo oculto na própria pasta de destino, renomeado para o nome final ao terminar"""
+    return os.path.join(pasta_destino, f".{nome}.{uuid.uuid4().hex}.parte")
+
+
+def criar_vazio(caminho):
+    """Cria caminho vazio só se ele não existir (atômico, inclusive entre processos); senão FileExistsError"""
+    os.close(os.open(caminho, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+
+
+def reservar_nome(pasta_destino, nome):
+    """Reserva, criando-o vazio, o primeiro nome livre entre "nome (2).ext", "nome (3).ext"..."""
+    base, ext = os.path.splitext(nome)
+    for n in itertools.count(2):
+        destino = os.path.join(pasta_destino, f"{base} ({n}){ext}")
+        try:
+            criar_vazio(destino)
+            return destino
+        except FileExistsError:
+            continue
+
+
+def tarefa_copia(origem, destino, mover=False, nome=None, digest=None):
+    """Descreve a cópia (ou movimentação) de um arquivo; digest é o SHA-256 da origem, se já conhecido"""
+    return {'origem': origem, 'destino': destino, 'mover': mover, 'nome': nome or os.path.basename(destino),
+            'hash': digest}
+
+
+def vincular(canonico, destino):
+    """
+    Cria destino como hard link de canonico (substituindo o que houver). Retorna False
+    se o volume não suportar links, para quem chamou gravar o arquivo normalmente.
+    """
+    pasta, nome = os.path.split(destino)
+    temporario = caminho_temporario(pasta, nome)
+    try:
+        os.link(canonico, temporario)
+        os.replace(temporario, destino)
+        return True
+    except OSError as e:
+        logging.warning(f"Não foi possível criar link de {canonico} para {destino}: {str(e)}")
+        if os.path.exists(temporario):
+            os.remove(temporario)
+        return False
+
+
+def aproveitar_duplicado(digest, tamanho, destino):
+    """
+    Verifica se o conteudo já está gravado antes de transferi-lo para destino.
+
+    Retorna (situacao, canonico): 'existente' se destino já tem esse conteúdo,
+    'vinculado' se destino foi criado como link de uma cópia existente, 'duplicado'
+    se existe uma cópia mas o arquivo ainda precisa ser gravado, ou (None, None).
+    """
+    if hash_registrado(destino) == digest:
+        return 'existente', destino
+    canonico = localizar_conteudo(digest, tamanho)
+    if canonico is None:
+        return None, None
+    if POLITICA_DUPLICADOS == 'link' and vincular(canonico, destino):
+        registrar_conteudo(destino, digest)
+        return 'vinculado', canonico
+    return 'duplicado', canonico
+
+
+def concluir_gravacao(temporario, destino, digest):
+    """
+    Leva o temporário já gravado (com hash digest) para destino. Se o conteúdo já
+    existir no destino ou puder ser vinculado a uma cópia existente, o temporário
+    é descartado. Retorna (situacao, canonico) como aproveitar_duplicado.
+    """
+    try:
+        situacao, canonico = aproveitar_duplicado(digest, os.path.getsize(temporario), destino)
+    except Exception as e:
+        logging.error(f"Erro ao consultar o índice de conteúdo para {destino}: {str(e)}")
+        situacao, canonico = None, None
+
+    if situacao in ('existente', 'vinculado'):
+        os.remove(temporario)
+        return situacao, canonico
+
+    os.replace(temporario, destino)
+    try:
+        registrar_conteudo(destino, digest)
+    except Exception as e:
+        logging.error(f"Erro ao registrar conteúdo de {destino}: {str(e)}")
+    return situacao, canonico
+
+
+def _copiar_arquivo(origem, destino, ao_progresso=None, cancelar=None):
+    """
+    Copia em blocos para um temporário ao lado do destino e renomeia no fim,
+    de modo que um cancelamento nunca deixa o destino pela metade.
+    Retorna o SHA-256 do conteúdo, calculado durante a cópia.
+    """
+    pasta, nome = os.path.split(destino)
+    temporario = caminho_temporario(pasta, nome)
+    h = novo_hash()
+    buffer = bytearray(TAMANHO_BUFFER)
+    visao = memoryview(buffer)
+    try:
+        with open(origem, 'rb') as f_origem, open(temporario, 'wb') as f_destino:
+            while True:
+                if cancelar is not None and cancelar.is_set():
+                    raise CopiaCancelada("Cancelado")
+                lidos = f_origem.readinto(buffer)
+                if not lidos:
+                    break
+                f_destino.write(visao[:lidos])
+                h.update(visao[:lidos])
+                if ao_progresso:
+                    ao_progresso(lidos)
+        shutil.copystat(origem, temporario)
+        os.replace(temporario, destino)
+    except BaseException:
+        if os.path.exists(temporario):
+            os.remove(temporario)
+        raise
+    return h.hexdigest()
+
+
+def _executar(tarefa, ao_progresso=None, cancelar=None):
+    inicio = time.perf_counter()
+    resultado = dict(tarefa, ok=False, bytes=0, erro=None, cancelado=False, pulado=False, duplicado=None, canonico=None)
+    try:
+        if cancelar is not None and cancelar.is_set():
+            raise CopiaCancelada("Cancelado")
+        os.makedirs(os.path.dirname(tarefa['destino']), exist_ok=True)
+        tamanho = os.path.getsize(tarefa['origem'])
+
+        # Só vale ler a origem antes da cópia se já existe arquivo gravado do mesmo tamanho
+        digest = tarefa.get('hash')
+        if digest is None and (tarefa['mover'] or tamanho_conhecido(tamanho)):
+            digest = hash_arquivo(tarefa['origem'])
+        if digest is not None:
+            situacao, canonico = aproveitar_duplicado(digest, tamanho, tarefa['destino'])
+            resultado.update(duplicado=situacao, canonico=canonico)
+
+        if resultado['duplicado'] in ('existente', 'vinculado'):
+            if tarefa['mover']:
+                os.remove(tarefa['origem'])
+        elif tarefa['mover']:
+            shutil.move(tarefa['origem'], tarefa['destino'])
+        else:
+            digest = _copiar_arquivo(tarefa['origem'], tarefa['destino'], ao_progresso, cancelar)
+        if ao_progresso and (tarefa['mover'] or resultado['duplicado'] in ('existente', 'vinculado')):
+            ao_progresso(tamanho)
+
+        try:
+            registrar_conteudo(tarefa['destino'], digest)
+        except Exception as e:
+            logging.error(f"Erro ao registrar conteúdo de {tarefa['destino']}: {str(e)}")
+        resultado.update(ok=True, bytes=tamanho)
+    except CopiaCancelada as e:
+        resultado.update(erro=str(e), cancelado=True)
+    except Exception as e:
+        resultado['erro'] = str(e)
+        logging.error(f"Falha ao copiar {tarefa['origem']}: {str(e)}")
+    resultado['segundos'] = time.perf_counter() - inicio
+    return resultado
+
+
+def resultado_sem_copia(tarefa, erro=None, pulado=False):
+    """Resultado, no formato das cópias, de um arquivo que nem chegou a ser copiado (bloqueado ou pulado)"""
+    return dict(tarefa, ok=False, bytes=0, erro=erro, cancelado=False, pulado=pulado, duplicado=None,
+                canonico=None, segundos=0.0)
+
+
+def copiar_em_paralelo(tarefas, max_threads=None, ao_concluir=None, ao_progresso=None, cancelar=None):
+    """
+    Executa as tarefas de cópia num pool limitado de threads.
+
+    ao_concluir(resultado) é chamado a cada arquivo terminado e ao_progresso(bytes)
+    a cada bloco gravado, ambos nas threads de cópia. Se o Event cancelar for
+    sinalizado, as cópias em andamento são interrompidas e as restantes não começam.
+    Retorna um relatório com o resultado de cada arquivo e a vazão total.
+    """
+    inicio = time.perf_counter()
+    resultados = []
+    max_threads = max(1, min(max_threads or THREADS_COPIA, len(tarefas) or 1))
+
+    with ThreadPoolExecutor(max_workers=max_threads, thread_name_prefix="copia") as executor:
+        futuros = [executor.submit(_executar, tarefa, ao_progresso, cancelar) for tarefa in tarefas]
+        for futuro in as_completed(futuros):
+            resultado = futuro.result()
+            resultados.append(resultado)
+            if ao_concluir:
+                ao_concluir(resultado)
+
+    return relatorio_copia(resultados, time.perf_counter() - inicio)
+
+
+def relatorio_copia(resultados, segundos):
+    """Totais de uma leva de cópias"""
+    total_bytes = sum(r['bytes'] for r in resultados)
+    return {
+        'resultados': resultados,
+        'sucessos': sum(1 for r in resultados if r['ok']),
+        'falhas': [r for r in resultados if not r['ok'] and not r['cancelado'] and not r.get('pulado')],
+        'cancelados': [r for r in resultados if r['cancelado']],
+        'pulados': [r for r in resultados if r.get('pulado')],
+        'duplicados': [r for r in resultados if r['ok'] and r['duplicado']],
+        'bytes': total_bytes,
+        'segundos': segundos,
+        'mb_por_segundo': (total_bytes / (1024 * 1024)) / segundos if segundos > 0 else 0.0
+    }
+
+
+def descrever_vazao(relatorio):
+    """Texto curto com volume, tempo e vazão"""
+    return (f"{relatorio['bytes'] / (1024 * 1024):.1f} MB em {relatorio['segundos']:.1f} s "
+            f"({relatorio['mb_por_segundo']:.1f} MB/s)")
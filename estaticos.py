@@ -0,0 +1,75 @@
+import os
+import gzip
+import hashlib
+import mimetypes
+import logging
+from threading import Lock
+
+try:
+    import brotli
+    HAS_BROTLI = True
+except ImportError:
+    HAS_BROTLI = False
+
+# Arquivos de texto são comprimidos uma única vez, ao serem carregados; imagens já vêm comprimidas
+EXTENSOES_COMPRIMIVEIS = {'.css', '.js', '.html', '.svg', '.json', '.txt'}
+CACHE_VERSIONADO = 'public, max-age=31536000, immutable'
+
+_lock = Lock()
+_ativos = {}  # caminho relativo -> dados do arquivo carregado
+
+
+def _carregar(pasta, nome):
+    caminho = os.path.join(pasta, nome)
+    st = os.stat(caminho)
+    with open(caminho, 'rb') as f:
+        conteudo = f.read()
+    ativo = {
+        'mtime': st.st_mtime_ns,
+        'versao': hashlib.sha1(conteudo).hexdigest()[:12],
+        'tipo': mimetypes.guess_type(nome)[0] or 'application/octet-stream',
+        'codificacoes': {'identity': conteudo}
+    }
+    if os.path.splitext(nome)[1].lower() in EXTENSOES_COMPRIMIVEIS:
+        ativo['codificacoes']['gzip'] = gzip.compress(conteudo, compresslevel=9, mtime=0)
+        if HAS_BROTLI:
+            ativo['codificacoes']['br'] = brotli.compress(conteudo, quality=11)
+    return ativo
+
+
+def obter_ativo(pasta, nome):
+    """
+    Conteúdo (e versões comprimidas) de um arquivo estático, em memória.
+    É recarregado só quando o mtime muda. Retorna None se o arquivo não existir ou estiver fora da pasta.
+    """
+    nome = nome.replace('\\', '/')
+    caminho = os.path.normpath(os.path.join(pasta, nome))
+    if os.path.commonpath([os.path.abspath(pasta), os.path.abspath(caminho)]) != os.path.abspath(pasta):
+        return None
+    try:
+        mtime = os.stat(caminho).st_mtime_ns
+    except OSError:
+        return None
+    with _lock:
+        ativo = _ativos.get(nome)
+        if ativo is None or ativo['mtime'] != mtime:
+            try:
+                ativo = _ativos[nome] = _carregar(pasta, nome)
+            except OSError as e:
+                logging.error(f"Erro ao carregar arquivo estático {nome}: {str(e)}")
+                return None
+        return ativo
+
+
+def versao_ativo(pasta, nome):
+    """Hash curto do conteúdo, usado como ?v= nas URLs (muda sempre que o arquivo muda)"""
+    ativo = obter_ativo(pasta, nome)
+    return ativo['versao'] if ativo else None
+
+
+def escolher_codificacao(ativo, accept_encodings):
+    """Melhor codificação disponível entre as aceitas pelo navegador (objeto Accept do Werkzeug)"""
+    for codificacao in ('br', 'gzip'):
+        if codificacao in ativo['codificacoes'] and accept_encodings[codificacao]:
+            return codificacao
+    return 'identity'
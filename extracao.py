@@ -0,0 +1,119 @@
+import os
+import logging
+import zipfile
+from xml.etree import ElementTree
+
+try:
+    import pymupdf
+    HAS_PYMUPDF = True
+except ImportError:
+    HAS_PYMUPDF = False
+
+try:
+    from PyPDF2 import PdfReader
+    HAS_PYPDF2 = True
+except ImportError:
+    HAS_PYPDF2 = False
+
+try:
+    import docx
+    HAS_DOCX = True
+except ImportError:
+    HAS_DOCX = False
+
+EXTENSOES_PDF = {'.pdf'}
+EXTENSOES_DOCX = {'.docx'}
+EXTENSOES_TEXTO = {'.txt', '.csv', '.xml', '.html', '.htm', '.json', '.eml'}
+# Sem camada de texto: só entram no índice pelo OCR
+EXTENSOES_IMAGEM = {'.jpg', '.jpeg', '.png', '.tif', '.tiff', '.bmp'}
+EXTENSOES_EXTRAIVEIS = EXTENSOES_PDF | EXTENSOES_DOCX | EXTENSOES_TEXTO | EXTENSOES_IMAGEM
+
+_NS_WORD = '{http://schemas.openxmlformats.org/wordprocessingml/2006/main}'
+
+
+class ErroExtracao(Exception):
+    """O arquivo não pôde ser lido (corrompido, protegido por senha ou sem biblioteca para o formato)"""
+
+
+def extraivel(caminho):
+    """Indica se há extrator para a extensão do arquivo"""
+    return os.path.splitext(caminho)[1].lower() in EXTENSOES_EXTRAIVEIS
+
+
+def _paginas_pdf(caminho):
+    """Texto de cada página do PDF"""
+    if HAS_PYMUPDF:
+        with pymupdf.open(caminho) as documento:
+            if documento.needs_pass:
+                raise ErroExtracao("PDF protegido por senha")
+            return [pagina.get_text() for pagina in documento]
+    if HAS_PYPDF2:
+        leitor = PdfReader(caminho)
+        if leitor.is_encrypted:
+            raise ErroExtracao("PDF protegido por senha")
+        return [pagina.extract_text() or "" for pagina in leitor.pages]
+    raise ErroExtracao("Nenhuma biblioteca de PDF instalada (PyMuPDF ou PyPDF2)")
+
+
+def _texto_docx(caminho):
+    if HAS_DOCX:
+        documento = docx.Document(caminho)
+        partes = [paragrafo.text for paragrafo in documento.paragraphs]
+        for tabela in documento.tables:
+            for linha in tabela.rows:
+                partes.append("\t".join(celula.text for celula in linha.cells))
+        return "\n".join(partes)
+    # Sem python-docx: o texto está em word/document.xml
+    with zipfile.ZipFile(caminho) as pacote:
+        raiz = ElementTree.fromstring(pacote.read('word/document.xml'))
+    return "\n".join(
+        "".join(t.text or "" for t in paragrafo.iter(f'{_NS_WORD}t'))
+        for paragrafo in raiz.iter(f'{_NS_WORD}p')
+    )
+
+
+def _texto_simples(caminho, limite):
+    with open(caminho, 'rb') as f:
+        dados = f.read(limite * 4)
+    for codificacao in ('utf-8', 'cp1252'):
+        try:
+            return dados.decode(codificacao)
+        except UnicodeDecodeError:
+            continue
+    return dados.decode('latin-1')
+
+
+def ler_documento(caminho, limite=1_000_000):
+    """
+    Texto de um PDF, DOCX ou arquivo de texto, com no máximo limite caracteres, e se o
+    arquivo precisa de OCR (imagem, ou PDF com alguma página sem camada de texto).
+    Levanta ErroExtracao se o arquivo não puder ser lido.
+    """
+    ext = os.path.splitext(caminho)[1].lower()
+    precisa_ocr = False
+    try:
+        if ext in EXTENSOES_PDF:
+            paginas = _paginas_pdf(caminho)
+            texto = "\n".join(paginas)
+            precisa_ocr = any(not pagina.strip() for pagina in paginas)
+        elif ext in EXTENSOES_DOCX:
+            texto = _texto_docx(caminho)
+        elif ext in EXTENSOES_TEXTO:
+            texto = _texto_simples(caminho, limite)
+        elif ext in EXTENSOES_IMAGEM:
+            texto, precisa_ocr = "", True
+        else:
+            raise ErroExtracao(f"Formato não suportado: {ext}")
+    except ErroExtracao:
+        raise
+    except MemoryError as e:
+        raise ErroExtracao("Memória insuficiente para ler o arquivo") from e
+    except Exception as e:
+        logging.warning(f"Falha ao extrair texto de {caminho}: {str(e)}")
+        raise ErroExtracao(str(e)) from e
+    return texto[:limite], precisa_ocr
+
+
+def extrair_texto(caminho, limite=1_000_000):
+    """Texto de um PDF, DOCX ou arquivo de texto, com no máximo limite caracteres (sem OCR)"""
+    return ler_documento(caminho, limite)[0]
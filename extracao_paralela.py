@@ -0,0 +1,166 @@
+import os
+import time
+import queue
+import logging
+import multiprocessing
+from multiprocessing.connection import wait
+from configparser import ConfigParser
+from extracao import ErroExtracao
+
+try:
+    import resource
+    HAS_RESOURCE = True
+except ImportError:
+    HAS_RESOURCE = False
+
+# Carregar configurações
+config = ConfigParser()
+config.read('config.ini')
+
+# 0 = um processo por núcleo
+PROCESSOS_EXTRACAO = config.getint('TEXTO', 'processos', fallback=0) or os.cpu_count() or 1
+# Segundos que um arquivo pode levar antes de o processo que o lê ser encerrado (padrão)
+TEMPO_MAXIMO = config.getint('TEXTO', 'tempo_maximo', fallback=120)
+# Memória de cada processo de extração (só Linux/macOS); 0 = sem limite
+MEMORIA_MAXIMA = config.getint('TEXTO', 'memoria_maxima_mb', fallback=1024) * 1024 * 1024
+# Cada processo é trocado por um novo depois de tantos arquivos, para não acumular memória
+ARQUIVOS_POR_PROCESSO = config.getint('TEXTO', 'arquivos_por_processo', fallback=200)
+
+
+def _trabalhador(conexao, memoria_maxima, funcao):
+    """Laço de um processo de extração: recebe itens e devolve (funcao(item), erro), até receber None"""
+    if memoria_maxima and HAS_RESOURCE:
+        resource.setrlimit(resource.RLIMIT_AS, (memoria_maxima, memoria_maxima))
+    while True:
+        try:
+            item = conexao.recv()
+        except EOFError:
+            return
+        if item is None:
+            return
+        try:
+            resultado = (funcao(item), None)
+        except ErroExtracao as e:
+            resultado = (None, str(e) or "Falha na extração")
+        conexao.send(resultado)
+
+
+class _Processo:
+    """Um processo de extração e o arquivo que ele está lendo"""
+
+    def __init__(self, contexto, funcao, tempo_maximo):
+        self.conexao, remota = contexto.Pipe()
+        self.processo = contexto.Process(
+            target=_trabalhador, args=(remota, MEMORIA_MAXIMA, funcao), name="extracao", daemon=True
+        )
+        self.processo.start()
+        remota.close()
+        self.tempo_maximo = tempo_maximo
+        self.tarefa = None
+        self.prazo = None
+        self.feitos = 0
+
+    def enviar(self, tarefa):
+        self.conexao.send(tarefa[0])
+        self.tarefa = tarefa
+        self.prazo = time.monotonic() + self.tempo_maximo
+
+    def receber(self):
+        resultado = self.conexao.recv()
+        tarefa, self.tarefa, self.prazo = self.tarefa, None, None
+        self.feitos += 1
+        return tarefa, resultado
+
+    def encerrar(self, forcar=False):
+        try:
+            if forcar:
+                self.processo.kill()
+            else:
+                self.conexao.send(None)
+        except OSError:
+            pass
+        self.processo.join(5)
+        if self.processo.is_alive():
+            self.processo.kill()
+            self.processo.join()
+        self.conexao.close()
+
+
+def extrair_em_paralelo(fila, ao_resultado, funcao, processos=None, tempo_maximo=TEMPO_MAXIMO):
+    """
+    Aplica funcao às tarefas da fila em processos separados, até receber None da fila.
+
+    Cada tarefa é uma tupla cujo primeiro item é enviado a funcao, que precisa ser uma
+    função de módulo (ou functools.partial de uma) e sinalizar falhas com ErroExtracao.
+    ao_resultado(tarefa, resultado, erro) é chamado nesta thread, um arquivo por vez;
+    com erro, resultado é None. Um arquivo que passe de tempo_maximo segundos, estoure
+    a memória ou derrube o processo (PDF malformado) vira um erro só dele: o processo
+    é substituído e os demais continuam.
+    """
+    # spawn em todos os sistemas: o fork de um processo com threads não é seguro
+    contexto = multiprocessing.get_context('spawn')
+    # Os processos só são criados quando há arquivo para eles (passada sem mudanças não cria nenhum)
+    trabalhadores = [None] * (processos or PROCESSOS_EXTRACAO)
+    fim = False
+
+    def substituir(trabalhador, forcar=False):
+        trabalhador.encerrar(forcar)
+        trabalhadores[trabalhadores.index(trabalhador)] = None
+
+    try:
+        while True:
+            ocupados = [t for t in trabalhadores if t is not None and t.tarefa is not None]
+            for posicao, trabalhador in enumerate(trabalhadores):
+                if fim or (trabalhador is not None and trabalhador.tarefa is not None):
+                    continue
+                try:
+                    # Sem nenhum arquivo em andamento, espera a varredura; senão só pega o que já está na fila
+                    tarefa = fila.get(block=not ocupados)
+                except queue.Empty:
+                    break
+                if tarefa is None:
+                    fim = True
+                    break
+                if trabalhador is None:
+                    trabalhador = trabalhadores[posicao] = _Processo(contexto, funcao, tempo_maximo)
+                try:
+                    trabalhador.enviar(tarefa)
+                    ocupados.append(trabalhador)
+                except OSError:
+                    ao_resultado(tarefa, None, "Processo de extração indisponível")
+                    substituir(trabalhador, forcar=True)
+
+            if not ocupados:
+                if fim:
+                    return
+                continue
+
+            agora = time.monotonic()
+            espera = max(0.0, min(t.prazo for t in ocupados) - agora)
+            # Com a fila ainda cheia, volta logo para distribuir tarefas aos processos que terminarem
+            prontos = wait([t.conexao for t in ocupados], timeout=min(espera, 0.5))
+
+            for trabalhador in ocupados:
+                if trabalhador.conexao in prontos:
+                    try:
+                        tarefa, (resultado, erro) = trabalhador.receber()
+                    except (EOFError, OSError):
+                        tarefa = trabalhador.tarefa
+                        trabalhador.processo.join(1)
+                        codigo = trabalhador.processo.exitcode
+                        logging.error(f"Processo de extração encerrado (código {codigo}) lendo {tarefa[0]}")
+                        ao_resultado(tarefa, None, f"Processo de extração encerrado inesperadamente (código {codigo})")
+                        substituir(trabalhador, forcar=True)
+                        continue
+                    ao_resultado(tarefa, resultado, erro)
+                    if trabalhador.feitos >= ARQUIVOS_POR_PROCESSO:
+                        substituir(trabalhador)
+                elif time.monotonic() > trabalhador.prazo:
+                    tarefa = trabalhador.tarefa
+                    logging.warning(f"Extração de {tarefa[0]} passou de {tempo_maximo} s; processo encerrado")
+                    ao_resultado(tarefa, None, f"Tempo esgotado ({tempo_maximo} s)")
+                    substituir(trabalhador, forcar=True)
+    finally:
+        for trabalhador in trabalhadores:
+            if trabalhador is not None:
+                trabalhador.encerrar(forcar=trabalhador.tarefa is not None)
@@ -0,0 +1,287 @@
+import os
+import json
+import time
+import uuid
+import sqlite3
+import logging
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock, BoundedSemaphore, Thread
+from configparser import ConfigParser
+
+# Carregar configurações
+config = ConfigParser()
+config.read('config.ini')
+
+# Pastas diferentes são gravadas em paralelo, até este número de threads
+TRABALHADORES = config.getint('UPLOAD', 'trabalhadores', fallback=4)
+# Máximo de arquivos aguardando gravação neste processo; acima disso o envio espera (e depois recusa)
+LIMITE_FILA = config.getint('UPLOAD', 'limite_fila', fallback=256)
+ESPERA_FILA = config.getint('UPLOAD', 'espera_fila', fallback=30)
+
+# A situação fica em SQLite para que qualquer processo do servidor responda à consulta
+TRABALHOS_DB = os.path.join(os.getcwd(), 'uploads', 'trabalhos.db')
+VALIDADE_TRABALHO = 24 * 3600
+# Cada processo renova a cada INTERVALO_VIDA segundos os trabalhos que ainda vai gravar;
+# um trabalho pendente sem renovação há TRABALHO_ORFAO segundos ficou de um processo
+# encerrado (reinício do servidor) e passa a erro, para o navegador poder reenviar
+INTERVALO_VIDA = 30
+TRABALHO_ORFAO = 4 * INTERVALO_VIDA
+
+NA_FILA = 'na_fila'
+GRAVANDO = 'gravando'
+CONCLUIDO = 'concluido'
+ERRO = 'erro'
+
+_lock = Lock()
+_filas = {}  # pasta -> deque de (id, funcao) ainda não executados
+_vagas = BoundedSemaphore(LIMITE_FILA)
+_executor = ThreadPoolExecutor(max_workers=TRABALHADORES, thread_name_prefix="gravacao")
+_schema_criado = False
+_ultima_limpeza = 0.0
+# Identifica os trabalhos deste processo na tabela compartilhada
+_DONO = uuid.uuid4().hex
+
+
+class FilaCheia(Exception):
+    """Há arquivos demais aguardando gravação; o envio deve ser repetido mais tarde"""
+
+
+def _conectar():
+    conn = sqlite3.connect(TRABALHOS_DB, timeout=30)
+    conn.row_factory = sqlite3.Row
+    return conn
+
+
+def init_trabalhos():
+    """Cria a tabela de trabalhos (uma única vez por execução)"""
+    global _schema_criado
+    if _schema_criado:
+        return
+    os.makedirs(os.path.dirname(TRABALHOS_DB), exist_ok=True)
+    conn = _conectar()
+    try:
+        conn.executescript('''
+            CREATE TABLE IF NOT EXISTS trabalhos (
+                id TEXT PRIMARY KEY,
+                lote TEXT,
+                pasta TEXT NOT NULL,
+                arquivo TEXT NOT NULL,
+                situacao TEXT NOT NULL,
+                resultado TEXT,
+                erro TEXT,
+                criado_em REAL NOT NULL,
+                atualizado_em REAL NOT NULL,
+                dono TEXT
+            );
+            CREATE INDEX IF NOT EXISTS idx_trabalhos_lote ON trabalhos(lote);
+        ''')
+        # Bancos criados antes da coluna
+        colunas = {row['name'] for row in conn.execute("PRAGMA table_info(trabalhos)")}
+        if 'dono' not in colunas:
+            conn.execute("ALTER TABLE trabalhos ADD COLUMN dono TEXT")
+        conn.commit()
+    finally:
+        conn.close()
+    _schema_criado = True
+    # Pendentes de uma execução anterior saem logo; os de outros processos vivos continuam renovados
+    recuperar_orfaos()
+    Thread(target=_manter_vivos, name="fila-gravacao-vida", daemon=True).start()
+
+
+def recuperar_orfaos():
+    """Marca como erro os trabalhos pendentes que nenhum processo renova há TRABALHO_ORFAO segundos"""
+    agora = time.time()
+    conn = _conectar()
+    try:
+        with conn:
+            cursor = conn.execute(
+                "UPDATE trabalhos SET situacao = ?, erro = ?, atualizado_em = ? "
+                "WHERE situacao IN (?, ?) AND atualizado_em < ?",
+                (ERRO, "O servidor foi reiniciado antes de gravar o arquivo; envie novamente",
+                 agora, NA_FILA, GRAVANDO, agora - TRABALHO_ORFAO)
+            )
+    finally:
+        conn.close()
+    if cursor.rowcount:
+        logging.warning(f"{cursor.rowcount} trabalho(s) de gravação interrompido(s) marcado(s) como erro")
+    return cursor.rowcount
+
+
+def _manter_vivos():
+    while True:
+        time.sleep(INTERVALO_VIDA)
+        try:
+            conn = _conectar()
+            try:
+                with conn:
+                    conn.execute(
+                        "UPDATE trabalhos SET atualizado_em = ? WHERE dono = ? AND situacao IN (?, ?)",
+                        (time.time(), _DONO, NA_FILA, GRAVANDO)
+                    )
+            finally:
+                conn.close()
+            recuperar_orfaos()
+        except Exception as e:
+            logging.error(f"Erro ao renovar os trabalhos de gravação: {str(e)}")
+
+
+def _atualizar(id_trabalho, situacao, resultado=None, erro=None):
+    conn = _conectar()
+    try:
+        with conn:
+            conn.execute(
+                "UPDATE trabalhos SET situacao = ?, resultado = ?, erro = ?, atualizado_em = ? WHERE id = ?",
+                (situacao, json.dumps(resultado) if resultado is not None else None, erro, time.time(), id_trabalho)
+            )
+    finally:
+        conn.close()
+
+
+def _executar(id_trabalho, funcao):
+    try:
+        _atualizar(id_trabalho, GRAVANDO)
+        resultado = funcao()
+        _atualizar(id_trabalho, CONCLUIDO, resultado=resultado)
+    except Exception as e:
+        logging.error(f"Falha no trabalho de gravação {id_trabalho}: {str(e)}")
+        try:
+            _atualizar(id_trabalho, ERRO, erro=str(e))
+        except Exception as e2:
+            logging.error(f"Erro ao registrar falha do trabalho {id_trabalho}: {str(e2)}")
+
+
+def _drenar(pasta):
+    """Executa, em ordem de chegada, os trabalhos de uma pasta; só uma thread drena cada pasta por vez"""
+    while True:
+        with _lock:
+            fila = _filas[pasta]
+            if not fila:
+                del _filas[pasta]
+                return
+            id_trabalho, funcao = fila.popleft()
+        try:
+            _executar(id_trabalho, funcao)
+        finally:
+            _vagas.release()
+
+
+def reservar_vaga():
+    """
+    Reserva uma vaga na fila antes de receber o arquivo, para uma fila cheia não continuar
+    aceitando bytes em disco. Levanta FilaCheia se não houver vaga em ESPERA_FILA segundos.
+    A vaga passa para enfileirar(..., vaga_reservada=True) ou volta com liberar_vaga().
+    """
+    if not _vagas.acquire(timeout=ESPERA_FILA):
+        raise FilaCheia("Servidor ocupado gravando outros arquivos, tente novamente em instantes")
+
+
+def liberar_vaga():
+    """Devolve uma vaga de reservar_vaga cujo arquivo não chegou a ser enfileirado"""
+    _vagas.release()
+
+
+def conferir_vaga():
+    """Levanta FilaCheia se a fila continuar sem vaga por ESPERA_FILA segundos, sem ficar com a vaga"""
+    reservar_vaga()
+    liberar_vaga()
+
+
+def enfileirar(pasta, arquivo, funcao, id_trabalho=None, lote=None, vaga_reservada=False):
+    """
+    Agenda funcao() para gravar arquivo em pasta. Trabalhos da mesma pasta executam um
+    de cada vez, na ordem em que foram enfileirados; pastas diferentes, em paralelo.
+    funcao devolve um dicionário com o resultado, guardado junto da situação do trabalho.
+
+    Se id_trabalho já existir e não tiver falhado, nada é agendado de novo (reenvio do
+    mesmo pedido). Levanta FilaCheia se não houver vaga em ESPERA_FILA segundos; com
+    vaga_reservada, usa a de reservar_vaga (e a devolve se não agendar nada).
+    Retorna o id do trabalho.
+    """
+    global _ultima_limpeza
+    try:
+        init_trabalhos()
+        agora = time.time()
+        if agora - _ultima_limpeza > 3600:
+            _ultima_limpeza = agora
+            limpar_trabalhos_antigos()
+    except BaseException:
+        if vaga_reservada:
+            liberar_vaga()
+        raise
+    id_trabalho = id_trabalho or uuid.uuid4().hex
+
+    if not vaga_reservada:
+        reservar_vaga()
+    conn = None
+    try:
+        conn = _conectar()
+        with conn:
+            # Um trabalho que falhou pode ser refeito; os demais não são agendados duas vezes
+            conn.execute("DELETE FROM trabalhos WHERE id = ? AND situacao = ?", (id_trabalho, ERRO))
+            cursor = conn.execute(
+                "INSERT OR IGNORE INTO trabalhos (id, lote, pasta, arquivo, situacao, criado_em, atualizado_em, dono) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (id_trabalho, lote, pasta, arquivo, NA_FILA, agora, agora, _DONO)
+            )
+        aceito = cursor.rowcount == 1
+    except BaseException:
+        liberar_vaga()
+        raise
+    finally:
+        if conn is not None:
+            conn.close()
+    if not aceito:
+        liberar_vaga()
+        return id_trabalho
+
+    chave = os.path.normcase(os.path.abspath(pasta))
+    with _lock:
+        if chave in _filas:
+            _filas[chave].append((id_trabalho, funcao))
+        else:
+            _filas[chave] = deque([(id_trabalho, funcao)])
+            _executor.submit(_drenar, chave)
+    return id_trabalho
+
+
+def _formatar(row):
+    trabalho = dict(row)
+    trabalho['resultado'] = json.loads(trabalho['resultado']) if trabalho['resultado'] else None
+    return trabalho
+
+
+def obter_trabalho(id_trabalho):
+    """Situação de um trabalho (na_fila, gravando, concluido ou erro) com o resultado, ou None"""
+    init_trabalhos()
+    conn = _conectar()
+    try:
+        row = conn.execute("SELECT * FROM trabalhos WHERE id = ?", (id_trabalho,)).fetchone()
+    finally:
+        conn.close()
+    return _formatar(row) if row is not None else None
+
+
+def obter_lote(lote):
+    """Trabalhos de um mesmo envio, na ordem em que foram enfileirados"""
+    init_trabalhos()
+    conn = _conectar()
+    try:
+        rows = conn.execute("SELECT * FROM trabalhos WHERE lote = ? ORDER BY rowid", (lote,)).fetchall()
+    finally:
+        conn.close()
+    return [_formatar(row) for row in rows]
+
+
+def limpar_trabalhos_antigos():
+    """Esquece trabalhos terminados há mais de VALIDADE_TRABALHO segundos"""
+    init_trabalhos()
+    conn = _conectar()
+    try:
+        with conn:
+            conn.execute(
+                "DELETE FROM trabalhos WHERE situacao IN (?, ?) AND atualizado_em < ?",
+                (CONCLUIDO, ERRO, time.time() - VALIDADE_TRABALHO)
+            )
+    finally:
+        conn.close()
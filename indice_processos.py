@@ -0,0 +1,353 @@
+import os
+import re
+import sqlite3
+import logging
+from threading import Lock, Thread, Event
+from configparser import ConfigParser
+
+# Carregar configurações
+config = ConfigParser()
+config.read('config.ini')
+
+BASE_DIR = config.get('PATHS', 'BASE_DIR', fallback="D:/Arquivo Digital")
+_CLIENTES_DB = config.get('PATHS', 'CLIENTES_FILE', fallback=os.path.join(BASE_DIR, '_Sistema', 'clientes.db'))
+# O índice fica ao lado do clientes.db, salvo se configurado explicitamente
+INDICE_DB = config.get('PATHS', 'INDICE_FILE', fallback=os.path.join(os.path.dirname(_CLIENTES_DB), 'processos.db'))
+INTERVALO_SINCRONIZACAO = config.getint('INDICE', 'intervalo_sincronizacao', fallback=60)
+
+PADRAO_PASTA = re.compile(r'([IE])([ARM])-(\d{6})-(\d{2}) - (.+)')
+AREAS = {"I": "IMPORTAÇÃO", "E": "EXPORTAÇÃO"}
+SERVICOS = {"A": "Aéreo", "R": "Rodoviário", "M": "Marítimo"}
+SIGLAS_AREA = {nome: sigla for sigla, nome in AREAS.items()}
+SIGLAS_SERVICO = {nome: sigla for sigla, nome in SERVICOS.items()}
+
+indice_lock = Lock()
+_schema_criado = False
+_parar_sincronizacao = Event()
+_thread_sincronizacao = None
+
+
+def interpretar_pasta(nome_pasta):
+    """Retorna (sigla_area, sigla_servico, numero, ano, referencia) ou None se o nome não for de processo"""
+    match = PADRAO_PASTA.search(nome_pasta)
+    if not match:
+        return None
+    return match.groups()
+
+
+def chave_processo(numero, sigla_area, sigla_servico, ano):
+    """Chave usada no dicionário de processos (ex.: 123456_IM25)"""
+    return f"{numero}_{sigla_area}{sigla_servico}{ano}"
+
+
+def chave_de_registro(dados):
+    """Chave de um dicionário de processo já montado"""
+    return chave_processo(dados['numero'], SIGLAS_AREA[dados['area']], SIGLAS_SERVICO[dados['servico']], dados['ano'])
+
+
+def montar_registro(numero, sigla_area, sigla_servico, ano, cliente, referencia, caminho):
+    """Monta o dicionário de processo no formato de obter_info_processos"""
+    return {
+        "numero": numero,
+        "cliente": cliente,
+        "area": AREAS[sigla_area],
+        "servico": SERVICOS[sigla_servico],
+        "ano": ano,
+        "referencia": referencia,
+        "caminho": caminho
+    }
+
+
+def _conectar():
+    conn = sqlite3.connect(INDICE_DB, timeout=30)
+    conn.row_factory = sqlite3.Row
+    return conn
+
+
+def init_indice():
+    """Cria as tabelas do índice (uma única vez por execução)"""
+    global _schema_criado
+    if _schema_criado:
+        return
+    os.makedirs(os.path.dirname(INDICE_DB), exist_ok=True)
+    conn = _conectar()
+    try:
+        conn.executescript('''
+            CREATE TABLE IF NOT EXISTS processos (
+                numero TEXT NOT NULL,
+                sigla_area TEXT NOT NULL,
+                sigla_servico TEXT NOT NULL,
+                ano TEXT NOT NULL,
+                cliente TEXT NOT NULL,
+                referencia TEXT NOT NULL,
+                caminho TEXT NOT NULL,
+                pasta_cliente TEXT NOT NULL,
+                PRIMARY KEY (numero, sigla_area, sigla_servico, ano)
+            );
+            CREATE INDEX IF NOT EXISTS idx_processos_pasta_cliente ON processos(pasta_cliente);
+            CREATE TABLE IF NOT EXISTS diretorios (
+                caminho TEXT PRIMARY KEY,
+                mtime INTEGER NOT NULL,
+                nivel TEXT NOT NULL,
+                pai TEXT
+            );
+            CREATE TABLE IF NOT EXISTS meta (
+                chave TEXT PRIMARY KEY,
+                valor TEXT
+            );
+        ''')
+        conn.commit()
+    finally:
+        conn.close()
+    _schema_criado = True
+
+
+def _nova_geracao(conn):
+    """Incrementa (na transação de conn) o contador de gerações do índice e retorna o novo valor"""
+    conn.execute(
+        "INSERT INTO meta (chave, valor) VALUES ('geracao', '1') "
+        "ON CONFLICT(chave) DO UPDATE SET valor = CAST(valor AS INTEGER) + 1"
+    )
+    return int(conn.execute("SELECT valor FROM meta WHERE chave = 'geracao'").fetchone()['valor'])
+
+
+def geracao_indice():
+    """
+    Contador incrementado a cada alteração dos processos no índice, por qualquer processo
+    que use o mesmo processos.db (workers do servidor, aplicativo, indexador).
+    """
+    init_indice()
+    conn = _conectar()
+    try:
+        row = conn.execute("SELECT valor FROM meta WHERE chave = 'geracao'").fetchone()
+        return int(row['valor']) if row is not None else 0
+    finally:
+        conn.close()
+
+
+def _listar_pasta_cliente(cliente_path):
+    """Lista as pastas de processo de uma pasta de cliente"""
+    cliente = os.path.basename(cliente_path)
+    linhas = []
+    for pasta in os.listdir(cliente_path):
+        partes = interpretar_pasta(pasta)
+        if partes:
+            sigla_area, sigla_servico, numero, ano, referencia = partes
+            linhas.append((numero, sigla_area, sigla_servico, ano, cliente, referencia,
+                           os.path.join(cliente_path, pasta), cliente_path))
+    return linhas
+
+
+def _gravar_linhas(conn, linhas):
+    conn.executemany(
+        "INSERT OR REPLACE INTO processos "
+        "(numero, sigla_area, sigla_servico, ano, cliente, referencia, caminho, pasta_cliente) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+        linhas
+    )
+
+
+def reconstruir_indice():
+    """Varre todo o BASE_DIR e substitui o conteúdo do índice. Retorna as estatísticas da varredura."""
+    return sincronizar_indice(completo=True)
+
+
+def sincronizar_indice(completo=False):
+    """
+    Reconcilia o índice com o BASE_DIR relendo apenas as pastas de cliente cujo mtime mudou.
+
+    As pastas de área são sempre listadas (são poucas, e no Windows o os.scandir já traz o
+    mtime de cada pasta de cliente sem chamadas extras). Com completo=True todas as pastas
+    de cliente são relidas. Retorna um dicionário com as contagens de pastas relidas/ignoradas.
+    """
+    init_indice()
+    stats = {'pastas_relidas': 0, 'pastas_ignoradas': 0, 'pastas_removidas': 0, 'processos_lidos': 0}
+
+    if not os.path.isdir(BASE_DIR):
+        # Compartilhamento indisponível: não apagar o índice por engano
+        logging.warning(f"BASE_DIR inacessível, índice mantido: {BASE_DIR}")
+        return stats
+
+    conhecidos = {}
+    if not completo:
+        conn = _conectar()
+        try:
+            conhecidos = {row['caminho']: (row['mtime'], row['pai'])
+                          for row in conn.execute("SELECT caminho, mtime, pai FROM diretorios")}
+        finally:
+            conn.close()
+
+    diretorios = []  # (caminho, mtime, nivel, pai) a gravar
+    relidas = {}     # pasta_cliente -> linhas de processos
+    vistos = set()
+
+    for area_entry in os.scandir(BASE_DIR):
+        if not area_entry.is_dir():
+            continue
+        vistos.add(area_entry.path)
+        try:
+            area_mtime = area_entry.stat().st_mtime_ns
+            if conhecidos.get(area_entry.path, (None, None))[0] != area_mtime:
+                diretorios.append((area_entry.path, area_mtime, 'area', None))
+            clientes = [e for e in os.scandir(area_entry.path) if e.is_dir()]
+        except OSError as e:
+            # Mantém o que já se sabe da área se ela não puder ser lida agora
+            logging.error(f"Erro ao listar área {area_entry.path}: {str(e)}")
+            vistos.update(c for c, (_, pai) in conhecidos.items() if pai == area_entry.path)
+            continue
+
+        for cliente_entry in clientes:
+            vistos.add(cliente_entry.path)
+            try:
+                mtime = cliente_entry.stat().st_mtime_ns
+                if conhecidos.get(cliente_entry.path, (None, None))[0] == mtime:
+                    stats['pastas_ignoradas'] += 1
+                    continue
+                linhas = _listar_pasta_cliente(cliente_entry.path)
+            except OSError as e:
+                logging.error(f"Erro ao listar cliente {cliente_entry.path}: {str(e)}")
+                continue
+            relidas[cliente_entry.path] = linhas
+            diretorios.append((cliente_entry.path, mtime, 'cliente', area_entry.path))
+            stats['pastas_relidas'] += 1
+            stats['processos_lidos'] += len(linhas)
+
+    removidos = [caminho for caminho in conhecidos if caminho not in vistos]
+    stats['pastas_removidas'] = len(removidos)
+
+    with indice_lock:
+        conn = _conectar()
+        try:
+            with conn:
+                if completo:
+                    conn.execute("DELETE FROM processos")
+                    conn.execute("DELETE FROM diretorios")
+                for caminho in removidos:
+                    conn.execute("DELETE FROM processos WHERE pasta_cliente = ?", (caminho,))
+                    conn.execute("DELETE FROM diretorios WHERE caminho = ?", (caminho,))
+                for pasta_cliente, linhas in relidas.items():
+                    conn.execute("DELETE FROM processos WHERE pasta_cliente = ?", (pasta_cliente,))
+                    _gravar_linhas(conn, linhas)
+                conn.executemany(
+                    "INSERT OR REPLACE INTO diretorios (caminho, mtime, nivel, pai) VALUES (?, ?, ?, ?)",
+                    diretorios
+                )
+                conn.execute("INSERT OR REPLACE INTO meta (chave, valor) VALUES ('varredura_completa', '1')")
+                if completo or removidos or relidas:
+                    _nova_geracao(conn)
+        finally:
+            conn.close()
+
+    logging.info(
+        f"Índice sincronizado: {stats['pastas_relidas']} pasta(s) relida(s), "
+        f"{stats['pastas_ignoradas']} ignorada(s), {stats['pastas_removidas']} removida(s)"
+    )
+    return stats
+
+
+def iniciar_sincronizacao_periodica(intervalo=None, ao_sincronizar=None):
+    """
+    Inicia (uma única vez) a thread que reconcilia o índice em segundo plano.
+    ao_sincronizar() é chamado depois de cada passada, mesmo sem mudanças encontradas
+    por ela: outro processo pode ter sincronizado antes e já gravado as mudanças.
+    """
+    global _thread_sincronizacao
+    if _thread_sincronizacao is not None and _thread_sincronizacao.is_alive():
+        return _thread_sincronizacao
+
+    intervalo = intervalo or INTERVALO_SINCRONIZACAO
+
+    def _executar():
+        while not _parar_sincronizacao.wait(intervalo):
+            try:
+                sincronizar_indice()
+                if ao_sincronizar:
+                    ao_sincronizar()
+            except Exception as e:
+                logging.error(f"Erro na sincronização do índice: {str(e)}")
+
+    _parar_sincronizacao.clear()
+    _thread_sincronizacao = Thread(target=_executar, name="sincronizacao-indice", daemon=True)
+    _thread_sincronizacao.start()
+    return _thread_sincronizacao
+
+
+def parar_sincronizacao_periodica():
+    """Sinaliza a thread de sincronização para encerrar"""
+    _parar_sincronizacao.set()
+
+
+def registrar_processo(numero, sigla_area, sigla_servico, ano, cliente, referencia, caminho):
+    """
+    Insere ou atualiza um processo no índice; retorna a nova geração do índice, ou None se
+    ele já estava registrado assim (nada é gravado e os outros processos não releem o catálogo)
+    """
+    init_indice()
+    with indice_lock:
+        conn = _conectar()
+        try:
+            with conn:
+                atual = conn.execute(
+                    "SELECT cliente, referencia, caminho FROM processos "
+                    "WHERE numero = ? AND sigla_area = ? AND sigla_servico = ? AND ano = ?",
+                    (numero, sigla_area, sigla_servico, ano)
+                ).fetchone()
+                if atual is not None and tuple(atual) == (cliente, referencia, caminho):
+                    return None
+                _gravar_linhas(conn, [(numero, sigla_area, sigla_servico, ano, cliente, referencia,
+                                       caminho, os.path.dirname(caminho))])
+                return _nova_geracao(conn)
+        finally:
+            conn.close()
+
+
+def registro_de_caminho(caminho):
+    """Retorna (chave, dados) de uma pasta de processo em BASE_DIR/<area>/<cliente>, ou None"""
+    partes = interpretar_pasta(os.path.basename(caminho))
+    if not partes:
+        return None
+    sigla_area, sigla_servico, numero, ano, referencia = partes
+    cliente = os.path.basename(os.path.dirname(caminho))
+    return (chave_processo(numero, sigla_area, sigla_servico, ano),
+            montar_registro(numero, sigla_area, sigla_servico, ano, cliente, referencia, caminho))
+
+
+def remover_processo(caminho):
+    """Remove do índice o processo cuja pasta é caminho; retorna a nova geração do índice"""
+    init_indice()
+    with indice_lock:
+        conn = _conectar()
+        try:
+            with conn:
+                conn.execute("DELETE FROM processos WHERE caminho = ?", (caminho,))
+                return _nova_geracao(conn)
+        finally:
+            conn.close()
+
+
+def indice_inicializado():
+    """Indica se já houve ao menos uma varredura completa do BASE_DIR"""
+    init_indice()
+    conn = _conectar()
+    try:
+        row = conn.execute("SELECT valor FROM meta WHERE chave = 'varredura_completa'").fetchone()
+        return row is not None
+    finally:
+        conn.close()
+
+
+def carregar_processos():
+    """Retorna os processos do índice no formato {chave: dados}"""
+    if not indice_inicializado():
+        reconstruir_indice()
+
+    processos = {}
+    conn = _conectar()
+    try:
+        for row in conn.execute("SELECT * FROM processos"):
+            processos[chave_processo(row['numero'], row['sigla_area'], row['sigla_servico'], row['ano'])] = \
+                montar_registro(row['numero'], row['sigla_area'], row['sigla_servico'], row['ano'],
+                                row['cliente'], row['referencia'], row['caminho'])
+    finally:
+        conn.close()
+    return processos
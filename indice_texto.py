@@ -0,0 +1,407 @@
+"""
+Índice de texto completo dos documentos das pastas de processo (SQLite FTS5).
+
+O indexador roda em segundo plano, separado do servidor web e do aplicativo:
+
+    python indice_texto.py            # sincroniza a cada [TEXTO] intervalo segundos
+    python indice_texto.py --uma-vez  # uma passada e sai
+
+Cada arquivo é identificado por caminho, tamanho e mtime; só os novos ou alterados
+são lidos de novo, e os apagados saem do índice. A leitura roda em processos separados
+(extracao_paralela), alimentados por uma fila limitada enquanto as pastas são varridas.
+
+Imagens e PDFs com páginas sem camada de texto ficam marcados para o OCR (módulo ocr),
+que roda depois de cada passada, com menos processos e começando pelos processos que
+receberam arquivos mais recentemente.
+"""
+import os
+import re
+import sys
+import time
+import queue
+import sqlite3
+import logging
+from functools import partial
+from threading import Lock, Thread
+from configparser import ConfigParser
+from indice_processos import INDICE_DB
+from catalogo import obter_processos, ressincronizar
+from extracao import extraivel, ler_documento
+from extracao_paralela import extrair_em_paralelo, PROCESSOS_EXTRACAO
+from ocr import (
+    ocr_documento, ocr_disponivel, OCR_SIMULTANEOS, TEMPO_MAXIMO_OCR, DOCUMENTOS_POR_PASSADA,
+    TENTATIVAS_OCR, ESPERA_NOVA_TENTATIVA
+)
+
+# Carregar configurações
+config = ConfigParser()
+config.read('config.ini')
+
+# Fica ao lado do índice de processos, salvo se configurado explicitamente
+TEXTO_DB = config.get('PATHS', 'TEXTO_FILE', fallback=os.path.join(os.path.dirname(INDICE_DB), 'texto.db'))
+INTERVALO_TEXTO = config.getint('TEXTO', 'intervalo', fallback=300)
+# Arquivos maiores que isso não são lidos (normalmente são digitalizações sem texto)
+TAMANHO_MAXIMO = config.getint('TEXTO', 'tamanho_maximo_mb', fallback=100) * 1024 * 1024
+LIMITE_CARACTERES = config.getint('TEXTO', 'limite_caracteres', fallback=1_000_000)
+# Vale também para o cache de OCR; sem a chave, segue o de [CLIENTES]. "wal" só com o
+# banco em disco local: no compartilhamento de rede o WAL corrompe ou lê dados velhos
+MODO_JOURNAL = config.get('TEXTO', 'journal_mode',
+                          fallback=config.get('CLIENTES', 'journal_mode', fallback='delete')).strip().lower()
+# Arquivos gravados por transação
+TAMANHO_LOTE = 50
+# Arquivos que a varredura pode deixar à frente dos processos de extração
+TAMANHO_FILA = PROCESSOS_EXTRACAO * 4
+
+texto_lock = Lock()
+_schema_criado = False
+_aviso_ocr = None
+
+
+def _conectar():
+    conn = sqlite3.connect(TEXTO_DB, timeout=30)
+    conn.row_factory = sqlite3.Row
+    return conn
+
+
+def init_texto():
+    """Cria as tabelas do índice de texto (uma única vez por execução)"""
+    global _schema_criado
+    if _schema_criado:
+        return
+    os.makedirs(os.path.dirname(TEXTO_DB), exist_ok=True)
+    conn = _conectar()
+    try:
+        # Com WAL, as buscas do servidor não esperam o indexador terminar um lote
+        conn.execute(f"PRAGMA journal_mode={MODO_JOURNAL}")
+        conn.executescript('''
+            CREATE TABLE IF NOT EXISTS documentos (
+                id INTEGER PRIMARY KEY,
+                caminho TEXT UNIQUE NOT NULL,
+                processo TEXT NOT NULL,
+                tamanho INTEGER NOT NULL,
+                mtime INTEGER NOT NULL,
+                erro TEXT,
+                ocr_pendente INTEGER NOT NULL DEFAULT 0,
+                ocr_tentativas INTEGER NOT NULL DEFAULT 0,
+                ocr_depois REAL NOT NULL DEFAULT 0
+            );
+            CREATE INDEX IF NOT EXISTS idx_documentos_processo ON documentos(processo);
+            CREATE VIRTUAL TABLE IF NOT EXISTS textos USING fts5(
+                nome, texto, tokenize = 'unicode61 remove_diacritics 2'
+            );
+        ''')
+        # Bancos criados antes do OCR não têm as colunas
+        colunas = {row['name'] for row in conn.execute("PRAGMA table_info(documentos)")}
+        for coluna, definicao in (('ocr_pendente', 'INTEGER NOT NULL DEFAULT 0'),
+                                  ('ocr_tentativas', 'INTEGER NOT NULL DEFAULT 0'),
+                                  ('ocr_depois', 'REAL NOT NULL DEFAULT 0')):
+            if coluna not in colunas:
+                conn.execute(f"ALTER TABLE documentos ADD COLUMN {coluna} {definicao}")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_documentos_ocr ON documentos(processo) WHERE ocr_pendente = 1")
+        conn.commit()
+    finally:
+        conn.close()
+    _schema_criado = True
+
+
+def arquivos_do_processo(pasta):
+    """(caminho, tamanho, mtime) de cada arquivo extraível da pasta e subpastas, sem os ocultos (.parte)"""
+    pendentes = [pasta]
+    while pendentes:
+        with os.scandir(pendentes.pop()) as entradas:
+            for entrada in entradas:
+                if entrada.name.startswith('.'):
+                    continue
+                if entrada.is_dir(follow_symlinks=False):
+                    pendentes.append(entrada.path)
+                elif entrada.is_file(follow_symlinks=False) and extraivel(entrada.name):
+                    st = entrada.stat()
+                    yield entrada.path, st.st_size, st.st_mtime_ns
+
+
+def _gravar(conn, caminho, processo, tamanho, mtime, texto, erro, ocr_pendente):
+    _esquecer(conn, [caminho])
+    cursor = conn.execute(
+        "INSERT INTO documentos (caminho, processo, tamanho, mtime, erro, ocr_pendente) VALUES (?, ?, ?, ?, ?, ?)",
+        (caminho, processo, tamanho, mtime, erro, int(ocr_pendente))
+    )
+    conn.execute("INSERT INTO textos (rowid, nome, texto) VALUES (?, ?, ?)",
+                 (cursor.lastrowid, os.path.basename(caminho), texto))
+
+
+def _esquecer(conn, caminhos):
+    for caminho in caminhos:
+        row = conn.execute("SELECT id FROM documentos WHERE caminho = ?", (caminho,)).fetchone()
+        if row is not None:
+            conn.execute("DELETE FROM textos WHERE rowid = ?", (row['id'],))
+            conn.execute("DELETE FROM documentos WHERE id = ?", (row['id'],))
+
+
+def _gravar_lote(lote):
+    with texto_lock:
+        conn = _conectar()
+        try:
+            with conn:
+                for item in lote:
+                    _gravar(conn, *item)
+        finally:
+            conn.close()
+
+
+def _varrer(processos, conhecidos, vistos, grandes, stats, fila):
+    """
+    Percorre as pastas e põe na fila os arquivos novos ou alterados, como
+    (caminho, processo, tamanho, mtime); termina com None. A fila é limitada:
+    a varredura espera quando os processos de extração ficam para trás.
+    """
+    try:
+        for processo in processos:
+            try:
+                for caminho, tamanho, mtime in arquivos_do_processo(processo):
+                    vistos.add(caminho)
+                    if conhecidos.get(caminho, (None, None))[:2] == (tamanho, mtime):
+                        stats['inalterados'] += 1
+                    elif tamanho > TAMANHO_MAXIMO:
+                        # Normalmente são digitalizações sem texto; vão para o índice como falha
+                        grandes.append((caminho, processo, tamanho, mtime))
+                    else:
+                        fila.put((caminho, processo, tamanho, mtime))
+            except OSError as e:
+                # Pasta inacessível agora: mantém o que já foi indexado dela
+                logging.error(f"Erro ao listar {processo}: {str(e)}")
+                vistos.update(c for c, dados in conhecidos.items() if dados[2] == processo)
+    except Exception as e:
+        logging.error(f"Erro na varredura do índice de texto: {str(e)}")
+        # Sem a lista completa não dá para saber o que foi apagado
+        vistos.update(conhecidos)
+    finally:
+        fila.put(None)
+
+
+def sincronizar_textos():
+    """
+    Lê os arquivos novos ou alterados de todas as pastas de processo e remove do índice
+    os que sumiram. Retorna um dicionário com as contagens.
+    """
+    init_texto()
+    stats = {'extraidos': 0, 'inalterados': 0, 'removidos': 0, 'falhas': 0}
+
+    conn = _conectar()
+    try:
+        conhecidos = {row['caminho']: (row['tamanho'], row['mtime'], row['processo'])
+                      for row in conn.execute("SELECT caminho, tamanho, mtime, processo FROM documentos")}
+    finally:
+        conn.close()
+
+    processos = {dados['caminho'] for dados in obter_processos().values()}
+    vistos = set()
+    grandes = []
+    fila = queue.Queue(maxsize=TAMANHO_FILA)
+    varredura = Thread(
+        target=_varrer, args=(processos, conhecidos, vistos, grandes, stats, fila),
+        name="varredura-texto", daemon=True
+    )
+    varredura.start()
+
+    lote = []
+
+    def ao_resultado(tarefa, resultado, erro):
+        nonlocal lote
+        stats['falhas' if erro else 'extraidos'] += 1
+        texto, ocr_pendente = resultado or ("", False)
+        lote.append((*tarefa, texto, erro, ocr_pendente))
+        if len(lote) >= TAMANHO_LOTE:
+            _gravar_lote(lote)
+            lote = []
+
+    extrair_em_paralelo(fila, ao_resultado, partial(ler_documento, limite=LIMITE_CARACTERES))
+    varredura.join()
+    for tarefa in grandes:
+        ao_resultado(tarefa, None, f"Maior que {TAMANHO_MAXIMO // (1024 * 1024)} MB")
+    _gravar_lote(lote)
+
+    removidos = [caminho for caminho in conhecidos if caminho not in vistos]
+    if removidos:
+        with texto_lock:
+            conn = _conectar()
+            try:
+                with conn:
+                    _esquecer(conn, removidos)
+            finally:
+                conn.close()
+    stats['removidos'] = len(removidos)
+
+    logging.info(
+        f"Índice de texto: {stats['extraidos']} extraído(s), {stats['falhas']} falha(s), "
+        f"{stats['inalterados']} inalterado(s), {stats['removidos']} removido(s)"
+    )
+    return stats
+
+
+def _gravar_ocr(id_documento, tamanho, mtime, texto, erro):
+    """
+    Junta o texto do OCR ao do documento, se o arquivo não mudou desde que foi marcado.
+    Com erro (tempo esgotado, processo derrubado, falha do tesseract) o documento continua
+    marcado e volta depois de uma espera que dobra a cada falha; só sai da fila com erro
+    depois de TENTATIVAS_OCR falhas. Retorna True se o documento ficou para outra tentativa.
+    """
+    with texto_lock:
+        conn = _conectar()
+        try:
+            with conn:
+                if erro is None:
+                    cursor = conn.execute(
+                        "UPDATE documentos SET ocr_pendente = 0, erro = NULL "
+                        "WHERE id = ? AND tamanho = ? AND mtime = ? AND ocr_pendente = 1",
+                        (id_documento, tamanho, mtime)
+                    )
+                    if cursor.rowcount and texto:
+                        conn.execute("UPDATE textos SET texto = substr(texto || ?, 1, ?) WHERE rowid = ?",
+                                     ("\n" + texto, LIMITE_CARACTERES, id_documento))
+                    return False
+                # No SET, ocr_tentativas ainda é o valor anterior
+                conn.execute(
+                    "UPDATE documentos SET erro = ?, ocr_tentativas = ocr_tentativas + 1, "
+                    "ocr_pendente = CASE WHEN ocr_tentativas + 1 >= ? THEN 0 ELSE 1 END, "
+                    "ocr_depois = ? + ? * (1 << ocr_tentativas) "
+                    "WHERE id = ? AND tamanho = ? AND mtime = ? AND ocr_pendente = 1",
+                    (f"OCR: {erro}", TENTATIVAS_OCR, time.time(), ESPERA_NOVA_TENTATIVA,
+                     id_documento, tamanho, mtime)
+                )
+                row = conn.execute("SELECT ocr_pendente FROM documentos WHERE id = ?", (id_documento,)).fetchone()
+                return bool(row and row['ocr_pendente'])
+        finally:
+            conn.close()
+
+
+def reconhecer_pendentes(limite=DOCUMENTOS_POR_PASSADA):
+    """
+    OCR de até limite documentos marcados pela sincronização, começando pelos processos
+    com o arquivo mais recente (os que acabaram de receber envios). Retorna um dicionário
+    com as contagens, ou None se o OCR não estiver disponível.
+    """
+    global _aviso_ocr
+    disponivel, motivo = ocr_disponivel()
+    if not disponivel:
+        # Os documentos continuam marcados; o aviso sai uma vez por motivo
+        if motivo != _aviso_ocr:
+            logging.warning(f"OCR não executado: {motivo}")
+            _aviso_ocr = motivo
+        return None
+    init_texto()
+    stats = {'reconhecidos': 0, 'falhas': 0, 'adiados': 0}
+
+    conn = _conectar()
+    try:
+        pendentes = conn.execute('''
+            SELECT d.caminho, d.id, d.tamanho, d.mtime
+            FROM documentos d
+            JOIN (SELECT processo, MAX(mtime) AS recente FROM documentos GROUP BY processo) p
+              ON p.processo = d.processo
+            WHERE d.ocr_pendente = 1 AND d.ocr_depois <= ?
+            ORDER BY p.recente DESC, d.mtime DESC
+            LIMIT ?
+        ''', (time.time(), limite)).fetchall()
+    finally:
+        conn.close()
+    if not pendentes:
+        return stats
+
+    fila = queue.Queue()
+    for row in pendentes:
+        fila.put(tuple(row))
+    fila.put(None)
+
+    def ao_resultado(tarefa, texto, erro):
+        # Um documento por transação: cada um leva segundos, e já fica pesquisável
+        if _gravar_ocr(*tarefa[1:], texto, erro):
+            stats['adiados'] += 1
+        else:
+            stats['falhas' if erro else 'reconhecidos'] += 1
+
+    extrair_em_paralelo(fila, ao_resultado, partial(ocr_documento, limite=LIMITE_CARACTERES),
+                        processos=OCR_SIMULTANEOS, tempo_maximo=TEMPO_MAXIMO_OCR)
+    logging.info(
+        f"OCR: {stats['reconhecidos']} documento(s) reconhecido(s), {stats['falhas']} falha(s), "
+        f"{stats['adiados']} para nova tentativa"
+    )
+    return stats
+
+
+def _expressao_fts(consulta):
+    """Cada palavra da consulta vira um termo exigido, aceitando prefixo ("contain" acha "container")"""
+    termos = re.findall(r'\w+', consulta)
+    return " ".join(f'"{termo}"*' for termo in termos)
+
+
+def buscar_texto(consulta, limite=50, processo=None, processos=None):
+    """
+    Documentos que contêm todas as palavras da consulta, do mais para o menos relevante.
+    Cada item traz caminho, nome, processo (pasta) e um trecho com os termos entre colchetes.
+    processos (pastas) restringe a busca antes do limite, como processo para uma pasta só.
+    """
+    expressao = _expressao_fts(consulta)
+    if not expressao:
+        return []
+    init_texto()
+    sql = ("SELECT d.caminho, d.processo, textos.nome AS nome, "
+           "snippet(textos, 1, '[', ']', '…', 12) AS trecho "
+           "FROM textos JOIN documentos d ON d.id = textos.rowid WHERE textos MATCH ?")
+    parametros = [expressao]
+    if processo is not None:
+        sql += " AND d.processo = ?"
+        parametros.append(processo)
+    if processos is not None:
+        sql += " AND d.processo IN (SELECT processo FROM permitidos)"
+    sql += " ORDER BY bm25(textos) LIMIT ?"
+    parametros.append(limite)
+
+    conn = _conectar()
+    try:
+        if processos is not None:
+            # Tabela temporária (só desta conexão): a lista pode ter milhares de pastas
+            conn.execute("CREATE TEMP TABLE permitidos (processo TEXT PRIMARY KEY)")
+            conn.executemany("INSERT OR IGNORE INTO permitidos VALUES (?)", ((p,) for p in processos))
+        return [dict(row) for row in conn.execute(sql, parametros)]
+    finally:
+        conn.close()
+
+
+def buscar_processos_por_texto(consulta, limite=200, processos=None):
+    """
+    {pasta do processo: documentos encontrados}, na ordem de relevância do melhor documento
+    de cada pasta; com processos, só as pastas dessa lista
+    """
+    encontrados = {}
+    for documento in buscar_texto(consulta, limite, processos=processos):
+        encontrados.setdefault(documento['processo'], []).append(documento)
+    return encontrados
+
+
+def main():
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(levelname)s - %(message)s',
+        filename='indice_texto.log'
+    )
+    if '--uma-vez' in sys.argv:
+        ressincronizar()
+        sincronizar_textos()
+        reconhecer_pendentes()
+        return
+    while True:
+        ocr = None
+        try:
+            # O catálogo deste processo não tem observador; relê as pastas antes de cada passada
+            ressincronizar()
+            sincronizar_textos()
+            ocr = reconhecer_pendentes()
+        except Exception as e:
+            logging.error(f"Erro na indexação de texto: {str(e)}")
+        # Com OCR atrasado, a próxima passada começa logo (e vê os envios novos primeiro)
+        if not ocr or sum(ocr.values()) < DOCUMENTOS_POR_PASSADA:
+            time.sleep(INTERVALO_TEXTO)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,125 @@
+"""
+Listagem dos arquivos de uma pasta de processo (e subpastas), com tamanho, data e tipo.
+
+Cada pasta lida fica em cache com o mtime dela; enquanto o mtime não muda, a listagem
+sai da memória e custa só um stat por pasta. Criar, apagar ou renomear um arquivo muda
+o mtime da pasta; alterar o conteúdo de um arquivo no lugar não muda, e o tamanho e a
+data dele só se atualizam quando a pasta mudar (os envios do sistema sempre gravam
+num temporário e renomeiam).
+"""
+import os
+import hashlib
+import mimetypes
+from threading import Lock
+from collections import OrderedDict
+from miniaturas import previsualizavel
+
+# Pastas e listagens de processo guardadas em cache (as usadas há mais tempo saem primeiro)
+MAX_PASTAS_CACHE = 2000
+MAX_LISTAGENS_CACHE = 50
+
+_cache = OrderedDict()
+_listagens = OrderedDict()
+cache_lock = Lock()
+
+
+def _ler_pasta(pasta):
+    """(arquivos, subpastas) de uma pasta, sem os ocultos (.parte dos envios em andamento)"""
+    arquivos = []
+    subpastas = []
+    with os.scandir(pasta) as entradas:
+        for entrada in entradas:
+            if entrada.name.startswith('.'):
+                continue
+            if entrada.is_dir(follow_symlinks=False):
+                subpastas.append(entrada.name)
+            elif entrada.is_file(follow_symlinks=False):
+                st = entrada.stat()
+                arquivos.append({
+                    "nome": entrada.name,
+                    "tamanho": st.st_size,
+                    "modificado": int(st.st_mtime),
+                    "tipo": mimetypes.guess_type(entrada.name)[0] or "application/octet-stream",
+                    "previa": previsualizavel(entrada.name)
+                })
+    return arquivos, subpastas
+
+
+def _pasta_em_cache(pasta):
+    """Conteúdo da pasta e o mtime dela, relida só se o mtime mudou"""
+    mtime = os.stat(pasta).st_mtime_ns
+    chave = os.path.normcase(pasta)
+    with cache_lock:
+        guardado = _cache.get(chave)
+        if guardado is not None and guardado[0] == mtime:
+            _cache.move_to_end(chave)
+            return guardado
+    arquivos, subpastas = _ler_pasta(pasta)
+    guardado = (mtime, arquivos, subpastas)
+    with cache_lock:
+        _cache[chave] = guardado
+        _cache.move_to_end(chave)
+        while len(_cache) > MAX_PASTAS_CACHE:
+            _cache.popitem(last=False)
+    return guardado
+
+
+def listar_arquivos(pasta):
+    """
+    Retorna (arquivos, versao): os arquivos da pasta e subpastas ordenados pelo caminho
+    relativo ("arquivo", com / como separador), e uma versão que muda sempre que alguma
+    das pastas muda (serve de ETag). A lista devolvida é compartilhada: não altere.
+    """
+    versao = hashlib.sha1()
+    lidas = []
+    pendentes = [""]
+    while pendentes:
+        relativo = pendentes.pop()
+        try:
+            mtime, itens, subpastas = _pasta_em_cache(os.path.join(pasta, relativo) if relativo else pasta)
+        except FileNotFoundError:
+            # Subpasta apagada depois de a pasta de cima ser lida; a de cima já mudou de mtime
+            if not relativo:
+                raise
+            continue
+        versao.update(f"{relativo}|{mtime}\n".encode('utf-8'))
+        lidas.append((relativo, itens))
+        pendentes.extend(f"{relativo}/{nome}" if relativo else nome for nome in subpastas)
+    versao = versao.hexdigest()
+
+    # Pasta enorme paginada: a lista montada e ordenada é reaproveitada entre as páginas
+    chave = os.path.normcase(pasta)
+    with cache_lock:
+        montada = _listagens.get(chave)
+    if montada is not None and montada[0] == versao:
+        return montada[1], versao
+
+    arquivos = [
+        dict(item, arquivo=f"{relativo}/{item['nome']}" if relativo else item['nome'])
+        for relativo, itens in lidas for item in itens
+    ]
+    arquivos.sort(key=_chave_arquivo)
+    with cache_lock:
+        _listagens[chave] = (versao, arquivos)
+        _listagens.move_to_end(chave)
+        while len(_listagens) > MAX_LISTAGENS_CACHE:
+            _listagens.popitem(last=False)
+    return arquivos, versao
+
+
+def _chave_arquivo(item):
+    """Ordem da listagem (e da paginação): caminho sem diferenciar maiúsculas"""
+    return item['arquivo'].lower(), item['arquivo']
+
+
+def posicao_apos(arquivos, apos):
+    """Índice do primeiro arquivo depois de apos na ordem da listagem (paginação por cursor)"""
+    chave = _chave_arquivo({'arquivo': apos})
+    inicio, fim = 0, len(arquivos)
+    while inicio < fim:
+        meio = (inicio + fim) // 2
+        if _chave_arquivo(arquivos[meio]) <= chave:
+            inicio = meio + 1
+        else:
+            fim = meio
+    return inicio
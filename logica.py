@@ -1,10 +1,12 @@
 import os
-import shutil
-import re
-from tkinter import messagebox
 import subprocess
 import sys
 import configparser
+import logging
+from catalogo import obter_processos, registrar_pasta
+from copiador import (
+    tarefa_copia, copiar_em_paralelo, relatorio_copia, resultado_sem_copia, reservar_nome, descrever_vazao
+)
 
 # Carregar configurações
 config = configparser.ConfigParser()
@@ -13,77 +15,122 @@ config.read('config.ini')
 BASE_DIR = config.get('PATHS', 'BASE_DIR', fallback="D:/Arquivo Digital")
 EXTENSOES_BLOQUEADAS = {'.exe', '.bat', '.cmd', '.ps1', '.vbs', '.js', '.jar', '.msi', '.dll'}
 
+# O que fazer quando o arquivo já existe na pasta do processo
+SUBSTITUIR = 'substituir'
+PULAR = 'pular'
+RENOMEAR = 'renomear'
+POLITICAS_EXISTENTE = (SUBSTITUIR, PULAR, RENOMEAR)
+
 def obter_info_processos():
-    processos = {}
-    if os.path.exists(BASE_DIR):
-        for area in os.listdir(BASE_DIR):
-            area_path = os.path.join(BASE_DIR, area)
-            if os.path.isdir(area_path):
-                for cliente in os.listdir(area_path):
-                    cliente_path = os.path.join(area_path, cliente)
-                    if os.path.isdir(cliente_path):
-                        for pasta in os.listdir(cliente_path):
-                            match = re.search(r'([IE])([ARM])-(\d{6})-(\d{2}) - (.+)', pasta)
-                            if match:
-                                numero_processo = match.group(3)
-                                processos[f"{numero_processo}_{match.group(1)}{match.group(2)}{match.group(4)}"] = {
-                                    "numero": numero_processo,
-                                    "cliente": cliente,
-                                    "area": "IMPORTAÇÃO" if match.group(1) == "I" else "EXPORTAÇÃO",
-                                    "servico": {"A": "Aéreo", "R": "Rodoviário", "M": "Marítimo"}[match.group(2)],
-                                    "ano": match.group(4),
-                                    "referencia": match.group(5),
-                                    "caminho": os.path.join(area_path, cliente, pasta)
-                                }
-    return processos
+    """Retorna os processos do catálogo em memória (sem varrer o BASE_DIR). Não alterar o retorno."""
+    return obter_processos()
 
 def validar_arquivo(arquivo_path):
     """Valida se o arquivo tem extensão permitida"""
     _, ext = os.path.splitext(arquivo_path)
     return ext.lower() not in EXTENSOES_BLOQUEADAS
 
-def criar_pasta(cliente, area, servico, numero_processo, ano, referencia):
+def caminho_pasta_processo(cliente, area, servico, numero_processo, ano, referencia):
+    """Caminho da pasta do processo, sem criá-la"""
     sigla_area = "I" if area == "IMPORTAÇÃO" else "E"
     sigla_servico = servico[0].upper()
     nome_pasta = f"{sigla_area}{sigla_servico}-{numero_processo}-{ano} - {referencia.upper()}"
-    caminho_pasta = os.path.join(BASE_DIR, area, cliente, nome_pasta)
+    return os.path.join(BASE_DIR, area, cliente, nome_pasta)
+
+def criar_pasta(cliente, area, servico, numero_processo, ano, referencia):
+    caminho_pasta = caminho_pasta_processo(cliente, area, servico, numero_processo, ano, referencia)
     os.makedirs(caminho_pasta, exist_ok=True)
+    try:
+        registrar_pasta(caminho_pasta)
+    except Exception as e:
+        logging.error(f"Erro ao registrar processo no índice: {str(e)}")
     return caminho_pasta
 
-def copiar_arquivos(pasta_destino, arquivos):
+def _resolver_politica(politica, arquivo, destino):
+    decisao = politica(arquivo, destino) if callable(politica) else politica
+    if decisao not in POLITICAS_EXISTENTE:
+        raise ValueError(f"Política de arquivo existente inválida: {decisao}")
+    return decisao
+
+def planejar_copia(pasta_destino, arquivos, politica=PULAR, validar=validar_arquivo):
+    """
+    Decide, sem copiar nada, o destino de cada arquivo ({'name', 'path'} e, opcional, 'hash').
+
+    Se o destino já existir, aplica politica: SUBSTITUIR, PULAR, RENOMEAR ("nome (2).ext")
+    ou uma função politica(arquivo, destino) que devolve uma delas (por exemplo,
+    perguntando ao usuário), chamada na thread de quem chamou. validar(caminho) diz se o
+    tipo de arquivo é aceito. Um nome repetido dentro do próprio lote conta como existente.
+    Retorna (tarefas, ignorados): as tarefas de cópia e os resultados dos arquivos
+    bloqueados ou pulados, no formato dos resultados de copiador.
+    """
+    tarefas = []
+    ignorados = []
+    # Destinos já tomados por arquivos deste lote (as cópias rodam em paralelo)
+    reservados = set()
     for arquivo in arquivos:
-        try:
-            destino = os.path.join(pasta_destino, arquivo['name'])
-            
-            # Verifica se é um arquivo temporário do Outlook
-            if 'outlook_attach_' in arquivo['path'].lower():
-                # Move o arquivo em vez de copiar
-                os.makedirs(os.path.dirname(destino), exist_ok=True)
-                shutil.move(arquivo['path'], destino)
+        destino = os.path.join(pasta_destino, arquivo['name'])
+        chave = os.path.normcase(destino)
+        
+        # Arquivo temporário do Outlook ainda no local original é movido em vez de copiado;
+        # os já trazidos para a pasta temporária do sistema (is_temp) são só copiados
+        mover = 'outlook_attach_' in arquivo['path'].lower() and not arquivo.get('is_temp')
+        tarefa = tarefa_copia(arquivo['path'], destino, mover=mover, nome=arquivo['name'], digest=arquivo.get('hash'))
+        tarefa['acao'] = 'novo'
+        tarefa['arquivo'] = arquivo  # Item recebido, para quem chamou relacionar o resultado
+        
+        temporario = mover or arquivo.get('is_temp')
+        if not temporario and not validar(arquivo['path']):
+            ignorados.append(resultado_sem_copia(
+                tarefa, erro=f"Tipo de arquivo não permitido: {os.path.splitext(arquivo['path'])[1]}"
+            ))
+            continue
+        
+        if chave in reservados or os.path.exists(destino):
+            decisao = _resolver_politica(politica, arquivo, destino)
+            if decisao == PULAR:
+                ignorados.append(resultado_sem_copia(tarefa, erro="Já existe no destino", pulado=True))
                 continue
-                
-            # Processamento normal para outros arquivos
-            if not validar_arquivo(arquivo['path']):
-                messagebox.showerror("Erro", f"Tipo de arquivo não permitido: {os.path.splitext(arquivo['path'])[1]}")
-                return False
-                
-            os.makedirs(os.path.dirname(destino), exist_ok=True)
-            
-            if os.path.exists(destino):
-                resposta = messagebox.askyesno("Arquivo Existente", f"Substituir {arquivo['name']}?")
-                if not resposta:
-                    return False
-            
-            shutil.copy2(arquivo['path'], destino)
-            
-        except Exception as e:
-            messagebox.showerror("Erro", f"Falha ao copiar {arquivo['name']}: {str(e)}")
-            return False
+            # Substituir um arquivo do mesmo lote dependeria da ordem das cópias paralelas: renomeia
+            if decisao == RENOMEAR or chave in reservados:
+                decisao = RENOMEAR
+                tarefa['destino'] = reservar_nome(pasta_destino, arquivo['name'])
+            tarefa['acao'] = decisao
+        
+        reservados.add(os.path.normcase(tarefa['destino']))
+        tarefas.append(tarefa)
+    return tarefas, ignorados
+
+def executar_copia(tarefas, ignorados=(), max_threads=None, ao_concluir=None, ao_progresso=None, cancelar=None):
+    """
+    Executa as tarefas de planejar_copia no pool de cópia. Não usa interface, então pode
+    rodar em threads de trabalho e no servidor web. Retorna o relatório de copiador com
+    um resultado por arquivo, incluindo os ignorados no planejamento.
+    """
+    relatorio = copiar_em_paralelo(tarefas, max_threads, ao_concluir, ao_progresso, cancelar)
+    for resultado in relatorio['resultados']:
+        # Nome reservado para renomear que acabou não recebendo o arquivo
+        if resultado['acao'] == RENOMEAR and not resultado['ok']:
+            try:
+                if os.path.getsize(resultado['destino']) == 0:
+                    os.remove(resultado['destino'])
+            except OSError:
+                pass
+    relatorio = relatorio_copia(relatorio['resultados'] + list(ignorados), relatorio['segundos'])
     
-    return True
+    logging.info(f"{relatorio['sucessos']} arquivo(s) copiado(s): {descrever_vazao(relatorio)}")
+    for duplicado in relatorio['duplicados']:
+        logging.info(f"Conteúdo duplicado ({duplicado['duplicado']}): {duplicado['destino']} = {duplicado['canonico']}")
+    for falha in relatorio['falhas']:
+        logging.error(f"Falha ao copiar {falha['nome']}: {falha['erro']}")
+    return relatorio
+
+def copiar_arquivos(pasta_destino, arquivos, politica=PULAR, validar=validar_arquivo, **opcoes):
+    """Planeja e executa a cópia dos arquivos para a pasta do processo (ver planejar_copia e executar_copia)"""
+    tarefas, ignorados = planejar_copia(pasta_destino, arquivos, politica, validar)
+    return executar_copia(tarefas, ignorados, **opcoes)
 
 def abrir_pasta_processo(caminho_pasta):
-    """Abre a pasta do processo no explorador de arquivos"""
+    """Abre a pasta do processo no explorador de arquivos; retorna False (e registra o erro) se não conseguir"""
     try:
         if os.name == 'nt':  # Windows
             os.startfile(caminho_pasta)
@@ -91,5 +138,5 @@ def abrir_pasta_processo(caminho_pasta):
             subprocess.run(['open' if sys.platform == 'darwin' else 'xdg-open', caminho_pasta])
         return True
     except Exception as e:
-        messagebox.showerror("Erro", f"Não foi possível abrir a pasta: {str(e)}")
+        logging.error(f"Não foi possível abrir a pasta {caminho_pasta}: {str(e)}")
         return False
\ No newline at end of file
@@ -0,0 +1,182 @@
+"""
+Miniaturas da primeira página de PDFs e de imagens, para ver o que é cada documento
+sem abri-lo.
+
+Ficam em disco, uma por conteúdo (o SHA-256 do índice de conteúdo): o mesmo documento
+em vários processos tem uma miniatura só. Só são geradas quando pedidas e ainda não
+existem. Quando a pasta passa de [MINIATURAS] limite_mb, as usadas há mais tempo são
+apagadas (cada uso atualiza a data de modificação do arquivo).
+"""
+import io
+import os
+import uuid
+import logging
+from threading import Lock, BoundedSemaphore
+from configparser import ConfigParser
+from indice_processos import INDICE_DB
+from conteudo import hash_arquivo, hash_registrado, registrar_conteudo
+from extracao import EXTENSOES_PDF, EXTENSOES_IMAGEM
+
+try:
+    import pymupdf
+    HAS_PYMUPDF = True
+except ImportError:
+    HAS_PYMUPDF = False
+
+try:
+    from PIL import Image, ImageOps
+    HAS_PIL = True
+except ImportError:
+    HAS_PIL = False
+
+# Carregar configurações
+config = ConfigParser()
+config.read('config.ini')
+
+MINIATURAS_DIR = config.get('PATHS', 'MINIATURAS_DIR', fallback=os.path.join(os.path.dirname(INDICE_DB), 'miniaturas'))
+# Lado maior da miniatura, em pixels
+TAMANHO_MINIATURA = config.getint('MINIATURAS', 'tamanho', fallback=320)
+LIMITE_CACHE = config.getint('MINIATURAS', 'limite_mb', fallback=512) * 1024 * 1024
+# Renderizações ao mesmo tempo neste processo; uma página cheia de miniaturas novas não trava o servidor
+RENDERIZACOES_SIMULTANEAS = config.getint('MINIATURAS', 'simultaneas', fallback=2)
+QUALIDADE_JPEG = 80
+
+EXTENSOES_PREVIA = (EXTENSOES_PDF if HAS_PYMUPDF else set()) | (EXTENSOES_IMAGEM if HAS_PIL else set())
+
+_renderizacoes = BoundedSemaphore(RENDERIZACOES_SIMULTANEAS)
+cache_lock = Lock()
+# Bytes ocupados pelo cache; medido na primeira gravação e acompanhado depois
+_ocupado = None
+
+
+def previsualizavel(caminho):
+    """Indica se há como gerar miniatura para a extensão do arquivo"""
+    return os.path.splitext(caminho)[1].lower() in EXTENSOES_PREVIA
+
+
+def _hash_conteudo(caminho):
+    """Hash do índice de conteúdo; calculado e registrado se o arquivo ainda não tem"""
+    digest = hash_registrado(caminho)
+    if digest is None:
+        digest = hash_arquivo(caminho)
+        registrar_conteudo(caminho, digest)
+    return digest
+
+
+def _caminho_miniatura(digest):
+    # Subpastas pelos dois primeiros caracteres, para não juntar milhares de arquivos numa pasta só
+    return os.path.join(MINIATURAS_DIR, digest[:2], f"{digest}_{TAMANHO_MINIATURA}.jpg")
+
+
+def _renderizar_pdf(caminho):
+    with pymupdf.open(caminho) as documento:
+        if documento.needs_pass or documento.page_count == 0:
+            return None
+        pagina = documento[0]
+        escala = TAMANHO_MINIATURA / max(pagina.rect.width, pagina.rect.height)
+        pixmap = pagina.get_pixmap(matrix=pymupdf.Matrix(escala, escala), alpha=False)
+        return pixmap.tobytes("jpeg", jpg_quality=QUALIDADE_JPEG)
+
+
+def _renderizar_imagem(caminho):
+    with Image.open(caminho) as imagem:
+        # JPEG grande: decodifica já reduzido, sem carregar a foto inteira
+        imagem.draft('RGB', (TAMANHO_MINIATURA, TAMANHO_MINIATURA))
+        miniatura = ImageOps.exif_transpose(imagem).convert('RGB')
+    miniatura.thumbnail((TAMANHO_MINIATURA, TAMANHO_MINIATURA))
+    saida = io.BytesIO()
+    miniatura.save(saida, 'JPEG', quality=QUALIDADE_JPEG)
+    return saida.getvalue()
+
+
+def _listar_cache():
+    """(mtime, tamanho, caminho) de cada miniatura em disco"""
+    arquivos = []
+    try:
+        with os.scandir(MINIATURAS_DIR) as subpastas:
+            for subpasta in subpastas:
+                if not subpasta.is_dir():
+                    continue
+                with os.scandir(subpasta.path) as entradas:
+                    for entrada in entradas:
+                        if entrada.name.endswith('.jpg'):
+                            st = entrada.stat()
+                            arquivos.append((st.st_mtime, st.st_size, entrada.path))
+    except FileNotFoundError:
+        pass
+    return arquivos
+
+
+def liberar_cache(limite=LIMITE_CACHE):
+    """Apaga as miniaturas usadas há mais tempo até o cache caber em 90% do limite; retorna os bytes restantes"""
+    arquivos = _listar_cache()
+    ocupado = sum(tamanho for _, tamanho, _ in arquivos)
+    if ocupado <= limite:
+        return ocupado
+    # Folga de 10% para não varrer a pasta de novo a cada miniatura nova
+    alvo = limite * 0.9
+    for _, tamanho, caminho in sorted(arquivos):
+        if ocupado <= alvo:
+            break
+        try:
+            os.remove(caminho)
+            ocupado -= tamanho
+        except OSError:
+            pass
+    return ocupado
+
+
+def _contabilizar(tamanho):
+    global _ocupado
+    with cache_lock:
+        if _ocupado is None:
+            _ocupado = sum(t for _, t, _ in _listar_cache())
+        else:
+            _ocupado += tamanho
+        # Outros processos também gravam aqui; a contagem é refeita a cada limpeza
+        if _ocupado > LIMITE_CACHE:
+            _ocupado = liberar_cache()
+
+
+def obter_miniatura(caminho):
+    """
+    Caminho da miniatura (JPEG) do arquivo, gerada agora se ainda não existir, ou None
+    se o formato não tiver prévia ou o arquivo não puder ser lido. O nome do arquivo
+    da miniatura muda com o conteúdo e serve de ETag.
+    """
+    if not previsualizavel(caminho):
+        return None
+    try:
+        destino = _caminho_miniatura(_hash_conteudo(caminho))
+    except OSError as e:
+        logging.error(f"Erro ao ler {caminho} para a miniatura: {str(e)}")
+        return None
+    try:
+        # Marca como usada agora, para a limpeza apagar primeiro as esquecidas
+        os.utime(destino)
+        return destino
+    except FileNotFoundError:
+        pass
+
+    with _renderizacoes:
+        if os.path.exists(destino):
+            return destino
+        try:
+            if os.path.splitext(caminho)[1].lower() in EXTENSOES_PDF:
+                dados = _renderizar_pdf(caminho)
+            else:
+                dados = _renderizar_imagem(caminho)
+        except Exception as e:
+            logging.warning(f"Não foi possível gerar a miniatura de {caminho}: {str(e)}")
+            return None
+    if dados is None:
+        return None
+
+    os.makedirs(os.path.dirname(destino), exist_ok=True)
+    # Grava ao lado e troca: quem lê nunca vê uma miniatura pela metade
+    temporario = f"{destino}.{uuid.uuid4().hex}.tmp"
+    with open(temporario, 'wb') as f:
+        f.write(dados)
+    os.replace(temporario, destino)
+    _contabilizar(len(dados))
+    return destino
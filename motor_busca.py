@@ -0,0 +1,286 @@
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict
+from threading import RLock
+from catalogo import obter_processos, versao_catalogo
+from indice_processos import chave_de_registro
+from indice_texto import buscar_processos_por_texto
+
+TAMANHO_NGRAMA = 3
+CONSULTAS_EM_CACHE = 32
+
+# Campos aceitos para ordenação; o desempate é sempre por número, área e id do processo
+COLUNAS_ORDENACAO = ('numero', 'cliente', 'area', 'servico', 'ano', 'referencia')
+
+
+def chave_ordenacao(dados, coluna):
+    """Chave completa (sem empates) de um processo na ordenação pela coluna; só campos do catálogo"""
+    return (dados[coluna], dados['numero'], dados['area'], chave_de_registro(dados))
+
+
+def chave_ordenacao_valida(chave):
+    """Indica se chave tem o formato de uma chave_ordenacao (vinda de fora, como num cursor)"""
+    return isinstance(chave, (list, tuple)) and len(chave) == 4 and all(isinstance(v, str) for v in chave)
+
+
+def _ngramas(texto):
+    return {texto[i:i + TAMANHO_NGRAMA] for i in range(len(texto) - TAMANHO_NGRAMA + 1)}
+
+
+def _intersectar(conjuntos):
+    """Interseção começando pelo menor conjunto"""
+    conjuntos = sorted(conjuntos, key=len)
+    resultado = set(conjuntos[0])
+    for conjunto in conjuntos[1:]:
+        if not resultado:
+            break
+        resultado &= conjunto
+    return resultado
+
+
+class _IndiceExato:
+    """Postings valor -> ids de documentos, para filtros por igualdade (área, serviço, ano)"""
+
+    def __init__(self):
+        self.postings = {}
+
+    def adicionar(self, valor, doc_id):
+        self.postings.setdefault(valor, set()).add(doc_id)
+
+    def remover(self, valor, doc_id):
+        docs = self.postings.get(valor)
+        if docs is not None:
+            docs.discard(doc_id)
+            if not docs:
+                del self.postings[valor]
+
+    def buscar(self, valor):
+        return self.postings.get(valor, set())
+
+
+class _IndiceSubstring:
+    """
+    Busca por substring (sem diferenciar maiúsculas) via trigramas.
+
+    O índice é feito sobre os valores distintos (muitos processos compartilham o mesmo
+    cliente), e cada valor aponta para os documentos que o usam. Os trigramas dão um
+    superconjunto de candidatos, confirmado com o teste de substring só nesses valores.
+    """
+
+    def __init__(self):
+        self.docs_por_valor = {}
+        self.ngramas = {}
+
+    def adicionar(self, valor, doc_id):
+        valor = valor.upper()
+        docs = self.docs_por_valor.get(valor)
+        if docs is None:
+            docs = self.docs_por_valor[valor] = set()
+            for ngrama in _ngramas(valor):
+                self.ngramas.setdefault(ngrama, set()).add(valor)
+        docs.add(doc_id)
+
+    def remover(self, valor, doc_id):
+        valor = valor.upper()
+        docs = self.docs_por_valor.get(valor)
+        if docs is None:
+            return
+        docs.discard(doc_id)
+        if not docs:
+            del self.docs_por_valor[valor]
+            for ngrama in _ngramas(valor):
+                valores = self.ngramas.get(ngrama)
+                if valores is not None:
+                    valores.discard(valor)
+                    if not valores:
+                        del self.ngramas[ngrama]
+
+    def buscar(self, termo):
+        termo = termo.upper()
+        if len(termo) >= TAMANHO_NGRAMA:
+            postings = [self.ngramas.get(ngrama, set()) for ngrama in _ngramas(termo)]
+            candidatos = _intersectar(postings)
+        else:
+            # Termos curtos demais para trigramas: percorre só os valores distintos
+            candidatos = self.docs_por_valor.keys()
+        resultado = set()
+        for valor in candidatos:
+            if termo in valor:
+                resultado |= self.docs_por_valor[valor]
+        return resultado
+
+
+class IndiceBusca:
+    """Índice invertido multi-campo sobre o catálogo de processos"""
+
+    CAMPOS_EXATOS = ('area', 'servico', 'ano')
+    CAMPOS_SUBSTRING = ('cliente', 'numero', 'referencia')
+
+    def __init__(self):
+        self.lock = RLock()
+        self.documentos = {}   # doc_id -> dados
+        self.ids = {}          # chave -> doc_id
+        self._proximo_id = 0
+        self.campos = {campo: _IndiceExato() for campo in self.CAMPOS_EXATOS}
+        self.campos.update({campo: _IndiceSubstring() for campo in self.CAMPOS_SUBSTRING})
+        self.versao = 0
+        self._ordenacoes = {}  # coluna -> (versao, doc_ids ordenados, {doc_id: posição})
+        self._consultas = OrderedDict()
+
+    def _adicionar(self, chave, dados):
+        doc_id = self._proximo_id
+        self._proximo_id += 1
+        self.documentos[doc_id] = dados
+        self.ids[chave] = doc_id
+        for campo, indice in self.campos.items():
+            indice.adicionar(dados[campo], doc_id)
+
+    def _remover(self, chave):
+        doc_id = self.ids.pop(chave)
+        dados = self.documentos.pop(doc_id)
+        for campo, indice in self.campos.items():
+            indice.remover(dados[campo], doc_id)
+
+    def atualizar(self, processos):
+        """Aplica as diferenças entre o índice e o dicionário de processos do catálogo"""
+        with self.lock:
+            for chave in [c for c in self.ids if c not in processos]:
+                self._remover(chave)
+            for chave, dados in processos.items():
+                doc_id = self.ids.get(chave)
+                if doc_id is not None:
+                    # O catálogo troca o dicionário do processo quando ele muda
+                    if self.documentos[doc_id] is dados:
+                        continue
+                    self._remover(chave)
+                self._adicionar(chave, dados)
+            self.versao += 1
+
+    def filtrar(self, cliente="", numero="", ano="", area="", servico="", referencia=""):
+        """Retorna o conjunto de doc_ids que atendem a todos os filtros informados"""
+        filtros = {'cliente': cliente, 'numero': numero, 'ano': ano,
+                   'area': area, 'servico': servico, 'referencia': referencia}
+        with self.lock:
+            postings = [self.campos[campo].buscar(valor) for campo, valor in filtros.items() if valor]
+            if not postings:
+                return set(self.documentos)
+            return _intersectar(postings)
+
+    def buscar(self, **filtros):
+        """Retorna os dados dos processos que atendem aos filtros"""
+        with self.lock:
+            return [self.documentos[doc_id] for doc_id in self.filtrar(**filtros)]
+
+    def _ordenacao(self, coluna):
+        """Ordenação pré-calculada de todos os documentos pela coluna (refeita quando o índice muda)"""
+        versao, ordem, posicao = self._ordenacoes.get(coluna, (None, None, None))
+        if versao != self.versao:
+            documentos = self.documentos
+            ordem = sorted(documentos, key=lambda d: chave_ordenacao(documentos[d], coluna))
+            posicao = {doc_id: i for i, doc_id in enumerate(ordem)}
+            self._ordenacoes[coluna] = (self.versao, ordem, posicao)
+        return ordem, posicao
+
+    def _ordenados(self, filtros, coluna):
+        """Lista completa (crescente) dos doc_ids filtrados, guardada em cache para a troca de página"""
+        chave = (self.versao, coluna, tuple(sorted(filtros.items())))
+        ordenados = self._consultas.get(chave)
+        if ordenados is not None:
+            self._consultas.move_to_end(chave)
+            return ordenados
+
+        encontrados = self.filtrar(**filtros)
+        ordem, posicao = self._ordenacao(coluna)
+        if len(encontrados) == len(ordem):
+            ordenados = ordem
+        else:
+            ordenados = sorted(encontrados, key=posicao.__getitem__)
+
+        self._consultas[chave] = ordenados
+        while len(self._consultas) > CONSULTAS_EM_CACHE:
+            self._consultas.popitem(last=False)
+        return ordenados
+
+    def consultar(self, filtros=None, ordenar_por='numero', decrescente=False, inicio=0, limite=None, apos=None):
+        """
+        Retorna (pagina, total): os dados dos processos de inicio até inicio+limite
+        na ordem pedida e o total de processos que atendem aos filtros.
+
+        A ordenação vale para todo o resultado; a lista ordenada fica em cache,
+        então trocar de página custa apenas o tamanho da página. Se apos (uma
+        chave_ordenacao) for informado, a página começa logo depois dele.
+        """
+        if ordenar_por not in COLUNAS_ORDENACAO:
+            raise ValueError(f"Coluna de ordenação inválida: {ordenar_por}")
+        filtros = {campo: valor for campo, valor in (filtros or {}).items() if valor}
+        inicio = max(0, inicio)
+
+        with self.lock:
+            ordenados = self._ordenados(filtros, ordenar_por)
+            total = len(ordenados)
+            if apos is not None:
+                apos = tuple(apos)
+                chave = lambda doc_id: chave_ordenacao(self.documentos[doc_id], ordenar_por)
+                if decrescente:
+                    inicio = total - bisect_left(ordenados, apos, key=chave)
+                else:
+                    inicio = bisect_right(ordenados, apos, key=chave)
+            fim = total if limite is None else min(total, inicio + limite)
+            if inicio >= fim:
+                return [], total
+            if decrescente:
+                pagina = ordenados[total - fim:total - inicio][::-1]
+            else:
+                pagina = ordenados[inicio:fim]
+            return [self.documentos[doc_id] for doc_id in pagina], total
+
+
+_indice = IndiceBusca()
+_versao_indexada = None
+_lock = RLock()
+_clientes_catalogo = (None, [])
+
+
+def obter_indice():
+    """Índice de busca sincronizado com a versão atual do catálogo"""
+    global _versao_indexada
+    with _lock:
+        versao = versao_catalogo()
+        if versao != _versao_indexada:
+            _indice.atualizar(obter_processos())
+            _versao_indexada = versao
+    return _indice
+
+
+def clientes_com_processos():
+    """Clientes distintos do catálogo em ordem alfabética (recalculado só quando o catálogo muda)"""
+    global _clientes_catalogo
+    versao = versao_catalogo()
+    versao_calculada, clientes = _clientes_catalogo
+    if versao_calculada != versao:
+        clientes = sorted({dados['cliente'] for dados in obter_processos().values()}, key=str.lower)
+        _clientes_catalogo = (versao, clientes)
+    return clientes
+
+
+def consultar_texto(consulta, filtros=None, limite=200):
+    """
+    Processos com documentos que contêm o texto da consulta (índice de texto), restritos
+    aos filtros de campo. Retorna [(dados do processo, documentos encontrados)], do mais
+    relevante para o menos; processos fora do catálogo atual são ignorados.
+    """
+    filtros = {campo: valor for campo, valor in (filtros or {}).items() if valor}
+    permitidos = {dados['caminho']: dados for dados in obter_indice().buscar(**filtros)}
+    if not permitidos:
+        return []
+    # Com filtros, as pastas vão para a consulta: o limite conta só documentos dos processos aceitos
+    encontrados = buscar_processos_por_texto(consulta, limite, processos=permitidos if filtros else None)
+    return [
+        (permitidos[pasta], documentos)
+        for pasta, documentos in encontrados.items()
+        if pasta in permitidos
+    ]
+
+
+def consultar(filtros=None, ordenar_por='numero', decrescente=False, inicio=0, limite=None, apos=None):
+    """Atalho para IndiceBusca.consultar sobre o catálogo atual"""
+    return obter_indice().consultar(filtros, ordenar_por, decrescente, inicio, limite, apos)
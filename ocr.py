@@ -0,0 +1,189 @@
+"""
+OCR das páginas sem camada de texto (digitalizações e imagens), com pytesseract.
+
+Chamado pelo indexador de texto (indice_texto), em processos separados. O texto de
+cada página fica guardado pelo hash do seu conteúdo: a mesma digitalização em vários
+processos passa pelo OCR uma vez só.
+"""
+import os
+import time
+import hashlib
+import sqlite3
+import logging
+from configparser import ConfigParser
+from indice_processos import INDICE_DB
+from conteudo import hash_arquivo
+from extracao import ErroExtracao, EXTENSOES_PDF, EXTENSOES_IMAGEM
+
+try:
+    import pymupdf
+    HAS_PYMUPDF = True
+except ImportError:
+    HAS_PYMUPDF = False
+
+try:
+    import pytesseract
+    HAS_PYTESSERACT = True
+except ImportError:
+    HAS_PYTESSERACT = False
+
+try:
+    from PIL import Image, ImageSequence
+    HAS_PIL = True
+except ImportError:
+    HAS_PIL = False
+
+# Carregar configurações
+config = ConfigParser()
+config.read('config.ini')
+
+OCR_ATIVO = config.getboolean('OCR', 'ativo', fallback=True)
+IDIOMAS = config.get('OCR', 'idiomas', fallback='por+eng')
+RESOLUCAO = config.getint('OCR', 'dpi', fallback=300)
+# 0 = metade dos núcleos; o restante fica para o servidor e para a extração comum
+OCR_SIMULTANEOS = config.getint('OCR', 'simultaneos', fallback=0) or max(1, (os.cpu_count() or 2) // 2)
+# Por documento inteiro; as páginas já reconhecidas ficam no cache e não se perdem
+TEMPO_MAXIMO_OCR = config.getint('OCR', 'tempo_maximo', fallback=900)
+# Um documento que esgota o tempo ou falha volta à fila depois de espera_nova_tentativa segundos
+# (dobrando a cada falha), até tentativas vezes; as páginas já reconhecidas ficam no cache
+TENTATIVAS_OCR = config.getint('OCR', 'tentativas', fallback=3)
+ESPERA_NOVA_TENTATIVA = config.getint('OCR', 'espera_nova_tentativa', fallback=600)
+# Documentos por passada do indexador, para voltar logo à varredura e dar a vez aos envios novos
+DOCUMENTOS_POR_PASSADA = config.getint('OCR', 'documentos_por_passada', fallback=100)
+OCR_DB = config.get('PATHS', 'OCR_FILE', fallback=os.path.join(os.path.dirname(INDICE_DB), 'ocr.db'))
+# O mesmo do índice de texto ([TEXTO] journal_mode, ou o de [CLIENTES])
+MODO_JOURNAL = config.get('TEXTO', 'journal_mode',
+                          fallback=config.get('CLIENTES', 'journal_mode', fallback='delete')).strip().lower()
+
+if HAS_PYTESSERACT and config.get('OCR', 'tesseract', fallback=''):
+    pytesseract.pytesseract.tesseract_cmd = config.get('OCR', 'tesseract')
+
+_schema_criado = False
+
+
+def ocr_disponivel():
+    """Retorna (disponível, motivo) conforme a configuração, as bibliotecas e o executável do tesseract"""
+    if not OCR_ATIVO:
+        return False, "OCR desativado em config.ini"
+    if not (HAS_PYTESSERACT and HAS_PIL):
+        return False, "pytesseract e Pillow são necessários para o OCR"
+    try:
+        pytesseract.get_tesseract_version()
+    except Exception as e:
+        return False, f"tesseract não encontrado: {str(e)}"
+    return True, None
+
+
+def _conectar():
+    conn = sqlite3.connect(OCR_DB, timeout=30)
+    conn.row_factory = sqlite3.Row
+    return conn
+
+
+def init_ocr():
+    """Cria a tabela do cache de OCR (uma única vez por execução)"""
+    global _schema_criado
+    if _schema_criado:
+        return
+    os.makedirs(os.path.dirname(OCR_DB), exist_ok=True)
+    conn = _conectar()
+    try:
+        # Com WAL, os processos de OCR consultam enquanto outro grava
+        conn.execute(f"PRAGMA journal_mode={MODO_JOURNAL}")
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS paginas (
+                hash TEXT PRIMARY KEY,
+                texto TEXT NOT NULL,
+                criado_em REAL NOT NULL
+            )
+        ''')
+        conn.commit()
+    finally:
+        conn.close()
+    _schema_criado = True
+
+
+def _novo_hash():
+    """Hash de página; idiomas e resolução entram nele porque mudam o texto reconhecido"""
+    h = hashlib.sha256()
+    h.update(f"{IDIOMAS}:{RESOLUCAO}:".encode())
+    return h
+
+
+def _paginas_pdf(caminho):
+    """(hash, função que gera a imagem) de cada página sem camada de texto do PDF"""
+    if not HAS_PYMUPDF:
+        raise ErroExtracao("PyMuPDF é necessário para o OCR de PDF")
+    with pymupdf.open(caminho) as documento:
+        if documento.needs_pass:
+            raise ErroExtracao("PDF protegido por senha")
+        for pagina in documento:
+            if pagina.get_text().strip():
+                continue
+            # Conteúdo da página + imagens que ela desenha: a mesma digitalização dá o mesmo hash
+            h = _novo_hash()
+            h.update(f"{pagina.rotation}:".encode())
+            h.update(pagina.read_contents())
+            for imagem in pagina.get_images(full=True):
+                h.update(documento.xref_stream_raw(imagem[0]) or b"")
+            yield h.hexdigest(), lambda pagina=pagina: _renderizar(pagina)
+
+
+def _renderizar(pagina):
+    pixmap = pagina.get_pixmap(dpi=RESOLUCAO, colorspace=pymupdf.csGRAY)
+    return Image.frombytes("L", (pixmap.width, pixmap.height), pixmap.samples)
+
+
+def _paginas_imagem(caminho):
+    """(hash, função que gera a imagem) de cada quadro da imagem (TIFF pode ter várias páginas)"""
+    digest = hash_arquivo(caminho)
+    with Image.open(caminho) as imagem:
+        for numero, quadro in enumerate(ImageSequence.Iterator(imagem)):
+            h = _novo_hash()
+            h.update(f"{digest}:{numero}".encode())
+            yield h.hexdigest(), lambda quadro=quadro: quadro.convert("L")
+
+
+def ocr_documento(caminho, limite=1_000_000):
+    """
+    Texto reconhecido nas páginas sem camada de texto de um PDF, ou em todas as de uma
+    imagem, com no máximo limite caracteres. Levanta ErroExtracao se não puder ler.
+    Roda nos processos de OCR (extracao_paralela), nunca no servidor.
+    """
+    if not (HAS_PYTESSERACT and HAS_PIL):
+        raise ErroExtracao("pytesseract e Pillow são necessários para o OCR")
+    # Um núcleo por tesseract (herdado pelo executável): quem limita o paralelismo é OCR_SIMULTANEOS.
+    # Fica só no ambiente deste processo de OCR, sem afetar quem importa o módulo
+    os.environ.setdefault('OMP_THREAD_LIMIT', '1')
+    ext = os.path.splitext(caminho)[1].lower()
+    init_ocr()
+    conn = _conectar()
+    try:
+        if ext in EXTENSOES_PDF:
+            paginas = _paginas_pdf(caminho)
+        elif ext in EXTENSOES_IMAGEM:
+            paginas = _paginas_imagem(caminho)
+        else:
+            raise ErroExtracao(f"Formato sem OCR: {ext}")
+        textos = []
+        for digest, imagem in paginas:
+            row = conn.execute("SELECT texto FROM paginas WHERE hash = ?", (digest,)).fetchone()
+            if row is not None:
+                textos.append(row['texto'])
+                continue
+            texto = pytesseract.image_to_string(imagem(), lang=IDIOMAS)
+            # Gravada página a página: um documento interrompido retoma de onde parou
+            with conn:
+                conn.execute("INSERT OR REPLACE INTO paginas (hash, texto, criado_em) VALUES (?, ?, ?)",
+                             (digest, texto, time.time()))
+            textos.append(texto)
+    except ErroExtracao:
+        raise
+    except MemoryError as e:
+        raise ErroExtracao("Memória insuficiente para o OCR") from e
+    except Exception as e:
+        logging.warning(f"Falha no OCR de {caminho}: {str(e)}")
+        raise ErroExtracao(str(e)) from e
+    finally:
+        conn.close()
+    return "\n".join(textos)[:limite]
@@ -0,0 +1,496 @@
+import os
+import re
+import time
+import uuid
+import sqlite3
+from threading import Lock
+from configparser import ConfigParser
+from werkzeug.utils import secure_filename
+from werkzeug.sansio.multipart import MultipartDecoder, Field, File, Epilogue, NeedData
+from logica import validar_arquivo, copiar_arquivos, SUBSTITUIR, PULAR, RENOMEAR
+from copiador import caminho_temporario, concluir_gravacao, criar_vazio, reservar_nome
+from conteudo import novo_hash, hash_arquivo, hash_registrado, registrar_conteudo, localizar_conteudo
+from fila_gravacao import enfileirar, reservar_vaga, liberar_vaga, conferir_vaga, obter_trabalho, ERRO
+
+# Carregar configurações
+config = ConfigParser()
+config.read('config.ini')
+
+# Quando a pasta já tem um arquivo com o mesmo nome e outro conteúdo:
+# renomear grava o novo como "nome (2).ext"; substituir troca o arquivo existente
+POLITICA_CONFLITO = config.get('UPLOAD', 'conflitos', fallback='renomear').strip().lower()
+# Maior arquivo aceito num upload em partes (o .parte é pré-alocado com esse tamanho);
+# sem a chave, o mesmo limite do corpo de uma requisição
+TAMANHO_MAXIMO_ARQUIVO = config.getint(
+    'UPLOAD', 'tamanho_maximo_mb', fallback=config.getint('SERVIDOR', 'limite_corpo_mb', fallback=4096)
+) * 1024 * 1024
+
+TAMANHO_BLOCO = 256 * 1024
+TAMANHO_MAXIMO_CAMPO = 64 * 1024
+
+# Sessões de upload em partes (arquivos grandes, retomáveis)
+SESSOES_DIR = os.path.join(os.getcwd(), 'uploads')
+SESSOES_DB = os.path.join(SESSOES_DIR, 'sessoes.db')
+TAMANHO_BLOCO_SESSAO = 4 * 1024 * 1024
+# Contada a partir do último bloco recebido: um envio grande e lento não expira no meio
+VALIDADE_SESSAO = 24 * 3600
+
+sessoes_lock = Lock()
+_sessoes_criadas = False
+
+
+class ErroRecebimento(Exception):
+    """Erro de validação que interrompe o recebimento de um upload"""
+
+
+class SessaoNaoEncontrada(ErroRecebimento):
+    """Sessão de upload inexistente ou expirada"""
+
+
+class ArquivoGrandeDemais(ErroRecebimento):
+    """Arquivo maior que TAMANHO_MAXIMO_ARQUIVO"""
+
+
+class SessaoFinalizada(ErroRecebimento):
+    """Sessão de upload já entregue à fila de gravação; não aceita mais blocos"""
+
+
+def gravar_temporario(pasta_destino, nome, blocos):
+    """
+    Grava os blocos num temporário oculto dentro de pasta_destino, calculando o hash
+    durante a gravação. Retorna (temporario, digest); o nome final é definido depois,
+    por confirmar_gravacao.
+    """
+    temporario = caminho_temporario(pasta_destino, nome)
+    h = novo_hash()
+    try:
+        with open(temporario, 'wb') as f:
+            for bloco in blocos:
+                f.write(bloco)
+                h.update(bloco)
+    except BaseException:
+        if os.path.exists(temporario):
+            os.remove(temporario)
+        raise
+    return temporario, h.hexdigest()
+
+
+def _hash_atual(caminho, tamanho):
+    """Hash do arquivo em caminho se ele tiver esse tamanho (calculado e registrado se ainda não estiver no índice)"""
+    registrado = hash_registrado(caminho)
+    if registrado is None and os.path.isfile(caminho) and os.path.getsize(caminho) == tamanho:
+        # Arquivo gravado antes do índice de conteúdo: calcula uma vez e registra
+        registrado = hash_arquivo(caminho)
+        registrar_conteudo(caminho, registrado)
+    return registrado
+
+
+def confirmar_gravacao(temporario, pasta_destino, nome, digest):
+    """
+    Leva o temporário já gravado para pasta_destino com o nome pedido, conferindo
+    conflitos: se já houver arquivo com esse nome e outro conteúdo, segue POLITICA_CONFLITO.
+    O nome final é reservado antes da troca, então dois envios simultâneos nunca gravam
+    um por cima do outro. Executado pela fila de gravação da pasta.
+    Retorna um dicionário com arquivo (nome final), duplicado, canonico e renomeado.
+    """
+    tamanho = os.path.getsize(temporario)
+    destino = os.path.join(pasta_destino, nome)
+    reservado = None
+    try:
+        try:
+            criar_vazio(destino)
+            reservado = destino
+        except FileExistsError:
+            if POLITICA_CONFLITO != 'substituir' and _hash_atual(destino, tamanho) != digest:
+                destino = reservado = reservar_nome(pasta_destino, nome)
+        situacao, canonico = concluir_gravacao(temporario, destino, digest)
+    except BaseException:
+        if reservado and os.path.exists(reservado) and os.path.getsize(reservado) == 0:
+            os.remove(reservado)
+        raise
+    return {
+        'arquivo': os.path.basename(destino),
+        'duplicado': situacao,
+        'canonico': canonico,
+        'renomeado': destino != os.path.join(pasta_destino, nome)
+    }
+
+
+def enfileirar_arquivo(pasta_destino, nome, blocos, lote=None):
+    """
+    Recebe o arquivo num temporário e agenda sua confirmação na fila da pasta. A vaga na
+    fila é reservada antes de ler o arquivo (FilaCheia sem gravar nada). Retorna o id do trabalho
+    """
+    reservar_vaga()
+    try:
+        temporario, digest = gravar_temporario(pasta_destino, nome, blocos)
+    except BaseException:
+        liberar_vaga()
+        raise
+
+    def confirmar():
+        try:
+            return confirmar_gravacao(temporario, pasta_destino, nome, digest)
+        except BaseException:
+            if os.path.exists(temporario):
+                os.remove(temporario)
+            raise
+
+    try:
+        return enfileirar(pasta_destino, nome, confirmar, lote=lote, vaga_reservada=True)
+    except BaseException:
+        if os.path.exists(temporario):
+            os.remove(temporario)
+        raise
+
+
+def _eventos(stream, boundary, tamanho_bloco):
+    """Decodifica o corpo multipart conforme ele chega, sem carregá-lo inteiro na memória"""
+    decoder = MultipartDecoder(boundary.encode('latin-1'))
+    while True:
+        bloco = stream.read(tamanho_bloco)
+        decoder.receive_data(bloco or None)
+        evento = decoder.next_event()
+        while not isinstance(evento, (Epilogue, NeedData)):
+            yield evento
+            evento = decoder.next_event()
+        if isinstance(evento, Epilogue):
+            return
+        if not bloco:
+            raise ErroRecebimento("Envio interrompido antes do fim")
+
+
+def _dados_da_parte(eventos):
+    for evento in eventos:
+        yield evento.data
+        if not evento.more_data:
+            return
+
+
+def receber_multipart(stream, boundary, preparar_destino, lote=None, tamanho_bloco=TAMANHO_BLOCO):
+    """
+    Lê um corpo multipart/form-data em blocos.
+
+    Os campos de texto são acumulados até chegar o primeiro arquivo; então
+    preparar_destino(campos) valida os dados e devolve a pasta do processo, e cada
+    arquivo é gravado num temporário dentro dela e enfileirado para confirmação
+    (ver fila_gravacao). Retorna (pasta_destino, trabalhos, erros), com os ids dos
+    trabalhos e os erros no formato (nome, mensagem).
+    """
+    eventos = _eventos(stream, boundary, tamanho_bloco)
+    campos = {}
+    trabalhos = []
+    erros = []
+    pasta_destino = None
+
+    for evento in eventos:
+        if isinstance(evento, Field):
+            valor = bytearray()
+            for dados in _dados_da_parte(eventos):
+                valor.extend(dados)
+                if len(valor) > TAMANHO_MAXIMO_CAMPO:
+                    raise ErroRecebimento(f"Campo muito grande: {evento.name}")
+            campos[evento.name] = valor.decode('utf-8', 'replace')
+
+        elif isinstance(evento, File):
+            dados = _dados_da_parte(eventos)
+            nome = secure_filename(evento.filename or "")
+            if not nome:
+                # Campo de arquivo enviado vazio
+                for _ in dados:
+                    pass
+                continue
+
+            if pasta_destino is None:
+                pasta_destino = preparar_destino(campos)
+
+            if not validar_arquivo(nome):
+                for _ in dados:
+                    pass
+                erros.append((nome, f"Tipo de arquivo não permitido: {os.path.splitext(nome)[1]}"))
+                continue
+
+            try:
+                trabalhos.append(enfileirar_arquivo(pasta_destino, nome, dados, lote=lote))
+            except OSError as e:
+                for _ in dados:
+                    pass
+                erros.append((nome, str(e)))
+
+    if pasta_destino is None:
+        pasta_destino = preparar_destino(campos)
+    return pasta_destino, trabalhos, erros
+
+
+# --- Verificação prévia pelo hash calculado no navegador ---
+
+PADRAO_HASH = re.compile(r'^[0-9a-f]{64}$')
+
+
+def _arquivo_informado(arquivo):
+    """(nome, tamanho, hash) de um item enviado pelo navegador, ou None se estiver incompleto"""
+    nome = secure_filename(str(arquivo.get('nome') or ""))
+    tamanho = arquivo.get('tamanho')
+    digest = str(arquivo.get('hash') or "").lower()
+    if not nome or not isinstance(tamanho, int) or tamanho < 0 or not PADRAO_HASH.match(digest):
+        return None
+    return nome, tamanho, digest
+
+
+def verificar_arquivos(pasta_destino, arquivos):
+    """
+    Classifica cada arquivo informado como 'existente' (a pasta do processo já tem esse
+    conteúdo com esse nome), 'disponivel' (o conteúdo está gravado em outro lugar e pode
+    ser aproveitado sem envio) ou 'ausente' (precisa ser enviado).
+    """
+    resultado = []
+    for arquivo in arquivos:
+        situacao = 'ausente'
+        informado = _arquivo_informado(arquivo)
+        if informado:
+            nome, tamanho, digest = informado
+            if _hash_atual(os.path.join(pasta_destino, nome), tamanho) == digest:
+                situacao = 'existente'
+            elif localizar_conteudo(digest, tamanho):
+                situacao = 'disponivel'
+        resultado.append({'nome': arquivo.get('nome'), 'situacao': situacao})
+    return resultado
+
+
+def _politica_existente(arquivo, destino):
+    """Política de cópia do servidor web para um nome que já existe na pasta do processo"""
+    if _hash_atual(destino, arquivo['tamanho']) == arquivo['hash']:
+        return PULAR
+    return SUBSTITUIR if POLITICA_CONFLITO == 'substituir' else RENOMEAR
+
+
+def aproveitar_arquivos(pasta_destino, arquivos):
+    """
+    Grava na pasta do processo, sem envio, os arquivos cujo conteúdo já está no servidor
+    (link ou cópia local a partir da cópia canônica). Retorna (aproveitados, faltando),
+    com as posições em arquivos; os que faltam devem ser enviados normalmente.
+    """
+    itens = []
+    faltando = []
+    for posicao, arquivo in enumerate(arquivos):
+        informado = _arquivo_informado(arquivo)
+        canonico = localizar_conteudo(informado[2], informado[1]) if informado else None
+        if canonico is None:
+            faltando.append(posicao)
+            continue
+        nome, tamanho, digest = informado
+        itens.append({'name': nome, 'path': canonico, 'hash': digest, 'tamanho': tamanho, 'posicao': posicao})
+
+    relatorio = copiar_arquivos(pasta_destino, itens, politica=_politica_existente)
+    aproveitados = []
+    for resultado in relatorio['resultados']:
+        # Pulado aqui significa que a pasta já tinha o mesmo conteúdo com esse nome
+        if resultado['ok'] or resultado['pulado']:
+            aproveitados.append(resultado['arquivo']['posicao'])
+        else:
+            faltando.append(resultado['arquivo']['posicao'])
+    return sorted(aproveitados), sorted(faltando)
+
+
+# --- Upload em partes ---
+
+def _conectar_sessoes():
+    conn = sqlite3.connect(SESSOES_DB, timeout=30)
+    conn.row_factory = sqlite3.Row
+    return conn
+
+
+def init_sessoes():
+    """Cria as tabelas de sessões (uma única vez por execução)"""
+    global _sessoes_criadas
+    if _sessoes_criadas:
+        return
+    os.makedirs(SESSOES_DIR, exist_ok=True)
+    conn = _conectar_sessoes()
+    try:
+        conn.executescript('''
+            CREATE TABLE IF NOT EXISTS sessoes (
+                id TEXT PRIMARY KEY,
+                pasta TEXT NOT NULL,
+                nome TEXT NOT NULL,
+                tamanho INTEGER NOT NULL,
+                tamanho_bloco INTEGER NOT NULL,
+                parte TEXT NOT NULL,
+                criada_em REAL NOT NULL,
+                atualizada_em REAL NOT NULL DEFAULT 0
+            );
+            CREATE TABLE IF NOT EXISTS blocos (
+                sessao TEXT NOT NULL,
+                indice INTEGER NOT NULL,
+                PRIMARY KEY (sessao, indice)
+            );
+        ''')
+        # Bancos criados antes da coluna: a validade conta da criação até o próximo bloco
+        colunas = {row['name'] for row in conn.execute("PRAGMA table_info(sessoes)")}
+        if 'atualizada_em' not in colunas:
+            conn.execute("ALTER TABLE sessoes ADD COLUMN atualizada_em REAL NOT NULL DEFAULT 0")
+            conn.execute("UPDATE sessoes SET atualizada_em = criada_em")
+        conn.commit()
+    finally:
+        conn.close()
+    _sessoes_criadas = True
+
+
+def intervalos(indices):
+    """Converte índices de blocos em intervalos [início, fim] contíguos"""
+    resultado = []
+    for indice in sorted(indices):
+        if resultado and resultado[-1][1] == indice - 1:
+            resultado[-1][1] = indice
+        else:
+            resultado.append([indice, indice])
+    return resultado
+
+
+def _total_blocos(sessao):
+    return (sessao['tamanho'] + sessao['tamanho_bloco'] - 1) // sessao['tamanho_bloco']
+
+
+def criar_sessao(pasta_destino, nome, tamanho, tamanho_bloco=TAMANHO_BLOCO_SESSAO):
+    """Abre uma sessão de upload em partes; o arquivo é pré-alocado como .parte na pasta de destino"""
+    init_sessoes()
+    limpar_sessoes_expiradas()
+
+    nome = secure_filename(nome or "")
+    if not nome:
+        raise ErroRecebimento("Nome de arquivo inválido")
+    if not validar_arquivo(nome):
+        raise ErroRecebimento(f"Tipo de arquivo não permitido: {os.path.splitext(nome)[1]}")
+    if tamanho < 0:
+        raise ErroRecebimento("Tamanho inválido")
+    if tamanho > TAMANHO_MAXIMO_ARQUIVO:
+        raise ArquivoGrandeDemais(f"Arquivo maior que o limite de {TAMANHO_MAXIMO_ARQUIVO // (1024 * 1024)} MB")
+    # Com a fila cheia, recusa antes de pré-alocar e receber os blocos
+    conferir_vaga()
+
+    id_sessao = uuid.uuid4().hex
+    parte = os.path.join(pasta_destino, f".{nome}.{id_sessao}.parte")
+    with open(parte, 'wb') as f:
+        f.truncate(tamanho)
+
+    with sessoes_lock:
+        conn = _conectar_sessoes()
+        try:
+            with conn:
+                conn.execute(
+                    "INSERT INTO sessoes (id, pasta, nome, tamanho, tamanho_bloco, parte, criada_em, atualizada_em) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (id_sessao, pasta_destino, nome, tamanho, tamanho_bloco, parte, time.time(), time.time())
+                )
+        finally:
+            conn.close()
+    return obter_sessao(id_sessao)
+
+
+def obter_sessao(id_sessao):
+    """Dados da sessão com os blocos já recebidos"""
+    init_sessoes()
+    conn = _conectar_sessoes()
+    try:
+        row = conn.execute("SELECT * FROM sessoes WHERE id = ?", (id_sessao,)).fetchone()
+        if row is None:
+            raise SessaoNaoEncontrada("Sessão de upload não encontrada")
+        recebidos = [r['indice'] for r in conn.execute("SELECT indice FROM blocos WHERE sessao = ?", (id_sessao,))]
+    finally:
+        conn.close()
+
+    sessao = dict(row)
+    sessao['total_blocos'] = _total_blocos(sessao)
+    sessao['recebidos'] = intervalos(recebidos)
+    sessao['faltando'] = sessao['total_blocos'] - len(recebidos)
+    return sessao
+
+
+def gravar_bloco(id_sessao, indice, stream):
+    """Grava o bloco indice na posição correspondente do arquivo .parte"""
+    sessao = obter_sessao(id_sessao)
+    # O trabalho de finalização tem o id da sessão; só um que falhou devolve a sessão ao envio
+    trabalho = obter_trabalho(id_sessao)
+    if trabalho is not None and trabalho['situacao'] != ERRO:
+        raise SessaoFinalizada("O envio deste arquivo já foi finalizado")
+    if not 0 <= indice < sessao['total_blocos']:
+        raise ErroRecebimento(f"Bloco fora do intervalo: {indice}")
+
+    inicio = indice * sessao['tamanho_bloco']
+    esperado = min(sessao['tamanho_bloco'], sessao['tamanho'] - inicio)
+    with open(sessao['parte'], 'r+b') as f:
+        f.seek(inicio)
+        restante = esperado
+        while restante > 0:
+            dados = stream.read(min(TAMANHO_BLOCO, restante))
+            if not dados:
+                raise ErroRecebimento(f"Bloco {indice} incompleto")
+            f.write(dados)
+            restante -= len(dados)
+    if stream.read(1):
+        raise ErroRecebimento(f"Bloco {indice} maior que o esperado")
+
+    with sessoes_lock:
+        conn = _conectar_sessoes()
+        try:
+            with conn:
+                conn.execute("INSERT OR IGNORE INTO blocos (sessao, indice) VALUES (?, ?)", (id_sessao, indice))
+                conn.execute("UPDATE sessoes SET atualizada_em = ? WHERE id = ?", (time.time(), id_sessao))
+        finally:
+            conn.close()
+
+
+def _remover_sessao(id_sessao):
+    with sessoes_lock:
+        conn = _conectar_sessoes()
+        try:
+            with conn:
+                conn.execute("DELETE FROM blocos WHERE sessao = ?", (id_sessao,))
+                conn.execute("DELETE FROM sessoes WHERE id = ?", (id_sessao,))
+        finally:
+            conn.close()
+
+
+def _confirmar_sessao(sessao):
+    digest = hash_arquivo(sessao['parte'])
+    resultado = confirmar_gravacao(sessao['parte'], sessao['pasta'], sessao['nome'], digest)
+    _remover_sessao(sessao['id'])
+    return resultado
+
+
+def finalizar_sessao(id_sessao):
+    """
+    Com todos os blocos recebidos, agenda na fila da pasta a confirmação do .parte com o
+    nome final. Os blocos chegam fora de ordem, então o hash é calculado nesse trabalho,
+    relendo o .parte no servidor. Retorna o id do trabalho (o próprio id da sessão, de modo
+    que finalizar de novo não agenda outra confirmação).
+    """
+    sessao = obter_sessao(id_sessao)
+    if sessao['faltando']:
+        raise ErroRecebimento(f"Ainda faltam {sessao['faltando']} bloco(s)")
+    return enfileirar(sessao['pasta'], sessao['nome'], lambda: _confirmar_sessao(sessao), id_trabalho=id_sessao)
+
+
+def cancelar_sessao(id_sessao):
+    """Descarta a sessão e o arquivo parcial"""
+    sessao = obter_sessao(id_sessao)
+    if os.path.exists(sessao['parte']):
+        os.remove(sessao['parte'])
+    _remover_sessao(id_sessao)
+
+
+def limpar_sessoes_expiradas():
+    """Remove sessões sem bloco novo há mais de VALIDADE_SESSAO segundos"""
+    init_sessoes()
+    conn = _conectar_sessoes()
+    try:
+        expiradas = [row['id'] for row in conn.execute(
+            "SELECT id FROM sessoes WHERE atualizada_em < ?", (time.time() - VALIDADE_SESSAO,)
+        )]
+    finally:
+        conn.close()
+    for id_sessao in expiradas:
+        try:
+            cancelar_sessao(id_sessao)
+        except (OSError, SessaoNaoEncontrada):
+            pass
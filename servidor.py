@@ -0,0 +1,121 @@
+"""
+Ponto de entrada de produção do backend web (em vez de app.run, que é o servidor de
+desenvolvimento do Werkzeug):
+
+    python servidor.py
+
+No Windows usa o waitress (um processo com várias threads). Nos demais sistemas usa o
+gunicorn com workers gthread (vários processos, cada um com várias threads). As opções
+ficam na seção [SERVIDOR] do config.ini.
+
+Quantos processos e threads usar
+--------------------------------
+Um upload passa quase todo o tempo esperando a rede do navegador e o disco do
+compartilhamento, não a CPU, então cada requisição em andamento ocupa uma thread
+parada. Dimensione as threads pelo número de requisições simultâneas esperado:
+
+- cada navegador abre até 4 envios de blocos em paralelo (ENVIOS_PARALELOS no
+  upload.js), mais a página e as consultas;
+- uma dúzia de usuários enviando ao mesmo tempo dá ~50 requisições abertas, então
+  threads = 16 a 32 por processo com 2 processos é uma boa partida.
+
+Os processos (só no gunicorn) servem para o trabalho de CPU: cálculo de hash ao
+finalizar uploads em partes, compressão e a busca. Use entre 2 e o número de núcleos;
+mais que isso só multiplica a memória, já que cada processo carrega o próprio catálogo
+de processos e o próprio observador de pastas.
+
+O waitress guarda em arquivo temporário todo corpo acima de 512 KB antes de entregar
+a requisição à aplicação, então no Windows o upload é gravado duas vezes no servidor;
+os uploads grandes em partes (blocos de 4 MB) minimizam esse custo.
+"""
+import os
+import sys
+import logging
+import importlib.util
+from configparser import ConfigParser
+
+# Carregar configurações
+config = ConfigParser()
+config.read('config.ini')
+
+HOST = config.get('SERVIDOR', 'host', fallback='0.0.0.0')
+PORTA = config.getint('SERVIDOR', 'porta', fallback=5001)
+PROCESSOS = config.getint('SERVIDOR', 'processos', fallback=2)
+THREADS = config.getint('SERVIDOR', 'threads', fallback=32)
+# Tempo (s) que uma conexão ociosa fica aberta esperando a próxima requisição do mesmo navegador
+KEEPALIVE = config.getint('SERVIDOR', 'keepalive', fallback=5)
+# No waitress (channel_timeout): segundos sem atividade numa conexão antes de derrubá-la (uploads
+# lentos continuam enquanto houver dados). No gunicorn: segundos que um worker pode ficar sem dar
+# sinal de vida ao processo mestre antes de ser reiniciado (não é o tempo ocioso da conexão)
+TIMEOUT = config.getint('SERVIDOR', 'timeout', fallback=300)
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s',
+    filename='servidor.log'
+)
+
+
+def servir_waitress():
+    from waitress import serve
+    from backend_flask_integrado import app, LIMITE_CORPO
+
+    logging.info(f"waitress em {HOST}:{PORTA} com {THREADS} threads")
+    serve(
+        app,
+        host=HOST,
+        port=PORTA,
+        threads=THREADS,
+        connection_limit=max(100, THREADS * 4),
+        channel_timeout=TIMEOUT,
+        max_request_body_size=LIMITE_CORPO
+    )
+
+
+def servir_gunicorn():
+    from gunicorn.app.base import BaseApplication
+
+    opcoes = {
+        'bind': f"{HOST}:{PORTA}",
+        'workers': PROCESSOS,
+        'worker_class': 'gthread',
+        'threads': THREADS,
+        'keepalive': KEEPALIVE,
+        'timeout': TIMEOUT,
+        'graceful_timeout': 30,
+        # Cada processo importa a aplicação depois do fork, com suas próprias threads de observação
+        'preload_app': False
+    }
+
+    class Aplicacao(BaseApplication):
+        def load_config(self):
+            for chave, valor in opcoes.items():
+                self.cfg.set(chave, valor)
+
+        def load(self):
+            from backend_flask_integrado import app
+            return app
+
+    logging.info(f"gunicorn em {HOST}:{PORTA} com {PROCESSOS} processo(s) x {THREADS} threads")
+    Aplicacao().run()
+
+
+def servir_desenvolvimento():
+    from backend_flask_integrado import app
+
+    logging.warning("waitress/gunicorn não instalados; usando o servidor do Werkzeug (sem debugger)")
+    app.run(host=HOST, port=PORTA, threaded=True, debug=False, use_reloader=False)
+
+
+def main():
+    servidor = 'waitress' if os.name == 'nt' else 'gunicorn'
+    if importlib.util.find_spec(servidor) is None:
+        servir_desenvolvimento()
+    elif servidor == 'waitress':
+        servir_waitress()
+    else:
+        servir_gunicorn()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -8,9 +8,14 @@ import tempfile
 import configparser
 import logging
 import sys
-from logica import obter_info_processos, criar_pasta, copiar_arquivos, abrir_pasta_processo
+import time
+import queue
+import threading
+from logica import obter_info_processos, criar_pasta, planejar_copia, executar_copia, SUBSTITUIR, PULAR
+from copiador import descrever_vazao
 from clientes import obter_clientes, adicionar_cliente, remover_cliente
 from busca import TelaBusca
+from catalogo import iniciar_observador
 
 # Configuração de logging
 logging.basicConfig(
@@ -27,6 +32,12 @@ except ImportError:
     HAS_DND = False
     logging.warning("tkinterdnd2 não instalado. Drag-and-drop não estará disponível.")
 
+# Intervalo (ms) com que a interface lê o progresso das cópias em segundo plano
+INTERVALO_PROGRESSO = 200
+# Arquivos por lote na leitura de pastas em segundo plano, e lotes exibidos a cada ciclo da interface
+TAMANHO_LOTE_PASTA = 500
+LOTES_POR_CICLO = 10
+
 def validar_arquivo(filepath):
     """Valida se o arquivo possui uma extensão permitida."""
     extensoes_permitidas = ['.pdf', '.doc', '.docx', '.xls', '.xlsx', '.jpg', '.jpeg', '.png', '.txt']
@@ -51,6 +62,82 @@ def is_outlook_temp_file(filepath):
     except Exception:
         return False
 
+def preparar_arquivo(filepath):
+    """
+    Monta o item da lista de upload para um arquivo. Temporários do Outlook são
+    movidos (ou copiados) para uma pasta própria antes que o Outlook os apague.
+    """
+    try:
+        if not filepath or not os.path.exists(filepath):
+            return None
+
+        is_temp = False
+        
+        if is_outlook_temp_file(filepath):
+            # Cria diretório temporário seguro
+            temp_dir = os.path.join(tempfile.gettempdir(), 'outlook_attachments')
+            os.makedirs(temp_dir, exist_ok=True)
+            
+            # Gera nome limpo para o arquivo
+            original_name = os.path.basename(filepath)
+            clean_name = original_name.replace('~$', '').replace('outlook_attach_', '')
+            new_path = os.path.join(temp_dir, clean_name)
+            
+            # Tenta mover o arquivo (evita bloqueios)
+            try:
+                shutil.move(filepath, new_path)
+                filepath = new_path
+                is_temp = True
+            except Exception as move_error:
+                logging.warning(f"Falha ao mover, tentando copiar: {move_error}")
+                shutil.copy2(filepath, new_path)
+                filepath = new_path
+                is_temp = True
+
+        return {
+            'path': filepath,
+            'name': os.path.basename(filepath),
+            'is_temp': is_temp
+        }
+
+    except Exception as e:
+        logging.error(f"Erro ao processar arquivo {filepath}: {e}")
+        return None
+
+def varrer_pasta(pasta, ao_lote, cancelar=None, relativo=False, tamanho_lote=TAMANHO_LOTE_PASTA):
+    """
+    Percorre pasta e subpastas com os.scandir entregando os arquivos a ao_lote em
+    listas de até tamanho_lote itens. Com relativo=True o nome exibido é o caminho
+    relativo a pasta. Para assim que o Event cancelar for sinalizado.
+    """
+    pendentes = [pasta]
+    lote = []
+    while pendentes:
+        atual = pendentes.pop()
+        try:
+            with os.scandir(atual) as entradas:
+                for entrada in entradas:
+                    if cancelar is not None and cancelar.is_set():
+                        return
+                    if entrada.is_dir(follow_symlinks=False):
+                        pendentes.append(entrada.path)
+                        continue
+                    if not entrada.is_file():
+                        continue
+                    if relativo:
+                        arquivo = {'path': entrada.path, 'name': os.path.relpath(entrada.path, pasta)}
+                    else:
+                        arquivo = preparar_arquivo(entrada.path)
+                    if arquivo:
+                        lote.append(arquivo)
+                    if len(lote) >= tamanho_lote:
+                        ao_lote(lote)
+                        lote = []
+        except OSError as e:
+            logging.error(f"Erro ao listar {atual}: {str(e)}")
+    if lote:
+        ao_lote(lote)
+
 class OutlookIntegration:
     """Classe para integração com o Microsoft Outlook"""
     def __init__(self, callback):
@@ -106,6 +193,19 @@ class Aplicativo:
         self.bg_image = None
         self.bg_photo = None
         self.bg_label = None
+        
+        # Upload em segundo plano
+        self.fila_upload = queue.Queue()
+        self.cancelar_upload_evento = threading.Event()
+        self.thread_upload = None
+        self.lote_upload = []
+        self.progresso_upload = {}
+        
+        # Leitura de pastas em segundo plano
+        self.fila_varredura = queue.Queue()
+        self.cancelar_varredura_evento = threading.Event()
+        self.varreduras_ativas = 0
+        self.arquivos_encontrados = 0
 
         # Configurações de estilo
         self._configure_styles()
@@ -132,6 +232,12 @@ class Aplicativo:
         
     def on_close(self):
         """Executa ao fechar a janela"""
+        if self.thread_upload is not None and self.thread_upload.is_alive():
+            if not messagebox.askyesno("Upload em andamento", "Há uma cópia em andamento. Cancelar e sair?"):
+                return
+            self.cancelar_upload_evento.set()
+            self.thread_upload.join(timeout=10)
+        self.cancelar_varredura_evento.set()
         self._limpar_arquivos_temporarios()
         self.root.destroy()
 
@@ -203,7 +309,14 @@ class Aplicativo:
             font=('Arial', 10, 'italic')
         )
         self.upload_label.pack(pady=20)
-        
+        self._criar_lista_arquivos()
+
+        # Leitura de pastas em andamento (exibido apenas enquanto houver pastas sendo lidas)
+        self.frame_varredura = ttk.Frame(self.upload_frame)
+        self.label_varredura = ttk.Label(self.frame_varredura, text="")
+        self.label_varredura.pack(side="left", padx=5)
+        ttk.Button(self.frame_varredura, text="Cancelar", command=self.cancelar_varredura).pack(side="right", padx=5)
+
         # Botões principais
         frame_botoes = ttk.Frame(main_frame)
         frame_botoes.pack(pady=10)
@@ -227,12 +340,13 @@ class Aplicativo:
             style='Accent.TButton'
         ).pack(side="left", padx=5)
         
-        ttk.Button(
+        self.btn_processar = ttk.Button(
             frame_botoes, 
             text="Processar Arquivos", 
             command=self.fazer_upload,
             style='Accent.TButton'
-        ).pack(side="left", padx=5)
+        )
+        self.btn_processar.pack(side="left", padx=5)
         
         ttk.Button(
             frame_botoes, 
@@ -240,6 +354,14 @@ class Aplicativo:
             command=self.abrir_tela_busca
         ).pack(side="left", padx=5)
 
+        # Progresso do upload (exibido apenas durante as cópias)
+        self.frame_progresso = ttk.Frame(main_frame)
+        self.barra_progresso = ttk.Progressbar(self.frame_progresso, mode="determinate")
+        self.barra_progresso.pack(side="left", fill="x", expand=True, padx=5)
+        self.label_progresso = ttk.Label(self.frame_progresso, text="")
+        self.label_progresso.pack(side="left", padx=5)
+        ttk.Button(self.frame_progresso, text="Cancelar", command=self.cancelar_upload).pack(side="left", padx=5)
+
         btn_limpar = ttk.Button(
             frame_processo,
             text="Limpar Campos",
@@ -315,6 +437,7 @@ class Aplicativo:
                 return
 
             files = self.root.tk.splitlist(event.data)
+            pastas = []
             for f in files:
                 try:
                     f = f.strip()
@@ -327,16 +450,16 @@ class Aplicativo:
                     
                     if os.path.exists(f):
                         if os.path.isdir(f):
-                            for root, _, files_in_dir in os.walk(f):
-                                for file in files_in_dir:
-                                    self._processar_arquivo_individual(os.path.join(root, file))
+                            # Pastas são lidas em segundo plano e entram na lista aos poucos
+                            pastas.append(f)
                         else:
                             self._processar_arquivo_individual(f)
                 except Exception as e:
                     logging.error(f"Erro ao processar {f}: {str(e)}")
                     continue
 
-            self.atualizar_lista_arquivos()
+            if pastas:
+                self._iniciar_varredura(pastas)
             
         except Exception as e:
             logging.error(f"Erro no drag-and-drop: {str(e)}")
@@ -346,7 +469,6 @@ class Aplicativo:
         """Processa arquivos recebidos do Outlook"""
         for f in files:
             self._processar_arquivo_individual(f)
-        self.atualizar_lista_arquivos()
 
     def importar_do_outlook(self):
         """Alternativa para quando o drag-and-drop não funciona"""
@@ -371,50 +493,15 @@ class Aplicativo:
                         attachment.SaveAsFile(temp_path)
                         self._processar_arquivo_individual(temp_path)
                 
-                self.atualizar_lista_arquivos()
-                
         except Exception as e:
             messagebox.showerror("Erro Outlook", f"Não foi possível acessar o Outlook: {e}")
             logging.error(f"Erro no Outlook: {e}")
 
     def _processar_arquivo_individual(self, filepath):
         """Processa um único arquivo com tratamento especial para Outlook"""
-        try:
-            if not filepath or not os.path.exists(filepath):
-                return
-
-            is_temp = False
-            
-            if is_outlook_temp_file(filepath):
-                # Cria diretório temporário seguro
-                temp_dir = os.path.join(tempfile.gettempdir(), 'outlook_attachments')
-                os.makedirs(temp_dir, exist_ok=True)
-                
-                # Gera nome limpo para o arquivo
-                original_name = os.path.basename(filepath)
-                clean_name = original_name.replace('~$', '').replace('outlook_attach_', '')
-                new_path = os.path.join(temp_dir, clean_name)
-                
-                # Tenta mover o arquivo (evita bloqueios)
-                try:
-                    shutil.move(filepath, new_path)
-                    filepath = new_path
-                    is_temp = True
-                except Exception as move_error:
-                    logging.warning(f"Falha ao mover, tentando copiar: {move_error}")
-                    shutil.copy2(filepath, new_path)
-                    filepath = new_path
-                    is_temp = True
-
-            # Adiciona à lista de upload
-            self.arquivos_para_upload.append({
-                'path': filepath,
-                'name': os.path.basename(filepath),
-                'is_temp': is_temp
-            })
-
-        except Exception as e:
-            logging.error(f"Erro ao processar arquivo {filepath}: {e}")
+        arquivo = preparar_arquivo(filepath)
+        if arquivo:
+            self.adicionar_arquivos([arquivo])
 
     def carregar_logo(self):
         try:
@@ -529,65 +616,124 @@ class Aplicativo:
     def selecionar_arquivos(self, event=None):
         files = filedialog.askopenfilenames(title="Selecione os arquivos")
         if files:
-            for f in files:
-                self.arquivos_para_upload.append({'path': f, 'name': os.path.basename(f)})
-            self.atualizar_lista_arquivos()
+            self.adicionar_arquivos([{'path': f, 'name': os.path.basename(f)} for f in files])
 
     def selecionar_pasta(self):
         folder = filedialog.askdirectory(title="Selecione uma pasta")
         if folder:
-            for root, _, files in os.walk(folder):
-                for file in files:
-                    path = os.path.join(root, file)
-                    rel_path = os.path.relpath(path, folder)
-                    self.arquivos_para_upload.append({'path': path, 'name': rel_path})
-            self.atualizar_lista_arquivos()
-
-    def atualizar_lista_arquivos(self):
-        for widget in self.upload_frame.winfo_children():
-            if widget != self.upload_label:
-                widget.destroy()
-        
+            self._iniciar_varredura([folder], relativo=True)
+
+    def _iniciar_varredura(self, pastas, relativo=False):
+        """Lê as pastas numa thread de trabalho; os arquivos chegam à lista em lotes pela fila"""
+        if not self.varreduras_ativas:
+            self.cancelar_varredura_evento.clear()
+            self.arquivos_encontrados = 0
+            self.label_varredura.config(text="Lendo pastas...")
+        if not self.frame_varredura.winfo_manager():
+            # O painel fica visível enquanto o acompanhamento estiver agendado
+            self.frame_varredura.pack(side="bottom", fill="x", pady=(5, 0))
+            self.root.after(INTERVALO_PROGRESSO, self._acompanhar_varredura)
+        self.varreduras_ativas += 1
+        threading.Thread(
+            target=self._executar_varredura, args=(pastas, relativo), name="varredura", daemon=True
+        ).start()
+
+    def _executar_varredura(self, pastas, relativo):
+        """Roda fora da thread do Tk: só publica os lotes na fila"""
+        try:
+            for pasta in pastas:
+                varrer_pasta(
+                    pasta,
+                    lambda lote: self.fila_varredura.put(('lote', lote)),
+                    cancelar=self.cancelar_varredura_evento,
+                    relativo=relativo
+                )
+        except Exception as e:
+            logging.error(f"Erro ao ler pastas: {str(e)}")
+        finally:
+            self.fila_varredura.put(('fim', None))
+
+    def _acompanhar_varredura(self):
+        """Acrescenta à lista os lotes já lidos (alguns por ciclo, para a janela não travar)"""
+        lotes = 0
+        try:
+            while lotes < LOTES_POR_CICLO:
+                tipo, valor = self.fila_varredura.get_nowait()
+                if tipo == 'lote':
+                    lotes += 1
+                    self.arquivos_encontrados += len(valor)
+                    self.adicionar_arquivos(valor)
+                else:
+                    self.varreduras_ativas -= 1
+        except queue.Empty:
+            pass
+
+        if self.varreduras_ativas or not self.fila_varredura.empty():
+            texto = f"Lendo pastas... {self.arquivos_encontrados} arquivo(s) encontrado(s)"
+            if self.cancelar_varredura_evento.is_set():
+                texto = "Cancelando... " + texto
+            self.label_varredura.config(text=texto)
+            self.root.after(INTERVALO_PROGRESSO, self._acompanhar_varredura)
+        else:
+            self.frame_varredura.pack_forget()
+
+    def cancelar_varredura(self):
+        self.cancelar_varredura_evento.set()
+
+    def _criar_lista_arquivos(self):
+        """Cria uma única vez a lista de arquivos pendentes (a Treeview só desenha as linhas visíveis)"""
+        self.frame_lista = ttk.Frame(self.upload_frame)
+
+        frame_acoes = ttk.Frame(self.frame_lista)
+        frame_acoes.pack(side="bottom", fill="x", pady=(5, 0))
+        self.label_total_arquivos = ttk.Label(frame_acoes, text="")
+        self.label_total_arquivos.pack(side="left", padx=5)
+        ttk.Button(frame_acoes, text="Remover Selecionados", command=self.remover_selecionados).pack(side="right", padx=5)
+
+        self.tree_arquivos = ttk.Treeview(self.frame_lista, columns=("Arquivo",), show="headings", selectmode="extended")
+        self.tree_arquivos.heading("Arquivo", text="Arquivo")
+        scrollbar = ttk.Scrollbar(self.frame_lista, orient="vertical", command=self.tree_arquivos.yview)
+        self.tree_arquivos.configure(yscrollcommand=scrollbar.set)
+        self.tree_arquivos.pack(side="left", fill="both", expand=True)
+        scrollbar.pack(side="right", fill="y")
+        self.tree_arquivos.bind("<Delete>", lambda e: self.remover_selecionados())
+
+        self._proximo_iid = 0
+
+    def _mostrar_lista(self):
+        """Mostra a lista com o total de arquivos, ou o convite para arrastar se ela estiver vazia"""
         if not self.arquivos_para_upload:
-            self.upload_label.pack()
+            self.frame_lista.pack_forget()
+            self.upload_label.pack(pady=20)
             return
-        
+
         self.upload_label.pack_forget()
-        
-        # Cria um canvas com barra de rolagem
-        container = ttk.Frame(self.upload_frame)
-        container.pack(fill="both", expand=True)
-        
-        canvas = tk.Canvas(container)
-        scrollbar = ttk.Scrollbar(container, orient="vertical", command=canvas.yview)
-        scrollable_frame = ttk.Frame(canvas)
-        
-        scrollable_frame.bind(
-            "<Configure>",
-            lambda e: canvas.configure(
-                scrollregion=canvas.bbox("all"),
-                width=e.width
-            )
-        )
-        
-        canvas.create_window((0, 0), window=scrollable_frame, anchor="nw")
-        canvas.configure(yscrollcommand=scrollbar.set)
-        
-        canvas.pack(side="left", fill="both", expand=True)
-        scrollbar.pack(side="right", fill="y")
-        
-        for i, arquivo in enumerate(self.arquivos_para_upload):
-            ttk.Label(scrollable_frame, text=arquivo['name']).grid(row=i, column=0, sticky="w", padx=5, pady=2)
-            ttk.Button(scrollable_frame, text="Remover", 
-                      command=lambda idx=i: self.remover_arquivo(idx)).grid(row=i, column=1, padx=5)
-        
-        # Configura o canvas para redimensionar com a janela
-        container.bind("<Configure>", lambda e: canvas.configure(width=e.width))
+        if not self.frame_lista.winfo_manager():
+            self.frame_lista.pack(fill="both", expand=True)
+        self.label_total_arquivos.config(text=f"{len(self.arquivos_para_upload)} arquivo(s)")
+
+    def adicionar_arquivos(self, arquivos):
+        """Acrescenta arquivos ao fim da lista inserindo apenas as linhas novas (cada um ganha um iid fixo)"""
+        self.arquivos_para_upload.extend(arquivos)
+        for arquivo in arquivos:
+            iid = arquivo['iid'] = f"arq{self._proximo_iid}"
+            self._proximo_iid += 1
+            self.tree_arquivos.insert("", "end", iid=iid, values=(arquivo['name'],))
+        self._mostrar_lista()
+
+    def remover_arquivos(self, iids):
+        """Tira da lista os arquivos com esses iids, apagando só as linhas deles"""
+        # Arquivos do lote já removidos à mão durante o upload não estão mais na lista
+        iids = {iid for iid in iids if self.tree_arquivos.exists(iid)}
+        if not iids:
+            return
+        self.tree_arquivos.delete(*iids)
+        self.arquivos_para_upload = [a for a in self.arquivos_para_upload if a['iid'] not in iids]
+        self._mostrar_lista()
 
-    def remover_arquivo(self, index):
-        if 0 <= index < len(self.arquivos_para_upload):
-            self.arquivos_para_upload.pop(index)
-            self.atualizar_lista_arquivos()
+    def remover_selecionados(self):
+        """Remove da lista os arquivos selecionados (Delete ou botão)"""
+        self.remover_arquivos(self.tree_arquivos.selection())
 
     def abrir_tela_busca(self):
         TelaBusca(self.root)
@@ -645,6 +791,10 @@ class Aplicativo:
                 messagebox.showwarning("Atenção", "Todos os campos devem ser preenchidos!")
                 return
             
+            if self.varreduras_ativas:
+                messagebox.showwarning("Atenção", "Aguarde o fim da leitura das pastas ou cancele-a.")
+                return
+            
             # Validação de processo existente
             if not self.validar_processo_existente(numero_processo, ano, servico, referencia):
                 return
@@ -671,48 +821,146 @@ class Aplicativo:
                 messagebox.showinfo("Sucesso", "Pasta criada sem documentos!")
                 return
             
-            # Inicializa contador de sucessos
-            sucessos = 0
-            falhas = []
+            # Confirmações de substituição antes de iniciar as cópias, ainda na thread do Tk
+            def perguntar(arquivo, destino):
+                return SUBSTITUIR if messagebox.askyesno("Arquivo Existente", f"Substituir {arquivo['name']}?") else PULAR
             
-            for arquivo in self.arquivos_para_upload:
-                try:
-                    destino = os.path.join(pasta_destino, arquivo['name'])
-                    
-                    # Se for arquivo temporário, já foi movido - apenas copiar
-                    if arquivo.get('is_temp'):
-                        shutil.copy2(arquivo['path'], destino)
-                    else:
-                        # Processamento normal para outros arquivos
-                        if not validar_arquivo(arquivo['path']):
-                            raise ValueError(f"Tipo de arquivo não permitido: {os.path.splitext(arquivo['path'])[1]}")
-                        
-                        if os.path.exists(destino):
-                            resposta = messagebox.askyesno("Arquivo Existente", f"Substituir {arquivo['name']}?")
-                            if not resposta:
-                                continue
-                        
-                        shutil.copy2(arquivo['path'], destino)
-                    
-                    sucessos += 1
-                except Exception as e:
-                    falhas.append((arquivo['name'], str(e)))
-            
-            # Limpa a lista de arquivos após o upload
-            self.arquivos_para_upload = []
-            self.atualizar_lista_arquivos()
-            
-            # Exibe resumo
-            if sucessos > 0:
-                messagebox.showinfo("Sucesso", f"{sucessos} arquivo(s) copiado(s) com sucesso!")
-            if falhas:
-                detalhes = "\n".join([f"{nome}: {erro}" for nome, erro in falhas])
-                messagebox.showerror("Falhas", f"Os seguintes arquivos falharam:\n{detalhes}")
+            tarefas, ignorados = planejar_copia(
+                pasta_destino, self.arquivos_para_upload, politica=perguntar, validar=validar_arquivo
+            )
+            self._iniciar_upload(tarefas, ignorados)
         
         except Exception as e:
             messagebox.showerror("Erro", f"Erro durante o upload: {str(e)}")
             logging.error(f"Erro no upload: {str(e)}")
     
+    def _iniciar_upload(self, tarefas, ignorados):
+        """Dispara as cópias numa thread de trabalho; o progresso volta pela fila"""
+        self.lote_upload = list(self.arquivos_para_upload)
+        self.cancelar_upload_evento.clear()
+        self.progresso_upload = {
+            'arquivos': 0, 'total_arquivos': len(tarefas),
+            'bytes': 0, 'total_bytes': 0, 'inicio': time.perf_counter()
+        }
+        
+        self.btn_processar.config(state="disabled")
+        self.barra_progresso.config(value=0, maximum=1)
+        self.label_progresso.config(text="Preparando...")
+        self.frame_progresso.pack(fill="x", pady=5)
+        
+        self.thread_upload = threading.Thread(
+            target=self._executar_upload, args=(tarefas, ignorados), name="upload", daemon=True
+        )
+        self.thread_upload.start()
+        self.root.after(INTERVALO_PROGRESSO, self._acompanhar_upload)
+    
+    def _executar_upload(self, tarefas, ignorados):
+        """Roda fora da thread do Tk: não toca em widgets, só publica na fila"""
+        try:
+            total_bytes = 0
+            for tarefa in tarefas:
+                try:
+                    total_bytes += os.path.getsize(tarefa['origem'])
+                except OSError:
+                    pass
+            self.fila_upload.put(('total', total_bytes))
+            
+            relatorio = executar_copia(
+                tarefas,
+                ignorados,
+                ao_concluir=lambda resultado: self.fila_upload.put(('arquivo', resultado)),
+                ao_progresso=lambda lidos: self.fila_upload.put(('bytes', lidos)),
+                cancelar=self.cancelar_upload_evento
+            )
+            self.fila_upload.put(('fim', relatorio))
+        except Exception as e:
+            logging.error(f"Erro no upload: {str(e)}")
+            self.fila_upload.put(('erro', str(e)))
+    
+    def _acompanhar_upload(self):
+        """Lê a fila de progresso (via root.after) e atualiza a barra"""
+        progresso = self.progresso_upload
+        fim = None
+        try:
+            while True:
+                tipo, valor = self.fila_upload.get_nowait()
+                if tipo == 'total':
+                    progresso['total_bytes'] = valor
+                    self.barra_progresso.config(maximum=max(valor, 1))
+                elif tipo == 'bytes':
+                    progresso['bytes'] += valor
+                elif tipo == 'arquivo':
+                    progresso['arquivos'] += 1
+                else:
+                    fim = (tipo, valor)
+        except queue.Empty:
+            pass
+        
+        decorrido = time.perf_counter() - progresso['inicio']
+        mb_por_segundo = progresso['bytes'] / (1024 * 1024) / decorrido if decorrido > 0 else 0.0
+        texto = (
+            f"{progresso['arquivos']}/{progresso['total_arquivos']} arquivos - "
+            f"{progresso['bytes'] / (1024 * 1024):.1f}/{progresso['total_bytes'] / (1024 * 1024):.1f} MB - "
+            f"{mb_por_segundo:.1f} MB/s"
+        )
+        if progresso['bytes'] and progresso['total_bytes'] > progresso['bytes']:
+            restante = (progresso['total_bytes'] - progresso['bytes']) / (progresso['bytes'] / decorrido)
+            texto += f" - faltam {int(restante // 60)}min {int(restante % 60):02d}s"
+        if self.cancelar_upload_evento.is_set():
+            texto = "Cancelando... " + texto
+        self.barra_progresso.config(value=progresso['bytes'])
+        self.label_progresso.config(text=texto)
+        
+        if fim:
+            self._concluir_upload(*fim)
+        else:
+            self.root.after(INTERVALO_PROGRESSO, self._acompanhar_upload)
+    
+    def cancelar_upload(self):
+        self.cancelar_upload_evento.set()
+    
+    def _concluir_upload(self, tipo, valor):
+        self.frame_progresso.pack_forget()
+        self.btn_processar.config(state="normal")
+        self.thread_upload = None
+        
+        if tipo == 'erro':
+            messagebox.showerror("Erro", f"Erro durante o upload: {valor}")
+            return
+        
+        relatorio = valor
+        falhas = [(r['nome'], r['erro']) for r in relatorio['falhas']]
+        
+        # Tira da lista o lote processado; num cancelamento, o que não foi copiado continua nela
+        copiados = {r['origem'] for r in relatorio['resultados'] if r['ok']}
+        self.remover_arquivos(
+            arquivo['iid'] for arquivo in self.lote_upload
+            if not (relatorio['cancelados'] and arquivo['path'] not in copiados)
+        )
+        self.lote_upload = []
+        
+        # Exibe resumo
+        if relatorio['sucessos'] > 0:
+            messagebox.showinfo(
+                "Sucesso",
+                f"{relatorio['sucessos']} arquivo(s) copiado(s) com sucesso!\n{descrever_vazao(relatorio)}"
+            )
+        if relatorio['duplicados']:
+            situacoes = {'existente': "já estava na pasta", 'vinculado': "vinculado a", 'duplicado': "idêntico a"}
+            detalhes = "\n".join(
+                f"{r['nome']}: {situacoes[r['duplicado']]}" + ("" if r['duplicado'] == 'existente' else f" {r['canonico']}")
+                for r in relatorio['duplicados']
+            )
+            messagebox.showinfo("Duplicados", f"Arquivos com conteúdo já arquivado:\n{detalhes}")
+        if relatorio['cancelados']:
+            messagebox.showwarning(
+                "Cancelado",
+                f"Upload cancelado. {len(relatorio['cancelados'])} arquivo(s) não foram copiados e continuam na lista."
+            )
+        if falhas:
+            detalhes = "\n".join([f"{nome}: {erro}" for nome, erro in falhas])
+            messagebox.showerror("Falhas", f"Os seguintes arquivos falharam:\n{detalhes}")
+    
     def _limpar_arquivos_temporarios(self):
         """Remove arquivos temporários marcados para exclusão"""
         temp_files = [f for f in self.arquivos_para_upload if f.get('is_temp')]
@@ -743,4 +991,5 @@ if __name__ == "__main__":
         root = tk.Tk()
     
     app = Aplicativo(root)
+    iniciar_observador()
     root.mainloop()
\ No newline at end of file
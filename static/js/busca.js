@@ -0,0 +1,162 @@
+let ordenar = 'numero';
+let ordem = 'asc';
+let proximoCursor = null;
+
+function parametros() {
+    const params = new URLSearchParams(new FormData(document.getElementById('buscaForm')));
+    for (const [campo, valor] of [...params.entries()]) {
+        if (!valor.trim()) params.delete(campo);
+    }
+    params.set('ordenar', ordenar);
+    params.set('ordem', ordem);
+    return params;
+}
+
+function linhaProcesso(p) {
+    const tr = document.createElement('tr');
+    tr.className = 'processo';
+    tr.title = 'Clique para ver os arquivos';
+    [p.numero, p.cliente, p.area, p.servico, p.ano, p.referencia].forEach(valor => {
+        const td = document.createElement('td');
+        td.textContent = valor;
+        tr.appendChild(td);
+    });
+    tr.addEventListener('click', () => alternarArquivos(p, tr));
+    return tr;
+}
+
+function formatarTamanho(bytes) {
+    const unidades = ['B', 'KB', 'MB', 'GB'];
+    let i = 0;
+    while (bytes >= 1024 && i < unidades.length - 1) {
+        bytes /= 1024;
+        i++;
+    }
+    return `${bytes.toFixed(i ? 1 : 0)} ${unidades[i]}`;
+}
+
+// Arquivos da pasta do processo, uma página por vez (o servidor responde 304 se nada mudou)
+async function carregarArquivos(p, td, cursor = null) {
+    const params = new URLSearchParams();
+    if (cursor) params.set('cursor', cursor);
+    const response = await fetch(`/api/processos/${encodeURIComponent(p.id)}/arquivos?` + params.toString());
+    const dados = await response.json();
+    if (!response.ok) {
+        td.textContent = dados.erro;
+        return;
+    }
+    td.querySelector('button.mais')?.remove();
+    if (!cursor && !dados.arquivos.length) td.textContent = 'Nenhum arquivo na pasta';
+    dados.arquivos.forEach(a => {
+        const div = document.createElement('div');
+        const img = a.previa ? miniatura(p.id, a.arquivo) : null;
+        if (img) div.appendChild(img);
+        const modificado = new Date(a.modificado * 1000).toLocaleString('pt-BR');
+        div.appendChild(document.createTextNode(`${a.arquivo} (${formatarTamanho(a.tamanho)}, ${modificado})`));
+        td.appendChild(div);
+    });
+    if (dados.proximo_cursor) {
+        const botao = document.createElement('button');
+        botao.type = 'button';
+        botao.className = 'mais';
+        botao.textContent = `Mais arquivos (${dados.total} no total)`;
+        botao.addEventListener('click', () => carregarArquivos(p, td, dados.proximo_cursor));
+        td.appendChild(botao);
+    }
+}
+
+// Clique no processo abre a lista de arquivos logo abaixo; outro clique fecha
+function alternarArquivos(p, tr) {
+    const seguinte = tr.nextElementSibling;
+    if (seguinte && seguinte.classList.contains('arquivos')) {
+        seguinte.remove();
+        return;
+    }
+    const linha = document.createElement('tr');
+    linha.className = 'arquivos';
+    const td = document.createElement('td');
+    td.colSpan = 6;
+    td.className = 'documentos';
+    linha.appendChild(td);
+    tr.after(linha);
+    carregarArquivos(p, td);
+}
+
+// Miniatura gerada no servidor na primeira vez (só para arquivos com o indicador previa); some se falhar
+function miniatura(idProcesso, arquivo) {
+    const img = document.createElement('img');
+    img.className = 'miniatura';
+    img.loading = 'lazy';
+    img.alt = arquivo;
+    const caminho = arquivo.split(/[\\/]/).map(encodeURIComponent).join('/');
+    img.src = `/api/processos/${encodeURIComponent(idProcesso)}/miniatura/${caminho}`;
+    img.addEventListener('error', () => img.remove());
+    return img;
+}
+
+// Com texto informado a busca vai ao índice de texto dos documentos, por relevância
+async function buscarTexto(params) {
+    params.set('q', params.get('texto'));
+    params.delete('texto');
+    const response = await fetch('/api/texto?' + params.toString());
+    const dados = await response.json();
+    if (!response.ok) {
+        alert(dados.erro);
+        return;
+    }
+    const tbody = document.getElementById('resultados');
+    tbody.innerHTML = '';
+    dados.processos.forEach(p => {
+        tbody.appendChild(linhaProcesso(p));
+        const tr = document.createElement('tr');
+        const td = document.createElement('td');
+        td.colSpan = 6;
+        td.className = 'documentos';
+        p.documentos.forEach(d => {
+            const div = document.createElement('div');
+            const img = d.previa ? miniatura(p.id, d.arquivo) : null;
+            if (img) div.appendChild(img);
+            div.appendChild(document.createTextNode(`${d.arquivo}: ${d.trecho}`));
+            td.appendChild(div);
+        });
+        tr.appendChild(td);
+        tbody.appendChild(tr);
+    });
+    proximoCursor = null;
+    document.getElementById('btnMais').style.display = 'none';
+    document.getElementById('status').textContent = `${dados.processos.length} processo(s) com o texto procurado`;
+}
+
+async function buscar(continuar = false) {
+    const params = parametros();
+    if (params.get('texto')) return buscarTexto(params);
+    if (continuar && proximoCursor) params.set('cursor', proximoCursor);
+    const response = await fetch('/api/processos?' + params.toString());
+    const dados = await response.json();
+    if (!response.ok) {
+        alert(dados.erro);
+        return;
+    }
+    const tbody = document.getElementById('resultados');
+    if (!continuar) tbody.innerHTML = '';
+    dados.processos.forEach(p => tbody.appendChild(linhaProcesso(p)));
+    proximoCursor = dados.proximo_cursor;
+    document.getElementById('btnMais').style.display = proximoCursor ? 'block' : 'none';
+    document.getElementById('status').textContent =
+        `Exibindo ${tbody.querySelectorAll('tr.processo').length} de ${dados.total} processos`;
+}
+
+document.getElementById('buscaForm').addEventListener('submit', (e) => {
+    e.preventDefault();
+    buscar();
+});
+
+document.getElementById('btnMais').addEventListener('click', () => buscar(true));
+
+document.querySelectorAll('th[data-col]').forEach(th => {
+    th.addEventListener('click', () => {
+        ordem = (ordenar === th.dataset.col && ordem === 'asc') ? 'desc' : 'asc';
+        ordenar = th.dataset.col;
+        buscar();
+    });
+});
@@ -0,0 +1,100 @@
+// Web Worker: calcula o SHA-256 dos arquivos sem travar a página.
+// crypto.subtle só existe em HTTPS/localhost e não é incremental, então arquivos
+// grandes (ou páginas servidas por HTTP na rede interna) usam a implementação abaixo.
+const LIMITE_DIGEST_NATIVO = 64 * 1024 * 1024;
+const BLOCO_HASH = 4 * 1024 * 1024;
+const K = new Uint32Array([
+    0x428a2f98, 0x71374491, 0xb5c0fbcf, 0xe9b5dba5, 0x3956c25b, 0x59f111f1, 0x923f82a4, 0xab1c5ed5,
+    0xd807aa98, 0x12835b01, 0x243185be, 0x550c7dc3, 0x72be5d74, 0x80deb1fe, 0x9bdc06a7, 0xc19bf174,
+    0xe49b69c1, 0xefbe4786, 0x0fc19dc6, 0x240ca1cc, 0x2de92c6f, 0x4a7484aa, 0x5cb0a9dc, 0x76f988da,
+    0x983e5152, 0xa831c66d, 0xb00327c8, 0xbf597fc7, 0xc6e00bf3, 0xd5a79147, 0x06ca6351, 0x14292967,
+    0x27b70a85, 0x2e1b2138, 0x4d2c6dfc, 0x53380d13, 0x650a7354, 0x766a0abb, 0x81c2c92e, 0x92722c85,
+    0xa2bfe8a1, 0xa81a664b, 0xc24b8b70, 0xc76c51a3, 0xd192e819, 0xd6990624, 0xf40e3585, 0x106aa070,
+    0x19a4c116, 0x1e376c08, 0x2748774c, 0x34b0bcb5, 0x391c0cb3, 0x4ed8aa4a, 0x5b9cca4f, 0x682e6ff3,
+    0x748f82ee, 0x78a5636f, 0x84c87814, 0x8cc70208, 0x90befffa, 0xa4506ceb, 0xbef9a3f7, 0xc67178f2
+]);
+
+class Sha256 {
+    constructor() {
+        this.h = new Uint32Array([
+            0x6a09e667, 0xbb67ae85, 0x3c6ef372, 0xa54ff53a, 0x510e527f, 0x9b05688c, 0x1f83d9ab, 0x5be0cd19
+        ]);
+        this.w = new Uint32Array(64);
+        this.pendente = new Uint8Array(64);
+        this.tamanhoPendente = 0;
+        this.total = 0;
+    }
+
+    bloco(d, p) {
+        const w = this.w, h = this.h;
+        for (let i = 0; i < 16; i++, p += 4) {
+            w[i] = (d[p] << 24) | (d[p + 1] << 16) | (d[p + 2] << 8) | d[p + 3];
+        }
+        for (let i = 16; i < 64; i++) {
+            const x = w[i - 15], y = w[i - 2];
+            const s0 = ((x >>> 7) | (x << 25)) ^ ((x >>> 18) | (x << 14)) ^ (x >>> 3);
+            const s1 = ((y >>> 17) | (y << 15)) ^ ((y >>> 19) | (y << 13)) ^ (y >>> 10);
+            w[i] = (w[i - 16] + s0 + w[i - 7] + s1) | 0;
+        }
+        let a = h[0], b = h[1], c = h[2], d2 = h[3], e = h[4], f = h[5], g = h[6], hh = h[7];
+        for (let i = 0; i < 64; i++) {
+            const S1 = ((e >>> 6) | (e << 26)) ^ ((e >>> 11) | (e << 21)) ^ ((e >>> 25) | (e << 7));
+            const t1 = (hh + S1 + ((e & f) ^ (~e & g)) + K[i] + w[i]) | 0;
+            const S0 = ((a >>> 2) | (a << 30)) ^ ((a >>> 13) | (a << 19)) ^ ((a >>> 22) | (a << 10));
+            const t2 = (S0 + ((a & b) ^ (a & c) ^ (b & c))) | 0;
+            hh = g; g = f; f = e; e = (d2 + t1) | 0;
+            d2 = c; c = b; b = a; a = (t1 + t2) | 0;
+        }
+        h[0] += a; h[1] += b; h[2] += c; h[3] += d2;
+        h[4] += e; h[5] += f; h[6] += g; h[7] += hh;
+    }
+
+    update(dados) {
+        let p = 0;
+        this.total += dados.length;
+        if (this.tamanhoPendente) {
+            p = Math.min(64 - this.tamanhoPendente, dados.length);
+            this.pendente.set(dados.subarray(0, p), this.tamanhoPendente);
+            this.tamanhoPendente += p;
+            if (this.tamanhoPendente < 64) return;
+            this.bloco(this.pendente, 0);
+            this.tamanhoPendente = 0;
+        }
+        for (; p + 64 <= dados.length; p += 64) this.bloco(dados, p);
+        this.pendente.set(dados.subarray(p), 0);
+        this.tamanhoPendente = dados.length - p;
+    }
+
+    hex() {
+        const bits = this.total * 8;
+        const fim = new Uint8Array(this.tamanhoPendente < 56 ? 64 : 128);
+        fim.set(this.pendente.subarray(0, this.tamanhoPendente));
+        fim[this.tamanhoPendente] = 0x80;
+        const visao = new DataView(fim.buffer);
+        visao.setUint32(fim.length - 8, Math.floor(bits / 0x100000000));
+        visao.setUint32(fim.length - 4, bits >>> 0);
+        for (let p = 0; p < fim.length; p += 64) this.bloco(fim, p);
+        return Array.from(this.h, x => x.toString(16).padStart(8, '0')).join('');
+    }
+}
+
+async function sha256Arquivo(file) {
+    if (file.size <= LIMITE_DIGEST_NATIVO && self.crypto && crypto.subtle) {
+        const digest = await crypto.subtle.digest('SHA-256', await file.arrayBuffer());
+        return Array.from(new Uint8Array(digest), b => b.toString(16).padStart(2, '0')).join('');
+    }
+    const sha = new Sha256();
+    for (let p = 0; p < file.size; p += BLOCO_HASH) {
+        sha.update(new Uint8Array(await file.slice(p, p + BLOCO_HASH).arrayBuffer()));
+    }
+    return sha.hex();
+}
+
+self.onmessage = async (e) => {
+    const {id, file} = e.data;
+    try {
+        postMessage({id, hash: await sha256Arquivo(file)});
+    } catch (erro) {
+        postMessage({id, erro: String(erro)});
+    }
+};
@@ -0,0 +1,386 @@
+// Endereço versionado do worker de hash, informado pelo template
+const URL_WORKER_HASH = document.currentScript.dataset.worker;
+
+// Lista global de arquivos
+let fileList = [];
+
+// Configurar drag and drop
+const dragArea = document.getElementById('dragArea');
+dragArea.addEventListener('dragover', (e) => {
+    e.preventDefault();
+    dragArea.style.backgroundColor = '#e9e9e9';
+});
+
+dragArea.addEventListener('dragleave', () => {
+    dragArea.style.backgroundColor = '#fafafa';
+});
+
+dragArea.addEventListener('drop', (e) => {
+    e.preventDefault();
+    dragArea.style.backgroundColor = '#fafafa';
+    const files = e.dataTransfer.files;
+    addFilesToList(files);
+});
+
+function addFilesToList(files) {
+    for (let i = 0; i < files.length; i++) {
+        fileList.push(files[i]);
+    }
+    updateFileList();
+}
+
+function removeFile(index) {
+    fileList.splice(index, 1);
+    updateFileList();
+}
+
+function updateFileList() {
+    const fileListDiv = document.getElementById('fileList');
+    fileListDiv.innerHTML = '';
+
+    fileList.forEach((file, index) => {
+        const fileItem = document.createElement('div');
+        fileItem.className = 'file-item';
+        fileItem.innerHTML = `
+            <span>${file.name}</span>
+            <button type="button" onclick="removeFile(${index})" class="remove-btn">
+                <img src="/static/c_redX.png" alt="Remover" width="16">
+            </button>
+        `;
+        fileListDiv.appendChild(fileItem);
+    });
+
+    // Atualizar input de arquivos
+    const dataTransfer = new DataTransfer();
+    fileList.forEach(file => dataTransfer.items.add(file));
+    document.getElementById('fileInput').files = dataTransfer.files;
+}
+
+// Event listeners para botões
+document.getElementById('btnEscolherArquivos').addEventListener('click', () => {
+    document.getElementById('fileInput').click();
+});
+
+document.getElementById('fileInput').addEventListener('change', (e) => {
+    addFilesToList(e.target.files);
+    e.target.value = ''; // Resetar para permitir adicionar os mesmos arquivos novamente
+});
+
+document.getElementById('btnEscolherPasta').addEventListener('click', async () => {
+    // Verificar se a API está disponível
+    if (!window.showDirectoryPicker) {
+        alert('Seu navegador não suporta a seleção de pastas. Por favor, atualize ou use outro navegador.');
+        return;
+    }
+    try {
+        const dirHandle = await window.showDirectoryPicker();
+        await processFolder(dirHandle);
+    } catch (error) {
+        console.error('Erro ao selecionar pasta:', error);
+    }
+});
+
+async function processFolder(dirHandle, path = '') {
+    for await (const entry of dirHandle.values()) {
+        if (entry.kind === 'file') {
+            const file = await entry.getFile();
+            fileList.push(file);
+        } else if (entry.kind === 'directory') {
+            await processFolder(entry, `${path}${entry.name}/`);
+        }
+    }
+    updateFileList();
+}
+
+// Função para limpar campos
+function limparCampos() {
+    document.querySelector('select[name=cliente]').value = "";
+    document.querySelector('select[name=area]').value = "";
+    document.querySelector('select[name=servico]').value = "";
+    document.querySelector('input[name=numero_processo]').value = "";
+    document.querySelector('input[name=ano]').value = "";
+    document.querySelector('input[name=referencia]').value = "";
+    fileList = [];
+    updateFileList();
+}
+
+// Arquivos acima deste tamanho vão em partes, com retomada após falhas
+const LIMITE_UPLOAD_SIMPLES = 8 * 1024 * 1024;
+const ENVIOS_PARALELOS = 4;
+const TENTATIVAS_POR_BLOCO = 5;
+
+// Inclui o processo de destino: o mesmo arquivo enviado a outro processo abre outra sessão
+function chaveRetomada(file, campos) {
+    const destino = Object.keys(campos).sort().map(campo => `${campo}=${campos[campo].trim()}`).join('|');
+    return `upload:${file.name}:${file.size}:${file.lastModified}:${destino}`;
+}
+
+async function abrirSessao(file, campos) {
+    const chave = chaveRetomada(file, campos);
+    const salva = localStorage.getItem(chave);
+    if (salva) {
+        const resposta = await fetch(`/api/uploads/${salva}`);
+        if (resposta.ok) return await resposta.json();
+        localStorage.removeItem(chave);
+    }
+    const resposta = await fetch('/api/uploads', {
+        method: 'POST',
+        headers: {'Content-Type': 'application/json'},
+        body: JSON.stringify({...campos, nome: file.name, tamanho: file.size})
+    });
+    const sessao = await resposta.json();
+    if (!resposta.ok) throw new Error(sessao.erro);
+    localStorage.setItem(chave, sessao.id);
+    return sessao;
+}
+
+function blocosFaltando(sessao) {
+    const recebidos = new Set();
+    sessao.recebidos.forEach(([inicio, fim]) => {
+        for (let i = inicio; i <= fim; i++) recebidos.add(i);
+    });
+    const faltando = [];
+    for (let i = 0; i < sessao.total_blocos; i++) {
+        if (!recebidos.has(i)) faltando.push(i);
+    }
+    return faltando;
+}
+
+async function enviarBloco(file, sessao, indice) {
+    const inicio = indice * sessao.tamanho_bloco;
+    const bloco = file.slice(inicio, inicio + sessao.tamanho_bloco);
+    for (let tentativa = 1; ; tentativa++) {
+        let resposta = null;
+        try {
+            resposta = await fetch(`/api/uploads/${sessao.id}/blocos/${indice}`, {
+                method: 'PUT',
+                body: bloco
+            });
+        } catch (error) {
+            // Falha de rede: tenta de novo até o limite
+            if (tentativa >= TENTATIVAS_POR_BLOCO) throw error;
+        }
+        if (resposta) {
+            if (resposta.ok) return;
+            const dados = await resposta.json().catch(() => ({}));
+            const erro = new Error(dados.erro || `Falha ao enviar o bloco ${indice} (HTTP ${resposta.status})`);
+            // Erros do servidor (5xx) contam como tentativa; os demais não mudam repetindo
+            if (resposta.status < 500 || tentativa >= TENTATIVAS_POR_BLOCO) throw erro;
+        }
+        await new Promise(r => setTimeout(r, 1000 * tentativa));
+    }
+}
+
+async function enviarEmPartes(file, campos) {
+    let sessao = await abrirSessao(file, campos);
+    const fila = blocosFaltando(sessao);
+    const trabalhadores = [];
+    for (let i = 0; i < ENVIOS_PARALELOS; i++) {
+        trabalhadores.push((async () => {
+            while (fila.length) {
+                await enviarBloco(file, sessao, fila.shift());
+            }
+        })());
+    }
+    await Promise.all(trabalhadores);
+
+    const resposta = await fetch(`/api/uploads/${sessao.id}/finalizar`, {method: 'POST'});
+    const dados = await resposta.json();
+    if (!resposta.ok) throw new Error(dados.erro);
+    const [trabalho] = await aguardarTrabalhos(`/api/trabalhos/${dados.trabalho}`);
+    // Se a gravação falhar, a sessão continua no servidor e um novo envio só refaz a finalização
+    if (trabalho.situacao === 'concluido') localStorage.removeItem(chaveRetomada(file, campos));
+    return trabalho;
+}
+
+// O servidor grava os arquivos recebidos por uma fila; acompanha até todos terminarem
+const INTERVALO_CONSULTA = 500;
+// Desiste se nenhum trabalho mudar de situação nesse tempo (ms)
+const ESPERA_MAXIMA = 5 * 60 * 1000;
+
+async function aguardarTrabalhos(url) {
+    let situacoes = null;
+    let mudouEm = Date.now();
+    for (;;) {
+        const resposta = await fetch(url);
+        const dados = await resposta.json();
+        if (!resposta.ok) throw new Error(dados.erro);
+        const trabalhos = dados.trabalhos || [dados];
+        if (trabalhos.every(t => t.situacao === 'concluido' || t.situacao === 'erro')) return trabalhos;
+        const atuais = trabalhos.map(t => t.situacao).join();
+        if (atuais !== situacoes) {
+            situacoes = atuais;
+            mudouEm = Date.now();
+        } else if (Date.now() - mudouEm > ESPERA_MAXIMA) {
+            throw new Error("O servidor não terminou de gravar os arquivos. Confira a pasta do processo mais tarde.");
+        }
+        await new Promise(r => setTimeout(r, INTERVALO_CONSULTA));
+    }
+}
+
+function descreverEnvio(erros, trabalhos, resumo) {
+    const falhas = erros.map(e => `${e.nome}: ${e.erro}`);
+    const avisos = [];
+    let gravados = 0;
+    trabalhos.forEach(t => {
+        if (t.situacao === 'erro') {
+            falhas.push(`${t.nome}: ${t.erro}`);
+            return;
+        }
+        gravados++;
+        if (t.renomeado) avisos.push(`${t.nome}: já havia outro arquivo com esse nome, gravado como ${t.arquivo}`);
+        if (t.duplicado === 'existente') avisos.push(`${t.nome}: já estava na pasta do processo`);
+        else if (t.duplicado === 'vinculado') avisos.push(`${t.nome}: idêntico a ${t.canonico} (vinculado, sem nova cópia)`);
+        else if (t.duplicado) avisos.push(`${t.nome}: idêntico a ${t.canonico}`);
+    });
+
+    const linhas = [];
+    if (falhas.length) linhas.push(`${gravados} arquivo(s) enviado(s), falha em ${falhas.length}:`, ...falhas);
+    else if (gravados) linhas.push(`${gravados} arquivo(s) enviado(s) com sucesso!`);
+    if (resumo.existentes) linhas.push(`${resumo.existentes} arquivo(s) já estavam na pasta e não foram reenviados.`);
+    if (resumo.aproveitados) linhas.push(`${resumo.aproveitados} arquivo(s) já existiam no servidor e foram aproveitados sem envio.`);
+    if (!linhas.length) linhas.push('Nenhum arquivo foi enviado. Pasta criada sem documentos!');
+    if (avisos.length) linhas.push('Avisos:', ...avisos);
+    return {texto: linhas.join('\n'), ok: !falhas.length};
+}
+
+// Hash dos arquivos em Web Workers, para perguntar ao servidor o que ele já tem
+const WORKERS_HASH = Math.min(4, navigator.hardwareConcurrency || 2);
+
+function mostrarStatus(texto) {
+    document.getElementById('statusEnvio').textContent = texto;
+}
+
+async function calcularHashes(files) {
+    if (!window.Worker || !files.length) return null;
+    const workers = [];
+    const hashes = new Array(files.length);
+    let proximo = 0, concluidos = 0;
+    const executar = () => new Promise((resolve, reject) => {
+        const worker = new Worker(URL_WORKER_HASH);
+        workers.push(worker);
+        const enviar = () => {
+            if (proximo >= files.length) return resolve();
+            const id = proximo++;
+            worker.postMessage({id, file: files[id]});
+        };
+        worker.onmessage = (e) => {
+            if (e.data.erro) return reject(new Error(e.data.erro));
+            hashes[e.data.id] = e.data.hash;
+            mostrarStatus(`Calculando hashes... ${++concluidos}/${files.length}`);
+            enviar();
+        };
+        worker.onerror = (e) => reject(new Error(e.message));
+        enviar();
+    });
+    try {
+        const trabalhadores = [];
+        for (let i = 0; i < Math.min(WORKERS_HASH, files.length); i++) trabalhadores.push(executar());
+        await Promise.all(trabalhadores);
+        return hashes;
+    } catch (error) {
+        console.error('Falha ao calcular hashes, enviando todos os arquivos:', error);
+        return null;
+    } finally {
+        workers.forEach(worker => worker.terminate());
+    }
+}
+
+async function postarJson(url, dados) {
+    const resposta = await fetch(url, {
+        method: 'POST',
+        headers: {'Content-Type': 'application/json'},
+        body: JSON.stringify(dados)
+    });
+    const corpo = await resposta.json();
+    if (!resposta.ok) throw new Error(corpo.erro);
+    return corpo;
+}
+
+// Antes de enviar bytes, pergunta quais arquivos o servidor já tem (na pasta ou em outro processo)
+async function filtrarJaEnviados(files, campos) {
+    const resumo = {enviar: files, existentes: 0, aproveitados: 0};
+    const hashes = await calcularHashes(files);
+    if (!hashes) return resumo;
+
+    const arquivos = files.map((file, i) => ({nome: file.name, tamanho: file.size, hash: hashes[i]}));
+    mostrarStatus('Verificando arquivos já enviados...');
+    const verificacao = await postarJson('/api/upload/check', {...campos, arquivos});
+
+    resumo.enviar = [];
+    const disponiveis = [];
+    verificacao.arquivos.forEach((arquivo, i) => {
+        if (arquivo.situacao === 'existente') resumo.existentes++;
+        else if (arquivo.situacao === 'disponivel') disponiveis.push(i);
+        else resumo.enviar.push(files[i]);
+    });
+
+    if (disponiveis.length) {
+        mostrarStatus('Aproveitando arquivos já gravados no servidor...');
+        const vinculo = await postarJson('/api/upload/vincular', {
+            ...campos, arquivos: disponiveis.map(i => arquivos[i])
+        });
+        resumo.aproveitados = vinculo.aproveitados.length;
+        vinculo.faltando.forEach(posicao => resumo.enviar.push(files[disponiveis[posicao]]));
+    }
+    return resumo;
+}
+
+// Envio do formulário via AJAX
+document.getElementById("uploadForm").addEventListener("submit", async function(event) {
+    event.preventDefault();
+
+    const formData = new FormData(this);
+    const campos = {};
+    for (const [campo, valor] of formData.entries()) {
+        if (campo !== 'files') campos[campo] = valor;
+    }
+    formData.delete('files');
+
+    try {
+        let resumo;
+        try {
+            resumo = await filtrarJaEnviados(fileList, campos);
+        } catch (error) {
+            mostrarStatus('');
+            alert(error.message);
+            return;
+        }
+        const grandes = resumo.enviar.filter(file => file.size > LIMITE_UPLOAD_SIMPLES);
+        resumo.enviar.filter(file => file.size <= LIMITE_UPLOAD_SIMPLES)
+            .forEach(file => formData.append('files', file));
+
+        mostrarStatus('Enviando...');
+        const response = await fetch('/upload', {
+            method: 'POST',
+            body: formData
+        });
+        const envio = await response.json();
+        if (!response.ok) {
+            mostrarStatus('');
+            alert(envio.erro);
+            return;
+        }
+
+        let trabalhos = [];
+        if (envio.trabalhos.length) {
+            mostrarStatus('Gravando no servidor...');
+            trabalhos = await aguardarTrabalhos(`/api/trabalhos?lote=${envio.lote}`);
+        }
+        for (const file of grandes) {
+            mostrarStatus(`Enviando ${file.name} em partes...`);
+            trabalhos.push(await enviarEmPartes(file, campos));
+        }
+
+        const {texto, ok} = descreverEnvio(envio.erros, trabalhos, resumo);
+        mostrarStatus('');
+        alert(texto);  // Exibe a quantidade de arquivos enviados com sucesso
+        if (ok) {
+            fileList = [];
+            updateFileList();
+        }
+    } catch (error) {
+        mostrarStatus('');
+        alert("Erro ao enviar os arquivos. Envie novamente para continuar de onde parou.\n" + error.message);
+    }
+});